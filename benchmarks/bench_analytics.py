@@ -0,0 +1,142 @@
+"""Benchmark da análise de horas x horário (src/analytics.py).
+
+Popula um SQLite com `src/seed.py` (por padrão 200 usuários com turnos cobrindo
+`--weeks` semanas; reaproveita o banco se ele já tiver os dados) e mede, para o
+período das últimas `--weeks` semanas:
+
+*   `carga`: as duas consultas e a conversão das linhas em arrays;
+*   `análise`: a passada vetorizada (`analyze`), por semana e por mês;
+*   `referência`: o mesmo cálculo turno a turno em Python puro, que também serve
+    para conferir os números da versão vetorizada (o script termina com erro se
+    algum valor divergir).
+
+Uso:
+    python benchmarks/bench_analytics.py
+    python benchmarks/bench_analytics.py --users 400 --weeks 52 --repeat 10
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_DB = os.path.join(ROOT, "benchmarks", "bench_analytics.db")
+
+def prepare(args):
+    from src.main import app
+    from src.extensions import db
+    from src.cli import _import_models
+    from src.migrations import apply_migrations
+    from src.models.user import User
+    from src.seed import seed_database, OCCURRENCE_RATIO
+
+    with app.app_context():
+        _import_models()
+        db.create_all()
+        apply_migrations()
+        if db.session.query(User.id).filter_by(username="seed1").first() is None:
+            # Cerca de 4 dias de trabalho por semana por usuário
+            entries = int(args.users * args.weeks * 4 / (1 - OCCURRENCE_RATIO))
+            print(f"Gerando dados: {args.users} usuários, {entries} registros de ponto...")
+            with db.engine.begin() as connection:
+                seed_database(connection, users=args.users, entries=entries, orders=10, documents=10)
+    return app
+
+def best_of(repeat, function):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def reference(data, granularity, tolerance):
+    """Mesmas métricas de `analyze`, turno a turno, com datetime e o horário compilado."""
+    from src.analytics import NO_WINDOW
+
+    def bucket(day):
+        if granularity == "semana":
+            return (day - (data.start - timedelta(days=data.start.weekday()))).days // 7
+        return (day.year - data.start.year) * 12 + day.month - data.start.month
+
+    totals = {}
+    def add(user, period, field, value):
+        key = (user, period, field)
+        totals[key] = totals.get(key, 0) + value
+
+    for user, start, end in zip(data.shift_user.tolist(), data.shift_start.tolist(), data.shift_end.tolist()):
+        local = datetime.fromtimestamp(start, timezone.utc).astimezone()
+        duration = max(end - start, 0) // 60
+        minute = local.hour * 60 + local.minute
+        window_start, window_end = data.windows[user, local.weekday()].tolist()
+        period = bucket(local.date())
+        add(user, period, "worked_minutes", duration)
+        add(user, period, "shifts", 1)
+        if window_start == NO_WINDOW:
+            add(user, period, "overtime_minutes", duration)
+            continue
+        if minute - window_start > tolerance:
+            add(user, period, "late_count", 1)
+            add(user, period, "late_minutes", minute - window_start)
+        if window_end - (minute + duration) > tolerance:
+            add(user, period, "early_count", 1)
+            add(user, period, "early_minutes", window_end - (minute + duration))
+        inside = max(0, min(minute + duration, window_end) - max(minute, window_start))
+        add(user, period, "overtime_minutes", duration - inside)
+
+    day = data.start
+    while day <= data.end:
+        for user in range(len(data.user_ids)):
+            window_start, window_end = data.windows[user, day.weekday()].tolist()
+            if window_start != NO_WINDOW:
+                add(user, bucket(day), "expected_minutes", window_end - window_start)
+        day += timedelta(days=1)
+    return totals
+
+def compare(analysis, expected):
+    mismatches = 0
+    for field, matrix in analysis.metrics.items():
+        for (user, period), value in np.ndenumerate(matrix):
+            if int(value) != expected.get((user, period, field), 0):
+                mismatches += 1
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"sqlite:///{DEFAULT_DB}", help="URI do banco (padrão: SQLite em benchmarks/)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--weeks", type=int, default=26, help="tamanho da temporada analisada")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.url
+    app = prepare(args)
+
+    from src.analytics import load_shift_data, analyze, LATE_TOLERANCE_MINUTES
+
+    end = datetime.now().date()
+    start = end - timedelta(weeks=args.weeks) + timedelta(days=1)
+    failed = False
+    with app.app_context():
+        load_ms, data = best_of(args.repeat, lambda: load_shift_data(start, end))
+        print(f"{len(data.user_ids)} usuários, {len(data.shift_user)} turnos de {start:%d/%m/%Y} a {end:%d/%m/%Y}, "
+              f"melhor de {args.repeat}\n")
+        print(f"carga (2 consultas + arrays)  {load_ms:9.1f} ms")
+        for granularity in ("semana", "mes"):
+            analyze_ms, analysis = best_of(args.repeat, lambda: analyze(data, granularity))
+            reference_ms, expected = best_of(1, lambda: reference(data, granularity, LATE_TOLERANCE_MINUTES))
+            mismatches = compare(analysis, expected)
+            failed = failed or bool(mismatches)
+            print(f"análise por {granularity:6}          {analyze_ms:9.1f} ms   "
+                  f"referência em Python {reference_ms:9.1f} ms ({reference_ms / analyze_ms:5.0f}x)   "
+                  + ("confere" if not mismatches else f"{mismatches} valores divergentes"))
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark de memória/latência das listas: objeto completo x projeção resumida.
+
+Popula documentos grandes (por padrão 10k documentos com 50 KB de conteúdo) e
+compara o carregamento da lista com o modelo completo (como `list_documents` fazia,
+trazendo `content` e `content_html`) contra `Document.summary_query()`, tanto da
+lista inteira quanto de uma página de 50 itens. A memória é o pico medido pelo
+tracemalloc durante a consulta.
+
+Uso:
+    python benchmarks/bench_list_projection.py
+    python benchmarks/bench_list_projection.py --documents 2000 --body-kb 10
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert
+
+from src.extensions import db
+from src.models.user import User, UserRole, UserSector
+from src.models.document import Document, render_markdown, content_digest
+
+BATCH = 500
+
+def make_app(url):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    db.init_app(app)
+    return app
+
+def seed(documents, body_kb):
+    rng = random.Random(42)
+    db.drop_all()
+    db.create_all()
+    db.session.execute(insert(User.__table__), [{
+        "username": "bench", "email": "bench@samabaja.local", "password_hash": "x" * 60,
+        "role": UserRole.GESTAO, "sector": UserSector.GESTAO, "is_active": True,
+        "work_schedule": "{}", "total_hours_worked": 0
+    }])
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(500)]
+    paragraph = " ".join(rng.choices(words, k=body_kb * 1024 // 6))[: body_kb * 1024]
+    body = f"# Documento\n\n{paragraph}"
+    html = render_markdown(body)
+    start = datetime(2025, 1, 1)
+    for offset in range(0, documents, BATCH):
+        db.session.execute(insert(Document.__table__), [{
+            "title": f"Documento {i}", "content": body, "content_html": html,
+            "content_hash": content_digest(body), "creator_id": 1,
+            "created_at": start, "updated_at": start + timedelta(minutes=i)
+        } for i in range(offset, min(offset + BATCH, documents))])
+        db.session.commit()
+        print(f"  {min(offset + BATCH, documents)}/{documents} documentos", end="\r", flush=True)
+    print()
+
+def measure(name, load, repeat):
+    timings = []
+    peak = 0
+    for _ in range(repeat):
+        db.session.expunge_all()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        rows = load()
+        # Lê os campos que a lista exibe, como o template faria
+        for doc in rows:
+            doc.title, doc.updated_at, doc.creator.username
+        timings.append((time.perf_counter() - t0) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        del rows
+    timings.sort()
+    print(f"{name:40} mediana {timings[len(timings) // 2]:9.1f} ms   pico {peak / 2 ** 20:8.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///bench_list_projection.db")
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--body-kb", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = make_app(args.url)
+    with app.app_context():
+        print(f"Populando {args.url} ...")
+        seed(args.documents, args.body_kb)
+
+        order = (Document.updated_at.desc(), Document.id.desc())
+        print()
+        measure("lista completa, modelo inteiro", lambda: Document.query.order_by(*order).all(), args.repeat)
+        measure("lista completa, projeção resumida", lambda: Document.summary_query().order_by(*order).all(), args.repeat)
+        measure("página de 50, modelo inteiro", lambda: Document.query.order_by(*order).limit(50).all(), args.repeat)
+        measure("página de 50, projeção resumida", lambda: Document.summary_query().order_by(*order).limit(50).all(), args.repeat)
+
+if __name__ == "__main__":
+    main()
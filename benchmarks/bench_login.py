@@ -0,0 +1,84 @@
+"""Benchmark do login: vazão e latência de cauda do bcrypt por fator de custo.
+
+O custo do login é dominado pela verificação do bcrypt. Para cada fator de custo
+(`BCRYPT_LOG_ROUNDS`) o script dispara `--clients` clientes concorrentes fazendo
+`password_hasher.check` pelo mesmo pool limitado usado em `/auth/login` e mede
+logins por segundo, p50/p95/p99 e quantas tentativas foram recusadas na hora
+(`HashingBusy`, que vira 503 na rota).
+
+Uso:
+    python benchmarks/bench_login.py
+    python benchmarks/bench_login.py --rounds 10 12 13 --clients 32 --workers 4 --max-pending 16
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from src.extensions import bcrypt
+from src.hashing import HashingBusy, PasswordHasher
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def run(rounds, clients, attempts, workers, max_pending):
+    app = Flask(__name__)
+    app.config.update(BCRYPT_LOG_ROUNDS=rounds, BCRYPT_WORKERS=workers, BCRYPT_MAX_PENDING=max_pending)
+    bcrypt.init_app(app)
+    hasher = PasswordHasher(app)
+    pw_hash = hasher.hash("senha-de-teste")
+
+    latencies = []
+    rejected = [0]
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(attempts):
+            t0 = time.perf_counter()
+            try:
+                hasher.check(pw_hash, "senha-de-teste")
+            except HashingBusy:
+                with lock:
+                    rejected[0] += 1
+                # O cliente espera um pouco antes de tentar de novo, como o Retry-After
+                time.sleep(0.01)
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"custo {rounds:2}   {len(latencies) / elapsed:8.1f} logins/s   "
+          f"p50 {percentile(latencies, 0.50):8.1f} ms   p95 {percentile(latencies, 0.95):8.1f} ms   "
+          f"p99 {percentile(latencies, 0.99):8.1f} ms   recusados {rejected[0]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=5, help="logins por cliente")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clientes x {args.attempts} logins, pool de {args.workers} threads, "
+          f"até {args.max_pending} pendentes\n")
+    for rounds in args.rounds:
+        run(rounds, args.clients, args.attempts, args.workers, args.max_pending)
+
+if __name__ == "__main__":
+    main()
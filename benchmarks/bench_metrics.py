@@ -0,0 +1,70 @@
+"""Benchmark do custo das métricas por requisição (src/metrics.py).
+
+Sobe duas aplicações mínimas com SQLite em memória, uma sem e outra com
+`metrics.init_app`, e mede o tempo por requisição de uma rota que faz `--queries`
+consultas. A diferença é o custo dos ganchos do Flask e dos eventos de cursor do
+SQLAlchemy.
+
+Uso:
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --requests 5000 --queries 0 5 50 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text
+
+from src.extensions import db
+from src import metrics
+
+def make_app(instrumented, queries):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", METRICS_SLOW_REQUEST_MS=10_000,
+                      METRICS_SLOW_QUERY_COUNT=10_000)
+    db.init_app(app)
+    if instrumented:
+        metrics.init_app(app)
+
+    @app.route("/")
+    def index():
+        for _ in range(queries):
+            db.session.execute(text("SELECT 1")).scalar()
+        return "ok"
+
+    return app
+
+def measure(app, requests):
+    client = app.test_client()
+    for _ in range(50):
+        client.get("/")
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get("/")
+    return (time.perf_counter() - start) / requests * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--queries", type=int, nargs="+", default=[0, 5, 25])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requisições por cenário, melhor de {args.repeat} (tempo médio por requisição)\n")
+    for queries in args.queries:
+        apps = {False: make_app(False, queries), True: make_app(True, queries)}
+        # Rodadas intercaladas, para o aquecimento não favorecer um dos lados
+        best = {False: float("inf"), True: float("inf")}
+        for _ in range(args.repeat):
+            for instrumented, app in apps.items():
+                best[instrumented] = min(best[instrumented], measure(app, args.requests))
+        plain, instrumented = best[False], best[True]
+        print(f"{queries:3} consultas   sem métricas {plain:8.1f} µs   com métricas {instrumented:8.1f} µs   "
+              f"custo {instrumented - plain:+7.1f} µs ({(instrumented / plain - 1) * 100:+5.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,10 @@ from src.main import create_app
 from src.extensions import db, bcrypt
 from src.models.user import User, UserRole, UserSector
 # Import all models to ensure they are known to SQLAlchemy before drop/create
-from src.models.ponto import TimeEntry
+from src.models.ponto import TimeEntry, UserPresence
 from src.models.ordem_servico import OrdemServico
 from src.models.document import Document
+from src.migrations import apply_migrations
 
 app = create_app() # Create an app instance to work with the app context
 
@@ -19,6 +20,7 @@ def setup_database_and_admin():
         db.drop_all() # Drop existing tables
         print("Creating all tables...")
         db.create_all() # Create tables based on current models
+        apply_migrations() # Record the schema version (indexes already exist after create_all)
         print("Tables created.")
 
         # Check if admin already exists (shouldn't after drop_all, but good practice)
@@ -0,0 +1,55 @@
+# gunicorn.conf.py
+"""Configuração do gunicorn.
+
+A aplicação é carregada uma vez no master (`preload_app`) e os workers são criados
+por fork: templates, blueprints e modelos já vêm prontos, e nenhum worker fala com
+o banco ao subir (o esquema é criado por `flask init-db` no deploy).
+
+O master também supervisiona o worker de tarefas (`flask run-jobs`): ele sobe em
+`when_ready`, é reiniciado se cair e é encerrado junto com o gunicorn (`on_exit`).
+`JOBS_WORKER=0` desliga isso, para rodar o worker como um serviço separado;
+`JOBS_CONCURRENCY` (padrão: 2) é repassado a `--concurrency`.
+
+Uso:
+    gunicorn -c gunicorn.conf.py src.main:app
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:443")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+preload_app = True
+jobs_worker = os.getenv("JOBS_WORKER", "1") != "0"
+jobs_concurrency = int(os.getenv("JOBS_CONCURRENCY", "2"))
+_job_supervisor = None
+
+if worker_class == "gevent":
+    # Com preload a aplicação é importada no master, antes do worker gevent aplicar o
+    # monkey-patching; aplicando aqui, as travas e sockets criados no import já são
+    # os cooperativos.
+    from gevent import monkey
+    monkey.patch_all()
+
+def when_ready(server):
+    # Compila todos os templates no master; os workers herdam o cache do Jinja no fork
+    from src.main import app, precompile_templates
+    for name in precompile_templates(app):
+        server.log.warning("Template %s não compilou", name)
+    if jobs_worker:
+        global _job_supervisor
+        from src.jobs import WorkerSupervisor
+        _job_supervisor = WorkerSupervisor.for_app(concurrency=jobs_concurrency, log=server.log.info)
+        _job_supervisor.start()
+
+def on_exit(server):
+    if _job_supervisor is not None:
+        _job_supervisor.stop()
+
+def post_fork(server, worker):
+    # Conexões abertas no master (se houver) não podem ser compartilhadas com o worker
+    from src.main import app
+    from src.extensions import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
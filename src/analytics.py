@@ -0,0 +1,251 @@
+# src/analytics.py
+"""Análise de horas trabalhadas x horário cadastrado, vetorizada com NumPy.
+
+Para um intervalo de datas (locais), carrega os turnos fechados e os horários
+compilados em arrays por coluna e calcula, numa passada só para todos os usuários:
+
+*   minutos trabalhados e esperados (dias com horário no período, tenha havido turno ou não);
+*   atrasos: entrada depois do início do horário + `tolerance` minutos;
+*   saídas antecipadas: saída antes do fim do horário - `tolerance` minutos;
+*   horas extras: minutos trabalhados fora da janela do horário (em dia sem horário,
+    o turno inteiro).
+
+Os números saem por usuário, por setor e por semana (segunda a domingo) ou mês.
+Cada turno conta no dia local em que começou, como em `daily_hours`.
+
+Os horários são gravados em UTC e o horário de trabalho é local: o deslocamento do
+fuso é calculado uma vez por dia distinto e aplicado a todos os turnos do dia.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+import numpy as np
+from sqlalchemy import select
+from src.extensions import db
+from src.models.user import User, UserRole
+from src.models.ponto import TimeEntry, EntryType
+from src.schedule import compile_schedule
+
+GRANULARITIES = ("semana", "mes")
+LATE_TOLERANCE_MINUTES = 10
+# 1970-01-01 foi uma quinta-feira (weekday 3)
+EPOCH_WEEKDAY = 3
+NO_WINDOW = -1
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+@dataclass
+class ShiftData:
+    """Turnos e horários em arrays (uma posição por turno / por usuário)."""
+    user_ids: np.ndarray        # (U,) ids dos usuários
+    usernames: list
+    sectors: list               # (U,) nome do enum do setor
+    sector_labels: dict         # nome do enum -> rótulo exibido
+    windows: np.ndarray         # (U, 7, 2) início/fim do horário em minutos do dia, ou NO_WINDOW
+    shift_user: np.ndarray      # (N,) índice do usuário em `user_ids`
+    shift_start: np.ndarray     # (N,) início, segundos desde a época (UTC)
+    shift_end: np.ndarray       # (N,) fim, segundos desde a época (UTC)
+    start: date
+    end: date
+
+def _utc_bounds(start, end):
+    """Início do primeiro dia e fim do último dia locais, em UTC sem fuso (como no banco)."""
+    first = datetime.combine(start, time()).astimezone().astimezone(timezone.utc).replace(tzinfo=None)
+    last = datetime.combine(end + timedelta(days=1), time()).astimezone().astimezone(timezone.utc).replace(tzinfo=None)
+    return first, last
+
+def load_shift_data(start, end, user_ids=None, sector=None):
+    """Lê usuários ativos (com horário compilado) e os turnos fechados que começam no período."""
+    users = select(User.id, User.username, User.sector, User.work_schedule).where(
+        User.is_active.is_(True), User.role != UserRole.PENDING
+    ).order_by(User.username)
+    if user_ids is not None:
+        users = users.where(User.id.in_(user_ids))
+    if sector is not None:
+        users = users.where(User.sector == sector)
+    user_rows = db.session.execute(users).all()
+
+    ids = np.array([row.id for row in user_rows], dtype=np.int64)
+    windows = np.full((len(user_rows), 7, 2), NO_WINDOW, dtype=np.int32)
+    for position, row in enumerate(user_rows):
+        for weekday, window in enumerate(compile_schedule(row.work_schedule).windows):
+            if window is not None and window[1] > window[0]:
+                windows[position, weekday] = window
+
+    first, last = _utc_bounds(start, end)
+    shifts = select(TimeEntry.user_id, TimeEntry.start_time, TimeEntry.end_time).where(
+        TimeEntry.entry_type == EntryType.ENTRADA, TimeEntry.end_time.is_not(None),
+        TimeEntry.start_time >= first, TimeEntry.start_time < last
+    )
+    if user_ids is not None or sector is not None:
+        shifts = shifts.where(TimeEntry.user_id.in_(ids.tolist()))
+    rows = db.session.execute(shifts).all()
+
+    # Segundos desde a época, para a duração truncar em minutos como em `daily_hours`.
+    # Subtrair datetimes em Python é bem mais rápido que np.array(..., dtype="datetime64[s]")
+    shift_user_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    starts = np.fromiter(((row[1] - EPOCH) // SECOND for row in rows), dtype=np.int64, count=len(rows))
+    ends = np.fromiter(((row[2] - EPOCH) // SECOND for row in rows), dtype=np.int64, count=len(rows))
+    # Posição de cada turno no array de usuários; turnos de usuários fora da lista saem
+    order = np.argsort(ids)
+    found = np.searchsorted(ids, shift_user_ids, sorter=order)
+    keep = found < len(ids)
+    keep[keep] = ids[order[found[keep]]] == shift_user_ids[keep]
+
+    return ShiftData(
+        user_ids=ids, usernames=[row.username for row in user_rows],
+        sectors=[row.sector.name for row in user_rows],
+        sector_labels={row.sector.name: row.sector.value for row in user_rows},
+        windows=windows, shift_user=order[found[keep]],
+        shift_start=starts[keep], shift_end=ends[keep], start=start, end=end,
+    )
+
+def _utc_offsets(utc_days):
+    """Deslocamento (s) do fuso local para cada dia UTC, calculado uma vez por dia distinto."""
+    unique, inverse = np.unique(utc_days, return_inverse=True)
+    offsets = np.array([
+        int(datetime.fromtimestamp(int(day) * 86400 + 43200, timezone.utc).astimezone().utcoffset().total_seconds())
+        for day in unique
+    ], dtype=np.int64)
+    return offsets[inverse]
+
+def _buckets(days, start, end, granularity):
+    """Índice do período (semana/mês) de cada dia local e os rótulos dos períodos de start a end."""
+    if granularity == "semana":
+        monday = start - timedelta(days=start.weekday())
+        index = (days - np.datetime64(monday, "D").astype(np.int64)) // 7
+        count = (end - monday).days // 7 + 1
+        return index, [(monday + timedelta(weeks=week)).isoformat() for week in range(count)]
+    first = np.datetime64(start, "M").astype(np.int64)
+    index = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) - first
+    count = int(np.datetime64(end, "M").astype(np.int64) - first) + 1
+    return index, [str(np.datetime64(int(first + month), "M")) for month in range(count)]
+
+def analyze(data, granularity="semana", tolerance=LATE_TOLERANCE_MINUTES):
+    """Calcula as métricas de todos os usuários em `data` (sem acessar o banco)."""
+    users = len(data.user_ids)
+    first_day = np.datetime64(data.start, "D").astype(np.int64)
+    last_day = np.datetime64(data.end, "D").astype(np.int64)
+
+    # --- Turnos: hora local, dia da semana e janela do horário ---
+    local_start = data.shift_start + _utc_offsets(data.shift_start // 86400)
+    day = local_start // 86400
+    minute = (local_start - day * 86400) // 60
+    duration = np.maximum(data.shift_end - data.shift_start, 0) // 60
+    finish = minute + duration  # minutos desde a meia-noite do dia de início
+    weekday = (day + EPOCH_WEEKDAY) % 7
+    window = data.windows[data.shift_user, weekday]
+    window_start, window_end = window[:, 0], window[:, 1]
+    scheduled = window_start != NO_WINDOW
+
+    late_minutes = minute - window_start
+    late = scheduled & (late_minutes > tolerance)
+    early_minutes = window_end - finish
+    early = scheduled & (early_minutes > tolerance)
+    inside = np.clip(np.minimum(finish, window_end) - np.maximum(minute, window_start), 0, None)
+    overtime = np.where(scheduled, duration - inside, duration)
+
+    # --- Minutos esperados: todo dia do período com horário, tenha havido turno ou não ---
+    all_days = np.arange(first_day, last_day + 1)
+    day_windows = data.windows[:, (all_days + EPOCH_WEEKDAY) % 7]               # (U, D, 2)
+    expected_per_day = np.where(day_windows[..., 0] != NO_WINDOW,
+                                day_windows[..., 1] - day_windows[..., 0], 0)  # (U, D)
+
+    day_bucket, labels = _buckets(all_days, data.start, data.end, granularity)
+    buckets = len(labels)
+    # Perto de uma troca de horário de verão um turno pode cair um dia fora do período
+    shift_bucket = np.clip(_buckets(day, data.start, data.end, granularity)[0], 0, buckets - 1)
+
+    key = data.shift_user * buckets + shift_bucket
+
+    def per_bucket(values):
+        return np.bincount(key, weights=values, minlength=users * buckets).reshape(users, buckets)
+
+    metrics = {
+        "worked_minutes": per_bucket(duration),
+        "shifts": per_bucket(np.ones_like(duration)),
+        "late_count": per_bucket(late.astype(np.int64)),
+        "late_minutes": per_bucket(np.where(late, late_minutes, 0)),
+        "early_count": per_bucket(early.astype(np.int64)),
+        "early_minutes": per_bucket(np.where(early, early_minutes, 0)),
+        "overtime_minutes": per_bucket(overtime),
+    }
+    # Os dias estão em ordem, então cada período é uma fatia contínua das colunas
+    cuts = np.flatnonzero(np.diff(day_bucket)) + 1
+    metrics["expected_minutes"] = np.add.reduceat(expected_per_day, np.r_[0, cuts], axis=1) if users else np.zeros((0, buckets))
+    return HoursAnalysis(data, granularity, labels, {name: values.astype(np.int64) for name, values in metrics.items()})
+
+class HoursAnalysis:
+    """Resultado de `analyze`: matrizes (usuários x períodos) por métrica."""
+
+    FIELDS = ("worked_minutes", "expected_minutes", "shifts", "late_count", "late_minutes",
+              "early_count", "early_minutes", "overtime_minutes")
+
+    def __init__(self, data, granularity, labels, metrics):
+        self.data = data
+        self.granularity = granularity
+        self.labels = labels
+        self.metrics = metrics
+
+    def _row(self, totals):
+        row = {field: int(totals[field]) for field in self.FIELDS}
+        row["balance_minutes"] = row["worked_minutes"] - row["expected_minutes"]
+        return row
+
+    def users(self):
+        """Totais do período inteiro por usuário."""
+        totals = {field: self.metrics[field].sum(axis=1) for field in self.FIELDS}
+        return [dict(user_id=int(user_id), username=username,
+                     sector=self.data.sector_labels[sector],
+                     **self._row({field: totals[field][index] for field in self.FIELDS}))
+                for index, (user_id, username, sector)
+                in enumerate(zip(self.data.user_ids, self.data.usernames, self.data.sectors))]
+
+    def _sector_matrix(self):
+        names = sorted(set(self.data.sectors))
+        index = np.array([names.index(sector) for sector in self.data.sectors], dtype=np.int64)
+        matrices = {}
+        for field in self.FIELDS:
+            matrix = np.zeros((len(names), self.metrics[field].shape[1]), dtype=np.int64)
+            if len(index):
+                np.add.at(matrix, index, self.metrics[field])
+            matrices[field] = matrix
+        return names, matrices
+
+    def sectors(self):
+        """Totais do período por setor, com a série por semana/mês."""
+        names, matrices = self._sector_matrix()
+        result = []
+        for position, name in enumerate(names):
+            row = dict(sector=self.data.sector_labels[name], users=self.data.sectors.count(name),
+                       **self._row({field: matrices[field][position].sum() for field in self.FIELDS}))
+            row["periods"] = [dict(period=label, **self._row({field: matrices[field][position, column]
+                                                               for field in self.FIELDS}))
+                              for column, label in enumerate(self.labels)]
+            result.append(row)
+        return result
+
+    def user_periods(self, user_id):
+        """Série por semana/mês de um usuário (ou [] se ele não estiver na análise)."""
+        matches = np.nonzero(self.data.user_ids == user_id)[0]
+        if not len(matches):
+            return []
+        index = matches[0]
+        return [dict(period=label, **self._row({field: self.metrics[field][index, column] for field in self.FIELDS}))
+                for column, label in enumerate(self.labels)]
+
+    def to_dict(self, user_id=None):
+        payload = {
+            "start": self.data.start.isoformat(),
+            "end": self.data.end.isoformat(),
+            "granularity": self.granularity,
+            "periods": self.labels,
+            "sectors": self.sectors(),
+            "users": self.users(),
+        }
+        if user_id is not None:
+            payload["user_periods"] = self.user_periods(user_id)
+        return payload
+
+def hours_analysis(start, end, granularity="semana", user_ids=None, sector=None, tolerance=LATE_TOLERANCE_MINUTES):
+    """Carrega os dados do período e calcula a análise (ver `analyze`)."""
+    return analyze(load_shift_data(start, end, user_ids=user_ids, sector=sector), granularity, tolerance)
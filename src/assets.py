@@ -0,0 +1,118 @@
+# src/assets.py
+"""Arquivos estáticos com hash no nome, pré-comprimidos e com cache imutável.
+
+`flask build-assets` copia os arquivos de `src/static` para `ASSETS_DIST_DIR`
+(padrão: `src/dist`) com o hash do conteúdo no nome (`css/style.3f2a9c1b7d4e.css`),
+grava as versões `.gz` (e `.br`, se o pacote `brotli` estiver instalado) e o
+`manifest.json` com o mapeamento nome original -> nome com hash.
+
+Nos templates, `asset_url('css/style.css')` devolve a URL com hash, servida por
+`/assets/...` com a melhor codificação aceita pelo navegador e
+`Cache-Control: immutable`; como a URL muda quando o arquivo muda, visitas
+seguintes não fazem nenhuma requisição de estáticos. Sem manifest (ambiente de
+desenvolvimento), `asset_url` cai no `url_for('static', ...)` de sempre.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from flask import Blueprint, abort, current_app, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # Sem brotli, só a versão .gz é gerada
+    brotli = None
+
+MANIFEST = "manifest.json"
+HASH_LENGTH = 12
+COMPRESSIBLE = {".css", ".js", ".svg", ".ico", ".html", ".json", ".txt", ".map"}
+# Arquivos enviados pelos usuários ficam fora; só a imagem padrão faz parte dos assets
+SKIP_DIRS = ("uploads/",)
+KEEP = {"uploads/default_user.png"}
+MAX_AGE = 365 * 24 * 3600
+
+assets_bp = Blueprint("assets", __name__)
+
+def init_app(app):
+    app.config.setdefault("ASSETS_DIST_DIR", os.path.join(app.root_path, "dist"))
+    app.extensions["assets"] = load_manifest(app.config["ASSETS_DIST_DIR"])
+    app.add_template_global(asset_url)
+    app.register_blueprint(assets_bp, url_prefix="/assets")
+
+def load_manifest(dist_dir):
+    """Manifest gerado pelo build (vazio se ainda não houve build)."""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST), encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except FileNotFoundError:
+        manifest = {}
+    return {"files": manifest, "hashed": set(manifest.values())}
+
+# --- Build ---
+def _hashed_name(relpath, data):
+    stem, ext = os.path.splitext(relpath)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(data)
+
+def build_assets(static_dir, dist_dir):
+    """Gera os arquivos com hash, as versões comprimidas e o manifest. Retorna o manifest."""
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    manifest = {}
+    for root, _dirs, files in os.walk(static_dir):
+        for filename in sorted(files):
+            relpath = os.path.relpath(os.path.join(root, filename), static_dir).replace(os.sep, "/")
+            if relpath.startswith(SKIP_DIRS) and relpath not in KEEP:
+                continue
+            with open(os.path.join(root, filename), "rb") as fh:
+                data = fh.read()
+            hashed = _hashed_name(relpath, data)
+            target = os.path.join(dist_dir, hashed)
+            _write(target, data)
+            if os.path.splitext(relpath)[1].lower() in COMPRESSIBLE:
+                # mtime=0: o .gz sai igual em todo build do mesmo arquivo
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(compressed) < len(data):
+                    _write(target + ".gz", compressed)
+                if brotli is not None:
+                    compressed = brotli.compress(data, quality=11)
+                    if len(compressed) < len(data):
+                        _write(target + ".br", compressed)
+            manifest[relpath] = hashed
+    _write(os.path.join(dist_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+# --- Templates ---
+def asset_url(filename):
+    """URL com hash de um arquivo de `src/static` (ou a URL estática comum, sem build)."""
+    hashed = current_app.extensions["assets"]["files"].get(filename)
+    if hashed is None:
+        return url_for("static", filename=filename)
+    return url_for("assets.serve", filename=hashed)
+
+# --- Rota ---
+@assets_bp.route("/<path:filename>")
+def serve(filename):
+    """Serve um asset do build na melhor codificação aceita (br > gzip > original)."""
+    if filename not in current_app.extensions["assets"]["hashed"]:
+        abort(404)
+    path = os.path.join(current_app.config["ASSETS_DIST_DIR"], filename)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    encoding = None
+    for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[candidate] and os.path.exists(path + suffix):
+            encoding, path = candidate, path + suffix
+            break
+    response = send_file(path, mimetype=mimetype, conditional=True, max_age=MAX_AGE,
+                         etag=f"{filename}-{encoding or 'identity'}")
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
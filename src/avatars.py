@@ -0,0 +1,216 @@
+# src/avatars.py
+"""Fotos de perfil endereçadas por conteúdo.
+
+O upload é gravado em blocos num arquivo temporário, calculando o SHA-256 e
+respeitando `AVATAR_MAX_BYTES`. O arquivo final se chama `<sha256>.<ext>` (em
+subpastas pelos dois primeiros caracteres do hash) dentro de `AVATAR_DIR`: fotos
+iguais são gravadas uma vez só, e como o nome muda quando a foto muda, a rota
+`user.avatar` serve os arquivos com `Cache-Control: immutable`.
+
+As miniaturas (`<sha256>_<tamanho>.<ext>`, usadas nas listas) são geradas pela
+tarefa `avatar_thumbnails` (src/jobs.py) com o Pillow, se estiver instalado;
+enquanto não existem, a rota entrega a foto original sem cache longo.
+
+Em `User.profile_picture` fica `avatars/<sha256>.<ext>`; valores antigos
+(`uploads/...`) continuam sendo servidos pela pasta estática.
+
+Como o arquivo é compartilhado, quem troca ou remove a foto não o apaga na hora:
+`release` agenda a tarefa `avatar_release`, que apaga o arquivo só se nenhum
+usuário o referencia e ele não foi reaproveitado por um upload nos últimos
+`RELEASE_GRACE_SECONDS`. O upload que reaproveita um arquivo renova o mtime dele, e
+as duas etapas rodam sob a mesma trava (`flock` em `AVATAR_DIR/.lock`): um upload
+de conteúdo igual ainda sem commit não perde o arquivo.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import current_app, url_for
+from src.assets import asset_url
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional: sem ele as listas usam a foto original
+    Image = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos (o prazo de carência continua valendo)
+    fcntl = None
+
+PREFIX = "avatars/"
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZES = (64,)
+DEFAULT_AVATAR = "uploads/default_user.png"
+# Um arquivo liberado só é apagado depois deste prazo sem ser reaproveitado
+RELEASE_GRACE_SECONDS = 3600
+
+# Extensão pelo início do arquivo, não pelo nome enviado
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+NAME_RE = re.compile(r"^(?P<digest>[0-9a-f]{64})(?:_(?P<size>\d+))?\.(?P<ext>png|jpg|gif)$")
+
+class AvatarError(ValueError):
+    """Upload recusado (tamanho ou formato); a mensagem é exibida ao usuário."""
+
+def init_app(app):
+    app.config.setdefault("AVATAR_DIR", os.path.join(app.root_path, "uploads", "avatars"))
+    app.config.setdefault("AVATAR_MAX_BYTES", 5 * 1024 * 1024)
+    app.add_template_global(avatar_url)
+
+def storage_dir():
+    return current_app.config["AVATAR_DIR"]
+
+def path_for(name):
+    """Caminho no disco de um arquivo `<sha256>[_<tamanho>].<ext>`."""
+    return os.path.join(storage_dir(), name[:2], name)
+
+@contextmanager
+def storage_lock():
+    """Trava exclusiva (entre processos) sobre os arquivos de `AVATAR_DIR`."""
+    os.makedirs(storage_dir(), exist_ok=True)
+    with open(os.path.join(storage_dir(), ".lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _sniff(head):
+    for signature, ext in SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return None
+
+def save_upload(stream):
+    """Grava o upload em blocos e devolve o valor para `User.profile_picture`.
+
+    Levanta AvatarError se o arquivo passar de AVATAR_MAX_BYTES ou não for PNG/JPEG/GIF.
+    """
+    max_bytes = current_app.config["AVATAR_MAX_BYTES"]
+    os.makedirs(storage_dir(), exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    ext = None
+    fd, tmp_path = tempfile.mkstemp(dir=storage_dir(), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if ext is None:
+                    ext = _sniff(chunk)
+                    if ext is None:
+                        raise AvatarError("Apenas imagens são permitidas (PNG, JPG, JPEG, GIF).")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise AvatarError(f"A imagem deve ter no máximo {max_bytes // (1024 * 1024)} MB.")
+                digest.update(chunk)
+                tmp.write(chunk)
+        if ext is None:
+            raise AvatarError("Nenhum arquivo selecionado.")
+        name = f"{digest.hexdigest()}.{ext}"
+        final_path = path_for(name)
+        with storage_lock():
+            if os.path.exists(final_path):
+                # Mesma imagem já armazenada (deste ou de outro usuário): o mtime novo
+                # impede que uma liberação pendente apague o arquivo antes do commit
+                os.utime(final_path)
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_path, final_path)
+                schedule_thumbnails(name)
+        return PREFIX + name
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def release(value):
+    """Agenda a remoção de uma foto `avatars/...` que o usuário deixou de usar.
+
+    A tarefa entra na transação de quem chamou e só roda depois do prazo de carência.
+    """
+    from src.jobs import enqueue
+    enqueue("avatar_release", value=value).run_after = datetime.utcnow() + timedelta(seconds=RELEASE_GRACE_SECONDS)
+
+def delete_if_unreferenced(value):
+    """Apaga a foto se nenhum usuário a usa e nenhum upload a reaproveitou no prazo.
+
+    Retorna True se apagou.
+    """
+    from src.models.user import User
+    with storage_lock():
+        try:
+            touched = os.stat(path_for(value[len(PREFIX):])).st_mtime
+        except FileNotFoundError:
+            return False
+        if time.time() - touched < RELEASE_GRACE_SECONDS:
+            return False
+        if User.query.filter_by(profile_picture=value).first() is not None:
+            return False
+        delete_files(value)
+        return True
+
+def delete_files(value):
+    """Apaga a foto (e miniaturas) de um valor `avatars/...` que ninguém mais usa."""
+    name = value[len(PREFIX):]
+    stem, ext = name.rsplit(".", 1)
+    for filename in [name] + [f"{stem}_{size}.{thumbnail_ext(ext)}" for size in THUMBNAIL_SIZES]:
+        path = path_for(filename)
+        if os.path.exists(path):
+            os.remove(path)
+
+# --- Miniaturas ---
+def thumbnail_ext(ext):
+    return "jpg" if ext == "jpg" else "png"
+
+def generate_thumbnails(directory, name):
+    """Gera as miniaturas quadradas (corte central) de uma foto já armazenada."""
+    if Image is None:
+        return
+    stem, ext = name.rsplit(".", 1)
+    source = os.path.join(directory, name[:2], name)
+    with Image.open(source) as image:
+        image = image.convert("RGB" if ext == "jpg" else "RGBA")
+        side = min(image.size)
+        left, top = (image.width - side) // 2, (image.height - side) // 2
+        square = image.crop((left, top, left + side, top + side))
+        for size in THUMBNAIL_SIZES:
+            target = os.path.join(directory, name[:2], f"{stem}_{size}.{thumbnail_ext(ext)}")
+            thumb = square.resize((size, size), Image.LANCZOS)
+            tmp_target = target + ".part"
+            thumb.save(tmp_target, format="JPEG" if ext == "jpg" else "PNG", quality=85)
+            os.replace(tmp_target, target)
+
+def schedule_thumbnails(name):
+    """Coloca a geração das miniaturas na fila de tarefas (gravada no commit do upload)."""
+    if Image is not None:
+        from src.jobs import enqueue
+        enqueue("avatar_thumbnails", name=name)
+
+# --- URLs ---
+def avatar_url(user, size=None):
+    """URL da foto de `user`; com `size`, da miniatura (para as listas)."""
+    value = getattr(user, "profile_picture", None)
+    if not value:
+        return asset_url(DEFAULT_AVATAR)
+    if not value.startswith(PREFIX):
+        # Upload antigo, ainda na pasta estática
+        return url_for("static", filename=value)
+    name = value[len(PREFIX):]
+    if size:
+        stem, ext = name.rsplit(".", 1)
+        name = f"{stem}_{size}.{thumbnail_ext(ext)}"
+    return url_for("user.avatar", name=name)
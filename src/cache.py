@@ -0,0 +1,101 @@
+# src/cache.py
+"""Cache em memória com expiração (TTL), por processo.
+
+Usado para valores lidos em quase toda requisição e que mudam pouco, como o
+usuário da sessão e o contador de cadastros pendentes (ver `src/models/user.py`).
+Quem altera o dado invalida a chave explicitamente. Para os outros workers do
+gunicorn verem a invalidação, o dado pode ter uma versão em `SharedVersions`; sem
+ela, o TTL limita por quanto tempo eles podem ver o valor antigo.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class TTLCache:
+    """Mapeamento chave -> valor com TTL e tamanho máximo (LRU), seguro entre threads."""
+
+    def __init__(self, ttl=30, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory):
+        """Valor em cache ou, na falta dele, `factory()` (que passa a ficar em cache)."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedVersions:
+    """Versões de chaves compartilhadas entre os processos da mesma máquina.
+
+    Cada chave é um arquivo vazio num diretório local e a versão é o mtime (em ns)
+    dele: `bump` renova o arquivo e `get` é só um stat(), sem ir ao banco. Quem
+    guarda um valor em cache guarda junto a versão lida antes de carregá-lo e o
+    descarta quando ela muda. Sem diretório (`directory=None`) tudo é versão 0.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, str(key))
+
+    def get(self, key):
+        if not self.directory:
+            return 0
+        try:
+            return os.stat(self._path(key)).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def bump(self, key):
+        if not self.directory:
+            return
+        path = self._path(key)
+        # Sempre maior que a versão anterior, mesmo com o relógio parado ou voltando
+        version = max(time.time_ns(), self.get(key) + 1)
+        try:
+            open(path, "a").close()
+        except FileNotFoundError:
+            os.makedirs(self.directory, exist_ok=True)
+            open(path, "a").close()
+        os.utime(path, ns=(version, version))
@@ -0,0 +1,143 @@
+# src/cli.py
+"""Comandos `flask` de manutenção do banco.
+
+O esquema não é mais criado ao importar a aplicação: os workers do gunicorn só
+carregam código, e a criação/migração do banco roda uma vez, no deploy:
+
+    flask --app src.main:app init-db         # tabelas + migrações + admin
+    flask --app src.main:app migrate         # só as migrações pendentes
+    flask --app src.main:app reindex-search  # reconstrói o índice de busca (SQLite)
+    flask --app src.main:app build-assets    # estáticos com hash e pré-comprimidos
+    flask --app src.main:app rebuild-daily-hours  # recalcula os totais diários de horas
+    flask --app src.main:app run-jobs        # worker das tarefas em segundo plano
+    flask --app src.main:app seed            # dados sintéticos para benchmarks
+    flask --app src.main:app check-query-budgets  # consultas SQL por rota x orçamento
+"""
+import os
+import click
+from src.extensions import db
+
+def _import_models():
+    # Garante que todas as tabelas estejam registradas no metadata antes do create_all
+    from src.models.user import User
+    from src.models.ponto import TimeEntry, UserPresence, DailyHours
+    from src.models.ordem_servico import OrdemServico
+    from src.models.document import Document
+    from src.models.job import Job
+    from src.migrations import SchemaVersion
+
+def _echo_migrations(applied):
+    if applied:
+        click.echo(f"Migrações aplicadas: {', '.join(str(v) for v in applied)}")
+    else:
+        click.echo("Nenhuma migração pendente.")
+
+def register_commands(app):
+    @app.cli.command("init-db")
+    @click.option("--admin-username", default=lambda: os.getenv("ADMIN_USERNAME", "admin"), show_default="admin")
+    @click.option("--admin-password", default=lambda: os.getenv("ADMIN_PASSWORD", "adminpassword"), show_default="adminpassword")
+    def init_db(admin_username, admin_password):
+        """Cria as tabelas que faltam, aplica as migrações e cria o admin se não houver um."""
+        from src.models.user import User, UserRole, UserSector
+        from src.migrations import apply_migrations
+        _import_models()
+        db.create_all()
+        _echo_migrations(apply_migrations())
+
+        if User.query.filter_by(role=UserRole.GESTAO).first() is None:
+            admin = User(username=admin_username, email=f"{admin_username}@samabaja.local",
+                         role=UserRole.GESTAO, sector=UserSector.GESTAO, is_active=True)
+            admin.set_password(admin_password)
+            db.session.add(admin)
+            db.session.commit()
+            click.echo(f"Usuário administrador '{admin_username}' criado.")
+        click.echo("Banco pronto.")
+
+    @app.cli.command("migrate")
+    def migrate():
+        """Aplica as migrações pendentes do esquema."""
+        from src.migrations import apply_migrations
+        _import_models()
+        _echo_migrations(apply_migrations())
+
+    @app.cli.command("reindex-search")
+    def reindex_search():
+        """Reconstrói o índice de busca textual (FTS5; no MySQL o InnoDB mantém o FULLTEXT)."""
+        from src.search import rebuild_search_index, backend_for
+        with db.engine.begin() as connection:
+            backend = backend_for(connection)
+            if backend != "fts5":
+                click.echo(f"Nada a fazer: o backend '{backend}' não usa o índice FTS5.")
+                return
+            rebuild_search_index(connection)
+        click.echo("Índice de busca reconstruído.")
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Gera os estáticos com hash no nome, as versões .gz/.br e o manifest."""
+        from src.assets import build_assets, load_manifest
+        dist_dir = app.config["ASSETS_DIST_DIR"]
+        manifest = build_assets(app.static_folder, dist_dir)
+        app.extensions["assets"] = load_manifest(dist_dir)
+        click.echo(f"{len(manifest)} arquivos gerados em {dist_dir}.")
+
+    @app.cli.command("rebuild-daily-hours")
+    def rebuild_daily_hours_command():
+        """Recalcula a tabela daily_hours e os totais dos usuários a partir dos registros de ponto."""
+        from src.models.ponto import rebuild_daily_hours
+        with db.engine.begin() as connection:
+            count = rebuild_daily_hours(connection)
+        click.echo(f"{count} linhas diárias recalculadas.")
+
+    @app.cli.command("run-jobs")
+    @click.option("--concurrency", default=2, show_default=True, help="Tarefas executadas ao mesmo tempo.")
+    @click.option("--processes", is_flag=True, help="Usa um pool de processos em vez de threads.")
+    @click.option("--poll-interval", default=1.0, show_default=True, help="Segundos entre consultas à fila.")
+    @click.option("--stale-after", default=600, show_default=True, help="Segundos até uma tarefa em execução ser considerada abandonada.")
+    @click.option("--once", is_flag=True, help="Executa o que estiver na fila e sai.")
+    def run_jobs(concurrency, processes, poll_interval, stale_after, once):
+        """Executa as tarefas em segundo plano da fila (tabela job)."""
+        from src.jobs import run_worker
+        click.echo(f"Worker de tarefas iniciado ({concurrency} {'processos' if processes else 'threads'}).")
+        run_worker(app, concurrency=concurrency, processes=processes, poll_interval=poll_interval,
+                   stale_after=stale_after, once=once, log=click.echo)
+
+    @app.cli.command("seed")
+    @click.option("--users", default=200, show_default=True)
+    @click.option("--entries", default=1_000_000, show_default=True, help="Registros de ponto (turnos + ocorrências).")
+    @click.option("--orders", default=2000, show_default=True)
+    @click.option("--documents", default=500, show_default=True)
+    @click.option("--password", default="senha-de-teste", show_default=True, help="Senha de todos os usuários gerados.")
+    @click.option("--seed", "random_seed", default=42, show_default=True, help="Semente do gerador (mesma semente, mesmos dados).")
+    def seed(users, entries, orders, documents, password, random_seed):
+        """Gera usuários, registros de ponto, ocorrências, ordens e documentos sintéticos."""
+        import time
+        from src.seed import seed_database
+        from src.migrations import apply_migrations
+        from src.hashing import password_hasher
+        _import_models()
+        db.create_all()
+        apply_migrations()
+        start = time.perf_counter()
+        try:
+            with db.engine.begin() as connection:
+                counts = seed_database(connection, users=users, entries=entries, orders=orders,
+                                       documents=documents, password_hash=password_hasher.hash(password),
+                                       seed=random_seed, log=click.echo)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        click.echo(f"Dados gerados em {time.perf_counter() - start:.1f}s: "
+                   + ", ".join(f"{name}={value}" for name, value in counts.items()))
+
+    @app.cli.command("check-query-budgets")
+    @click.option("--sizes", default="10,40", show_default=True, help="Números de usuários dos bancos de teste.")
+    def check_query_budgets_command(sizes):
+        """Confere as consultas SQL de cada rota contra o orçamento (SQLite temporário)."""
+        from src.query_budgets import check_query_budgets
+        failures = check_query_budgets(tuple(int(size) for size in sizes.split(",")), log=click.echo)
+        if failures:
+            click.echo(f"\n{len(failures)} problema(s):", err=True)
+            for failure in failures:
+                click.echo(f"  {failure}", err=True)
+            raise SystemExit(1)
+        click.echo("\nTodas as rotas dentro do orçamento.")
@@ -0,0 +1,140 @@
+# src/database.py
+"""Configuração do banco: URI, pool de conexões e ajustes por backend.
+
+Tudo vem de variáveis de ambiente:
+
+*   `DATABASE_URL`: URI completa do SQLAlchemy. Sem ela, a URI do MySQL é montada a
+    partir de `DB_USERNAME`, `DB_PASSWORD`, `DB_HOST`, `DB_PORT` e `DB_NAME`.
+*   `DB_POOL_SIZE`, `DB_MAX_OVERFLOW`, `DB_POOL_TIMEOUT`: tamanho do pool por worker,
+    conexões extras nos picos e espera (s) por uma conexão livre.
+*   `DB_POOL_RECYCLE`: idade máxima (s) de uma conexão; precisa ficar abaixo do
+    `wait_timeout` do MySQL para o servidor não derrubar conexões ociosas do pool.
+*   `DB_POOL_PRE_PING`: testa a conexão antes de usar e reconecta se caiu (padrão: 1).
+*   `DB_STATEMENT_TIMEOUT`: limite (ms) por consulta. No MySQL vira
+    `max_execution_time` (só SELECTs); no SQLite é o `busy_timeout` das travas. 0 = sem limite.
+
+No SQLite (instalações pequenas, benchmarks e testes locais) as conexões usam WAL,
+`synchronous=NORMAL` e chaves estrangeiras ligadas, como no InnoDB.
+"""
+import os
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from src.extensions import db
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",      # ~20 MB de cache de páginas por conexão
+    "PRAGMA mmap_size=134217728",    # 128 MB
+)
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+def _env_bool(name, default):
+    return os.getenv(name, default).strip().lower() not in ("0", "false", "no", "off", "")
+
+def database_uri():
+    """URI do banco: `DATABASE_URL` ou o MySQL montado a partir das variáveis DB_*."""
+    url = os.getenv("DATABASE_URL")
+    if url:
+        return url
+    return (f"mysql+pymysql://{os.getenv('DB_USERNAME', 'flask_user')}:{os.getenv('DB_PASSWORD', 'password')}"
+            f"@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '3306')}/{os.getenv('DB_NAME', 'mydb')}")
+
+def engine_options(uri):
+    """Opções do `create_engine` para a URI, a partir do ambiente."""
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            # Banco em memória usa um pool próprio de conexão única
+            return {}
+        return {
+            "pool_size": _env_int("DB_POOL_SIZE", "5"),
+            "max_overflow": _env_int("DB_MAX_OVERFLOW", "10"),
+            "pool_timeout": _env_int("DB_POOL_TIMEOUT", "30"),
+        }
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", "10"),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", "20"),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", "30"),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", "1800"),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", "1"),
+    }
+
+# --- Métricas do pool ---
+class PoolStats:
+    """Contadores de eventos do pool (por processo)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidated = 0
+
+    def incr(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+pool_stats = PoolStats()
+
+def configure_engine(engine, statement_timeout=0):
+    """Registra os ajustes por conexão (pragmas/timeouts) e os contadores do pool."""
+    backend = engine.dialect.name
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_stats.incr("connects")
+        cursor = dbapi_connection.cursor()
+        try:
+            if backend == "sqlite":
+                for pragma in SQLITE_PRAGMAS:
+                    cursor.execute(pragma)
+                cursor.execute(f"PRAGMA busy_timeout={int(statement_timeout or SQLITE_BUSY_TIMEOUT_MS)}")
+            elif backend == "mysql" and statement_timeout:
+                cursor.execute(f"SET SESSION max_execution_time = {int(statement_timeout)}")
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_stats.incr("checkouts")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_stats.incr("invalidated")
+
+def init_database(app):
+    """Configura a URI/pool a partir do ambiente e inicializa o Flask-SQLAlchemy."""
+    uri = app.config.setdefault("SQLALCHEMY_DATABASE_URI", database_uri())
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(uri))
+    app.config.setdefault("DB_STATEMENT_TIMEOUT", _env_int("DB_STATEMENT_TIMEOUT", "0"))
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(engine, app.config["DB_STATEMENT_TIMEOUT"])
+
+def pool_status(engine=None):
+    """Estado atual do pool e contadores acumulados deste processo."""
+    engine = engine or db.engine
+    pool = engine.pool
+    status = {
+        "backend": engine.dialect.name,
+        "pool": type(pool).__name__,
+        "connects": pool_stats.connects,
+        "checkouts": pool_stats.checkouts,
+        "invalidated": pool_stats.invalidated,
+    }
+    # Só o QueuePool expõe tamanho e ocupação
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    if "size" in status:
+        status["max_overflow"] = pool._max_overflow
+        status["timeout"] = pool.timeout()
+    return status
@@ -0,0 +1,163 @@
+# src/events.py
+"""Canal de eventos em tempo real do ponto (Server-Sent Events).
+
+Cada worker do gunicorn mantém um único `EventBroadcaster` que distribui os eventos
+para todas as conexões SSE abertas nele. Como o gunicorn roda vários workers, os
+eventos publicados em um worker são repassados aos outros por sockets Unix de
+datagrama em um diretório local (um socket por worker), sem depender de serviços
+externos.
+"""
+import glob
+import json
+import logging
+import os
+import queue
+import socket
+import tempfile
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# Espera entre erros seguidos de leitura do socket de repasse (dobra até o máximo)
+RELAY_ERROR_BACKOFF = 0.1
+RELAY_ERROR_BACKOFF_MAX = 5.0
+
+
+class BroadcasterFull(Exception):
+    """Limite de conexões SSE do worker atingido; o cliente deve usar o polling."""
+
+
+class EventBroadcaster:
+    def __init__(self, app=None):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._relay_socket = None
+        self._relay_pid = None
+        self.max_subscribers = 500
+        self.queue_size = 100
+        self.relay_dir = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_subscribers = app.config.setdefault("SSE_MAX_SUBSCRIBERS", 500)
+        self.queue_size = app.config.setdefault("SSE_QUEUE_SIZE", 100)
+        self.relay_dir = app.config.setdefault(
+            "SSE_RELAY_DIR", os.path.join(tempfile.gettempdir(), "samabaja-sse")
+        )
+        app.extensions["event_broadcaster"] = self
+
+    # --- Assinantes locais ---
+    def subscribe(self):
+        """Registra uma nova conexão e retorna a fila de eventos dela."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise BroadcasterFull()
+            subscriber = queue.Queue(maxsize=self.queue_size)
+            self._subscribers.add(subscriber)
+        self._ensure_relay_listener()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # Cliente lento: descarta o evento; ele se ressincroniza pelo cursor da API
+                pass
+
+    # --- Publicação ---
+    def publish(self, event_type, data=None):
+        """Envia um evento para os assinantes deste worker e dos demais."""
+        event = {"type": event_type, "data": data or {}}
+        self._deliver(event)
+        self._relay(event)
+
+    # --- Repasse entre workers ---
+    def _own_socket_path(self):
+        return os.path.join(self.relay_dir, f"{os.getpid()}.sock")
+
+    def _ensure_relay_listener(self):
+        """Abre (uma vez por processo) o socket que recebe eventos dos outros workers."""
+        if not self.relay_dir or not hasattr(socket, "AF_UNIX"):
+            return
+        if self._relay_pid == os.getpid():
+            return
+        with self._lock:
+            if self._relay_pid == os.getpid():
+                return
+            os.makedirs(self.relay_dir, exist_ok=True)
+            path = self._own_socket_path()
+            if os.path.exists(path):
+                os.unlink(path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(path)
+            self._relay_socket = sock
+            self._relay_pid = os.getpid()
+        thread = threading.Thread(target=self._relay_loop, args=(sock,), name="sse-relay", daemon=True)
+        thread.start()
+
+    def _relay_loop(self, sock):
+        backoff = RELAY_ERROR_BACKOFF
+        while True:
+            try:
+                payload = sock.recv(65536)
+            except OSError as exc:
+                if sock.fileno() == -1:
+                    return
+                # Erro persistente com o socket aberto: espera antes de tentar de novo,
+                # para não ocupar a CPU do worker num laço de erros
+                if backoff == RELAY_ERROR_BACKOFF:
+                    logger.warning("Erro ao ler o socket de repasse de eventos: %s", exc)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, RELAY_ERROR_BACKOFF_MAX)
+                continue
+            backoff = RELAY_ERROR_BACKOFF
+            try:
+                self._deliver(json.loads(payload.decode("utf-8")))
+            except ValueError:
+                pass  # datagrama inválido: descarta
+
+    def _relay(self, event):
+        if not self.relay_dir or not hasattr(socket, "AF_UNIX") or not os.path.isdir(self.relay_dir):
+            return
+        payload = json.dumps(event).encode("utf-8")
+        own_path = self._own_socket_path()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            for path in glob.glob(os.path.join(self.relay_dir, "*.sock")):
+                if path == own_path:
+                    continue
+                try:
+                    sock.sendto(payload, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker que já morreu: remove o socket órfão
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                except OSError:
+                    # Fila do outro worker cheia: o evento é perdido, o polling cobre
+                    pass
+        finally:
+            sock.close()
+
+
+broadcaster = EventBroadcaster()
+
+
+def format_sse(event):
+    """Serializa um evento no formato text/event-stream."""
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -0,0 +1,88 @@
+# src/export.py
+"""Exportação dos registros de ponto em CSV e NDJSON, em streaming.
+
+A consulta é uma projeção (sem carregar objetos TimeEntry/User) lida em lotes com
+`yield_per`, o que no MySQL usa um cursor do lado do servidor. Cada lote vira um
+pedaço da resposta, e a duração é calculada durante o streaming. Assim, exportar
+uma temporada inteira usa memória constante e o primeiro byte sai logo.
+
+No CSV, textos que começam com `=`, `+`, `-`, `@`, tabulação ou CR (descrição,
+nome de usuário) ganham um `'` na frente, para o Excel/LibreOffice não os
+executarem como fórmula. O NDJSON sai sem alteração.
+"""
+import csv
+import io
+import json
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from src.extensions import db
+from src.models.user import User
+from src.models.ponto import TimeEntry
+
+EXPORT_BATCH = 1000
+EXPORT_FIELDS = ("id", "user_id", "username", "sector", "entry_type", "start_time", "end_time",
+                 "duration_minutes", "description", "registered_by")
+
+def export_statement(start=None, end=None, user_id=None, sector=None, entry_type=None):
+    """Projeção dos registros filtrados, em ordem cronológica.
+
+    `start`/`end` são datetimes (UTC) aplicados ao início do registro, `end` exclusivo.
+    """
+    reporter = aliased(User)
+    statement = (
+        select(TimeEntry.id, TimeEntry.user_id, User.username, User.sector, TimeEntry.entry_type,
+               TimeEntry.start_time, TimeEntry.end_time, TimeEntry.description,
+               reporter.username.label("registered_by"))
+        .join(User, User.id == TimeEntry.user_id)
+        .outerjoin(reporter, reporter.id == TimeEntry.registered_by_id)
+        .order_by(TimeEntry.start_time, TimeEntry.id)
+    )
+    if start is not None:
+        statement = statement.where(TimeEntry.start_time >= start)
+    if end is not None:
+        statement = statement.where(TimeEntry.start_time < end)
+    if user_id is not None:
+        statement = statement.where(TimeEntry.user_id == user_id)
+    if sector is not None:
+        statement = statement.where(User.sector == sector)
+    if entry_type is not None:
+        statement = statement.where(TimeEntry.entry_type == entry_type)
+    return statement
+
+def _batches(statement):
+    result = db.session.execute(statement, execution_options={"yield_per": EXPORT_BATCH})
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+def _values(row):
+    duration = int((row.end_time - row.start_time).total_seconds() / 60) if row.end_time else None
+    return (row.id, row.user_id, row.username, row.sector.value, row.entry_type.value,
+            row.start_time.isoformat(), row.end_time.isoformat() if row.end_time else None,
+            duration, row.description, row.registered_by)
+
+# Início de célula que planilhas interpretam como fórmula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def iter_csv(statement):
+    """Gera o CSV em pedaços (cabeçalho + um pedaço por lote)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+    for batch in _batches(statement):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(value) for value in _values(row)] for row in batch)
+        yield buffer.getvalue()
+
+def iter_ndjson(statement):
+    """Gera um objeto JSON por linha, um pedaço por lote."""
+    for batch in _batches(statement):
+        yield "".join(json.dumps(dict(zip(EXPORT_FIELDS, _values(row))), ensure_ascii=False) + "\n" for row in batch)
@@ -0,0 +1,103 @@
+# src/hashing.py
+"""Hash de senhas (bcrypt) fora do fluxo principal dos workers.
+
+O bcrypt é propositalmente lento. Para que uma rajada de logins (ou bots em
+`/auth/login`) não ocupe todos os workers, os hashes rodam num pool de
+`BCRYPT_WORKERS` threads do sistema operacional, com um teto de tarefas pendentes
+(`BCRYPT_MAX_PENDING`): quando a fila está cheia, ou o hash não termina em
+`BCRYPT_TIMEOUT_SECONDS`, `HashingBusy` é levantada e o login falha rápido (503)
+em vez de esperar. A vaga na fila só é liberada quando o hash termina de fato,
+mesmo que quem o pediu já tenha desistido por tempo.
+
+Sob workers gevent o pool é o `ThreadPoolExecutor` do gevent (threads reais, do
+mesmo tamanho), já que o da biblioteca padrão com monkey-patching viraria
+greenlets e o bcrypt bloquearia o processo inteiro.
+
+O custo é configurável por `BCRYPT_LOG_ROUNDS`; hashes com custo diferente do
+configurado são refeitos no próximo login (`needs_rehash`).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from src.extensions import bcrypt
+
+class HashingBusy(Exception):
+    """Fila de hashing cheia: a requisição deve falhar rápido (503)."""
+
+def _gevent_active():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self.log_rounds = 12
+        self.workers = 2
+        self.max_pending = 16
+        self.timeout = 30
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.log_rounds = app.config.setdefault("BCRYPT_LOG_ROUNDS", 12)
+        self.workers = app.config.setdefault("BCRYPT_WORKERS", 2)
+        self.max_pending = app.config.setdefault("BCRYPT_MAX_PENDING", 16)
+        self.timeout = app.config.setdefault("BCRYPT_TIMEOUT_SECONDS", 30)
+        self._executor = None
+        self._slots = None
+        app.extensions["password_hasher"] = self
+
+    # --- Execução limitada ---
+    def _ensure_pool(self):
+        if self._slots is None:
+            with self._lock:
+                if self._slots is None:
+                    if _gevent_active():
+                        from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+                        self._executor = NativeThreadPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+                    self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _run(self, fn, *args):
+        self._ensure_pool()
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A vaga volta quando o hash termina (ou é cancelado), não quando desistimos dele
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingBusy() from None
+
+    @property
+    def pending(self):
+        """Quantidade de hashes em andamento ou na fila."""
+        if self._slots is None:
+            return 0
+        return self.max_pending - self._slots._value
+
+    # --- API ---
+    def hash(self, password):
+        return self._run(bcrypt.generate_password_hash, password, self.log_rounds).decode("utf-8")
+
+    def check(self, pw_hash, password):
+        return self._run(bcrypt.check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """True se o hash foi gerado com um custo diferente do configurado."""
+        try:
+            return int(pw_hash.split("$")[2]) != self.log_rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,254 @@
+# src/jobs.py
+"""Tarefas em segundo plano com fila no banco.
+
+Rotas e comandos chamam `enqueue("nome", **parâmetros)`, que grava um `Job` na
+mesma transação da requisição, e respondem na hora. O worker (`flask run-jobs`)
+pega as tarefas pendentes e as executa num pool de threads (ou de processos, com
+`--processes`).
+
+*   Cada tarefa é reservada com um UPDATE condicional (`status = PENDING`), então
+    vários workers podem rodar ao mesmo tempo sem executar a mesma tarefa duas vezes.
+*   Em caso de erro a tarefa volta para a fila com espera exponencial, até
+    `max_attempts`; depois fica como FAILED com a mensagem do erro.
+*   Tarefas presas em RUNNING (worker derrubado) voltam para a fila após `stale_after`.
+*   A duração de cada execução fica em `duration_ms`; o status pode ser consultado
+    em `/jobs/<id>`.
+
+Em produção o worker é um processo filho do master do gunicorn (`WorkerSupervisor`,
+iniciado em `when_ready` e encerrado em `on_exit` no `gunicorn.conf.py`): se ele
+cair, é reiniciado.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from src.extensions import db
+from src.models.job import Job, JobStatus
+
+RETRY_BASE_SECONDS = 10
+
+# nome -> (função, tentativas)
+JOBS = {}
+
+def job(name, max_attempts=3):
+    """Registra `fn(**payload)` como a tarefa `name`; o retorno (JSON) vira o resultado."""
+    def decorator(fn):
+        JOBS[name] = (fn, max_attempts)
+        return fn
+    return decorator
+
+def enqueue(job_name, created_by=None, **payload):
+    """Coloca uma tarefa na fila. Só é gravada no commit da sessão de quem chamou."""
+    if job_name not in JOBS:
+        raise KeyError(f"Tarefa desconhecida: {job_name}")
+    queued = Job(name=job_name, payload=json.dumps(payload), max_attempts=JOBS[job_name][1],
+                 created_by_id=getattr(created_by, "id", created_by))
+    db.session.add(queued)
+    return queued
+
+# --- Worker ---
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"[:64]
+
+def claim_jobs(limit, owner):
+    """Reserva até `limit` tarefas prontas para executar e retorna os ids."""
+    now = datetime.utcnow()
+    candidates = db.session.execute(
+        select(Job.id).where(Job.status == JobStatus.PENDING, Job.run_after <= now)
+        .order_by(Job.run_after, Job.id).limit(limit)
+    ).scalars().all()
+    claimed = []
+    for job_id in candidates:
+        result = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == JobStatus.PENDING)
+            .values(status=JobStatus.RUNNING, locked_by=owner, started_at=now, attempts=Job.attempts + 1)
+        )
+        if result.rowcount == 1:
+            claimed.append(job_id)
+    db.session.commit()
+    return claimed
+
+def requeue_stale(stale_after):
+    """Devolve à fila tarefas em RUNNING há mais de `stale_after` segundos."""
+    limit = datetime.utcnow() - timedelta(seconds=stale_after)
+    result = db.session.execute(
+        update(Job).where(Job.status == JobStatus.RUNNING, Job.started_at < limit)
+        .values(status=JobStatus.PENDING, locked_by=None, run_after=datetime.utcnow())
+    )
+    db.session.commit()
+    return result.rowcount
+
+def run_job(job_id):
+    """Executa uma tarefa já reservada e grava o resultado (precisa de app context)."""
+    queued = db.session.get(Job, job_id)
+    fn, _ = JOBS.get(queued.name, (None, None))
+    start = time.perf_counter()
+    try:
+        if fn is None:
+            raise KeyError(f"Tarefa desconhecida: {queued.name}")
+        result = fn(**queued.get_payload())
+    except Exception:
+        db.session.rollback()
+        queued = db.session.get(Job, job_id)
+        queued.error = traceback.format_exc(limit=5)[-4000:]
+        if queued.attempts < queued.max_attempts:
+            queued.status = JobStatus.PENDING
+            queued.run_after = datetime.utcnow() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (queued.attempts - 1))
+        else:
+            queued.status = JobStatus.FAILED
+    else:
+        queued.status = JobStatus.SUCCEEDED
+        queued.result = json.dumps(result) if result is not None else None
+        queued.error = None
+    queued.duration_ms = int((time.perf_counter() - start) * 1000)
+    queued.finished_at = datetime.utcnow()
+    queued.locked_by = None
+    db.session.commit()
+    return queued.status
+
+# Aplicação usada pelas threads/processos do pool (definida em `run_worker`;
+# os processos filhos a herdam no fork)
+_app = None
+
+def _execute(job_id):
+    with _app.app_context():
+        if os.getpid() != _app.config.get("_JOBS_PARENT_PID"):
+            # Processo filho: não reutiliza conexões abertas pelo processo pai
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+            _app.config["_JOBS_PARENT_PID"] = os.getpid()
+        return run_job(job_id)
+
+def run_worker(app, concurrency=2, processes=False, poll_interval=1.0, stale_after=600, once=False, log=print):
+    """Laço do worker: reserva tarefas conforme há vagas no pool e as executa."""
+    global _app
+    _app = app
+    app.config["_JOBS_PARENT_PID"] = os.getpid()
+    owner = worker_id()
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    running = {}
+    last_stale_check = 0
+    with pool_class(max_workers=concurrency) as pool:
+        while True:
+            with app.app_context():
+                if time.monotonic() - last_stale_check > 60:
+                    requeued = requeue_stale(stale_after)
+                    if requeued:
+                        log(f"{requeued} tarefa(s) presa(s) devolvida(s) à fila")
+                    last_stale_check = time.monotonic()
+                free = concurrency - len(running)
+                for job_id in claim_jobs(free, owner) if free > 0 else []:
+                    running[pool.submit(_execute, job_id)] = job_id
+            if not running:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+            done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id = running.pop(future)
+                try:
+                    log(f"tarefa {job_id}: {future.result().name}")
+                except Exception as exc:
+                    log(f"tarefa {job_id}: erro no worker ({exc})")
+
+class WorkerSupervisor:
+    """Mantém `command` rodando num processo filho, reiniciando-o quando ele termina.
+
+    A espera antes de reiniciar dobra a cada saída rápida (até `max_delay`) e volta
+    ao início quando o processo ficou de pé por `healthy_after` segundos.
+    """
+
+    def __init__(self, command, log=print, min_delay=1.0, max_delay=60.0, healthy_after=30.0, check_interval=1.0):
+        self.command = command
+        self.log = log
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.healthy_after = healthy_after
+        self.check_interval = check_interval
+        self.process = None
+        self.restarts = 0
+        self._stopping = threading.Event()
+        self._owner_pid = None
+
+    @classmethod
+    def for_app(cls, app_path="src.main:app", concurrency=2, **kwargs):
+        command = [sys.executable, "-m", "flask", "--app", app_path, "run-jobs", "--concurrency", str(concurrency)]
+        return cls(command, **kwargs)
+
+    def start(self):
+        self._owner_pid = os.getpid()
+        threading.Thread(target=self._run, name="job-worker-supervisor", daemon=True).start()
+
+    def _run(self):
+        delay = self.min_delay
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            self.process = subprocess.Popen(self.command)
+            self.log(f"worker de tarefas iniciado (pid {self.process.pid})")
+            # poll() em vez de wait(): o master do gunicorn também recolhe filhos (waitpid(-1)),
+            # e aí poll() só informa que o processo terminou, sem o código de saída
+            while self.process.poll() is None and not self._stopping.is_set():
+                if os.getpid() != self._owner_pid:
+                    # Cópia da thread herdada por um processo criado por fork (com gevent as
+                    # threads são greenlets e vão junto): fica parada em vez de terminar, porque
+                    # o threading do filho não a conhece
+                    threading.Event().wait()
+                self._stopping.wait(self.check_interval)
+            if self._stopping.is_set():
+                self._terminate(self.process)  # iniciado enquanto `stop` rodava
+                return
+            delay = self.min_delay if time.monotonic() - started >= self.healthy_after else delay
+            self.log(f"worker de tarefas terminou (código {self.process.returncode}); reiniciando em {delay:.0f} s")
+            self.restarts += 1
+            if self._stopping.wait(delay):
+                return
+            delay = min(delay * 2, self.max_delay)
+
+    def stop(self, timeout=10):
+        """Encerra o worker com SIGTERM (SIGKILL se não sair em `timeout` segundos)."""
+        self._stopping.set()
+        self._terminate(self.process, timeout)
+
+    @staticmethod
+    def _terminate(process, timeout=10):
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        except ChildProcessError:
+            pass
+
+# --- Tarefas ---
+@job("avatar_thumbnails")
+def _avatar_thumbnails(name):
+    from flask import current_app
+    from src.avatars import generate_thumbnails
+    generate_thumbnails(current_app.config["AVATAR_DIR"], name)
+
+@job("avatar_release")
+def _avatar_release(value):
+    from src.avatars import delete_if_unreferenced
+    return {"deleted": delete_if_unreferenced(value)}
+
+@job("rebuild_daily_hours", max_attempts=1)
+def _rebuild_daily_hours():
+    from src.models.ponto import rebuild_daily_hours
+    with db.engine.begin() as connection:
+        return {"rows": rebuild_daily_hours(connection)}
+
+@job("rebuild_search_index", max_attempts=1)
+def _rebuild_search_index():
+    from src.search import rebuild_search_index
+    with db.engine.begin() as connection:
+        rebuild_search_index(connection)
@@ -1,15 +1,23 @@
 import os
 import sys
+import tempfile
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory, render_template, g # Import g for context
 from flask_login import current_user # Import current_user
 from datetime import datetime # Import datetime for footer year
+from markupsafe import Markup, escape
 
 # Import extensions from the new file
 from src.extensions import db, login_manager, bcrypt
+from src.database import init_database
+from src.cli import register_commands
+from src.events import broadcaster
+from src.hashing import password_hasher
+from src import avatars, assets, metrics
 from src.models.user import User, UserRole # Import User model and UserRole
+from src.models.user import load_session_user, pending_users_count, user_cache, pending_count_cache, user_versions
 
 # Import specific blueprints
 from src.routes.auth import auth_bp
@@ -18,6 +26,8 @@ from src.routes.ordem_servico import ordem_bp
 from src.routes.admin import admin_bp
 from src.routes.docs import docs_bp
 from src.routes.user import user_bp
+from src.routes.search import search_bp
+from src.routes.jobs import jobs_bp
 
 # Create a main blueprint for general pages
 from flask import Blueprint
@@ -38,15 +48,47 @@ def create_app():
                 template_folder=os.path.join(os.path.dirname(__file__), 'templates')) # Add template_folder
 
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY") or "a_very_secret_key_that_should_be_in_env" # Use environment variable or default
-    app.config["SQLALCHEMY_DATABASE_URI"] = f"mysql+pymysql://{os.getenv('DB_USERNAME', 'flask_user')}:{os.getenv('DB_PASSWORD', 'password')}@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '3306')}/{os.getenv('DB_NAME', 'mydb')}"
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # URI e pool do banco vêm do ambiente (DATABASE_URL, DB_*); ver src/database.py
+    # Custo do bcrypt e limites do pool de hashing (ver src/hashing.py)
+    app.config["BCRYPT_LOG_ROUNDS"] = int(os.getenv("BCRYPT_LOG_ROUNDS", "12"))
+    app.config["BCRYPT_WORKERS"] = int(os.getenv("BCRYPT_WORKERS", "2"))
+    app.config["BCRYPT_MAX_PENDING"] = int(os.getenv("BCRYPT_MAX_PENDING", "16"))
+    # Segundos que o usuário da sessão e o contador de pendentes ficam em cache (0 desativa)
+    app.config["USER_CACHE_TTL"] = int(os.getenv("USER_CACHE_TTL", "30"))
+    # Versões do cache de usuários, compartilhadas pelos workers da máquina (vazio desativa)
+    app.config["USER_CACHE_DIR"] = os.getenv("USER_CACHE_DIR", os.path.join(tempfile.gettempdir(), "samabaja-user-cache"))
+    # Fotos de perfil (ver src/avatars.py)
+    if os.getenv("AVATAR_DIR"):
+        app.config["AVATAR_DIR"] = os.getenv("AVATAR_DIR")
+    app.config["AVATAR_MAX_BYTES"] = int(os.getenv("AVATAR_MAX_BYTES", str(5 * 1024 * 1024)))
+    # Saída do `flask build-assets` (ver src/assets.py)
+    if os.getenv("ASSETS_DIST_DIR"):
+        app.config["ASSETS_DIST_DIR"] = os.getenv("ASSETS_DIST_DIR")
+    # Métricas por requisição (ver src/metrics.py); METRICS_TOKEN libera o formato Prometheus sem login
+    app.config["METRICS_ENABLED"] = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "no", "off")
+    app.config["METRICS_SLOW_REQUEST_MS"] = int(os.getenv("METRICS_SLOW_REQUEST_MS", "500"))
+    app.config["METRICS_SLOW_QUERY_COUNT"] = int(os.getenv("METRICS_SLOW_QUERY_COUNT", "30"))
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN")
+    # Canal SSE do ponto: conexões por worker e intervalo do keep-alive
+    app.config["SSE_MAX_SUBSCRIBERS"] = int(os.getenv("SSE_MAX_SUBSCRIBERS", "500"))
+    app.config["SSE_HEARTBEAT_SECONDS"] = int(os.getenv("SSE_HEARTBEAT_SECONDS", "25"))
+    if os.getenv("SSE_RELAY_DIR"):
+        app.config["SSE_RELAY_DIR"] = os.getenv("SSE_RELAY_DIR")
 
     # Initialize extensions with the app
-    db.init_app(app)
+    init_database(app)
     login_manager.init_app(app)
     bcrypt.init_app(app)
+    broadcaster.init_app(app)
+    password_hasher.init_app(app)
+    avatars.init_app(app)
+    assets.init_app(app)
+    metrics.init_app(app)
 
     login_manager.login_view = "auth.login" # Redirect to login page if @login_required fails
+    user_cache.ttl = pending_count_cache.ttl = app.config["USER_CACHE_TTL"]
+    user_versions.directory = app.config["USER_CACHE_DIR"] or None
 
     @app.context_processor
     def inject_pending_users():
@@ -54,7 +96,7 @@ def create_app():
         pending_count = 0
         try:
             if current_user.is_authenticated and current_user.role == UserRole.GESTAO:
-                pending_count = User.query.filter_by(role=UserRole.PENDING).count()
+                pending_count = pending_users_count()
         except Exception:
             # Caso a consulta falhe (por exemplo, em páginas sem DB), apenas ignora
             pending_count = 0
@@ -62,7 +104,14 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return load_session_user(int(user_id))
+
+    @app.template_filter("nl2br")
+    def nl2br(value):
+        """Quebras de linha do texto viram <br> (o texto continua escapado)."""
+        if not value:
+            return ""
+        return Markup("<br>\n").join(escape(value).split("\n"))
 
     # Make current_user and UserRole available to all templates
     @app.context_processor
@@ -76,22 +125,35 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(docs_bp, url_prefix="/docs")
     app.register_blueprint(user_bp, url_prefix="/user")
+    app.register_blueprint(search_bp, url_prefix="/search")
+    app.register_blueprint(jobs_bp, url_prefix="/jobs")
     app.register_blueprint(main_bp)
 
-    with app.app_context():
-        # Import models here to ensure they are registered with SQLAlchemy before create_all
-        from src.models.user import User
-        from src.models.ponto import TimeEntry
-        from src.models.ordem_servico import OrdemServico
-        from src.models.document import Document
-        # Ensure all tables are created according to the models
-        db.create_all() 
+    # Criação/migração do esquema fica nos comandos `flask init-db` e `flask migrate`
+    # (src/cli.py): importar a aplicação não toca no banco, e os workers do
+    # gunicorn podem ser criados por fork a partir do master (--preload).
+    register_commands(app)
 
     return app
 
+def precompile_templates(app):
+    """Compila todos os templates para o cache do Jinja (no master, antes do fork).
+
+    Retorna os nomes dos templates que não compilaram; eles continuam sendo
+    compilados (e dando erro) só quando forem usados.
+    """
+    from jinja2 import TemplateError
+    failed = []
+    for name in app.jinja_env.list_templates():
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateError:
+            failed.append(name)
+    return failed
+
 app = create_app() # Create the app instance
 
 if __name__ == '__main__':
-    # db.create_all() is now called within create_app's context
+    # Crie o banco antes com `flask --app src.main:app init-db`
     app.run(host='0.0.0.0', port=5000, debug=True)
 
@@ -0,0 +1,280 @@
+# src/metrics.py
+"""Métricas por requisição: latência por endpoint e consultas SQL.
+
+`init_app` registra ganchos do Flask (início/fim de cada requisição) e eventos
+`before_cursor_execute`/`after_cursor_execute` nos engines do SQLAlchemy. Cada
+requisição soma quantas consultas fez e quanto tempo passou no banco; ao final, os
+números entram no histograma do endpoint (`request.endpoint`, então o número de
+séries é limitado pelas rotas e não pelas URLs).
+
+Requisições acima de `METRICS_SLOW_REQUEST_MS` ou com mais de
+`METRICS_SLOW_QUERY_COUNT` consultas (sinal típico de N+1) são marcadas como lentas:
+vão para o log e para a lista das últimas lentas em `/admin/metrics`.
+
+O custo é pequeno o bastante para ficar ligado em produção: um `ContextVar` e dois
+`perf_counter()` por consulta e um `bisect` sob um lock por requisição. Os números
+são por processo (cada worker do gunicorn tem os seus).
+"""
+import bisect
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from flask import request, current_app
+from sqlalchemy import event
+from src.extensions import db
+
+# Limites superiores (s) dos buckets do histograma de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Conexões longas (SSE) ficam fora do histograma
+EXCLUDED_ENDPOINTS = {"ponto.stream"}
+RECENT_SLOW = 50
+
+class RequestStats:
+    """Contadores de um par (endpoint, método)."""
+
+    __slots__ = ("buckets", "count", "errors", "slow", "total_seconds", "max_seconds",
+                 "queries", "max_queries", "sql_seconds")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # o último é o +Inf
+        self.count = 0
+        self.errors = 0
+        self.slow = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.sql_seconds = 0.0
+
+    def quantile(self, q):
+        """Estimativa do quantil `q` pelo histograma (interpolação linear no bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, in_bucket in enumerate(self.buckets):
+            if in_bucket and seen + in_bucket >= rank:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max_seconds
+                return lower + (upper - lower) * (rank - seen) / in_bucket
+            seen += in_bucket
+        return self.max_seconds
+
+    def to_dict(self):
+        count = self.count or 1
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "slow": self.slow,
+            "avg_ms": round(self.total_seconds / count * 1000, 2),
+            "p50_ms": _ms(self.quantile(0.50)),
+            "p95_ms": _ms(self.quantile(0.95)),
+            "p99_ms": _ms(self.quantile(0.99)),
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "queries_per_request": round(self.queries / count, 2),
+            "max_queries": self.max_queries,
+            "sql_ms_per_request": round(self.sql_seconds / count * 1000, 2),
+        }
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+class _Current:
+    """Medições da requisição em andamento."""
+
+    __slots__ = ("start", "queries", "sql_seconds", "status")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.status = 500
+
+_current = ContextVar("request_metrics", default=None)
+
+class MetricsRegistry:
+    """Histogramas por endpoint e últimas requisições lentas (por processo)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slow_request_ms = 500
+        self.slow_query_count = 30
+        self.started_at = time.time()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+            self.recent_slow = deque(maxlen=RECENT_SLOW)
+            self.background_queries = 0
+            self.background_sql_seconds = 0.0
+
+    def record(self, endpoint, method, current, path):
+        elapsed = time.perf_counter() - current.start
+        slow = (elapsed * 1000 >= self.slow_request_ms or current.queries > self.slow_query_count)
+        with self.lock:
+            stats = self.endpoints.get((endpoint, method))
+            if stats is None:
+                stats = self.endpoints[(endpoint, method)] = RequestStats()
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            stats.count += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            stats.queries += current.queries
+            stats.max_queries = max(stats.max_queries, current.queries)
+            stats.sql_seconds += current.sql_seconds
+            if current.status >= 500:
+                stats.errors += 1
+            if slow:
+                stats.slow += 1
+                self.recent_slow.appendleft({
+                    "at": time.time(),
+                    "endpoint": endpoint,
+                    "method": method,
+                    "path": path,
+                    "status": current.status,
+                    "ms": round(elapsed * 1000, 1),
+                    "queries": current.queries,
+                    "sql_ms": round(current.sql_seconds * 1000, 1),
+                })
+        return slow, elapsed
+
+    def record_background_query(self, seconds):
+        with self.lock:
+            self.background_queries += 1
+            self.background_sql_seconds += seconds
+
+    def snapshot(self):
+        """Cópia dos números atuais, ordenada pelo tempo total gasto em cada endpoint."""
+        with self.lock:
+            rows = [dict(endpoint=endpoint, method=method, total_seconds=stats.total_seconds, **stats.to_dict())
+                    for (endpoint, method), stats in self.endpoints.items()]
+            recent = list(self.recent_slow)
+            background = {"queries": self.background_queries,
+                          "sql_ms": round(self.background_sql_seconds * 1000, 1)}
+        rows.sort(key=lambda row: row["total_seconds"], reverse=True)
+        return {
+            "uptime_seconds": int(time.time() - self.started_at),
+            "slow_request_ms": self.slow_request_ms,
+            "slow_query_count": self.slow_query_count,
+            "endpoints": rows,
+            "recent_slow": recent,
+            "background": background,
+        }
+
+    def prometheus(self, pool=None):
+        """Texto no formato de exposição do Prometheus."""
+        with self.lock:
+            items = [(key, _copy(stats)) for key, stats in self.endpoints.items()]
+            background = (self.background_queries, self.background_sql_seconds)
+        lines = [
+            "# HELP samabaja_http_request_duration_seconds Latência das requisições por endpoint.",
+            "# TYPE samabaja_http_request_duration_seconds histogram",
+        ]
+        for (endpoint, method), stats in items:
+            labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+            cumulative = 0
+            for bound, in_bucket in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+                cumulative += in_bucket
+                lines.append(f'samabaja_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"samabaja_http_request_duration_seconds_sum{{{labels}}} {stats.total_seconds:.6f}")
+            lines.append(f"samabaja_http_request_duration_seconds_count{{{labels}}} {stats.count}")
+        for name, kind, help_text, attr in (
+            ("samabaja_http_errors_total", "counter", "Respostas 5xx por endpoint.", "errors"),
+            ("samabaja_http_slow_requests_total", "counter", "Requisições marcadas como lentas.", "slow"),
+            ("samabaja_sql_queries_total", "counter", "Consultas SQL feitas pelas requisições.", "queries"),
+            ("samabaja_sql_duration_seconds_total", "counter", "Tempo gasto em consultas SQL.", "sql_seconds"),
+            ("samabaja_sql_queries_max", "gauge", "Maior número de consultas numa requisição.", "max_queries"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (endpoint, method), stats in items:
+                value = getattr(stats, attr)
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f'{name}{{endpoint="{_escape(endpoint)}",method="{method}"}} {value}')
+        lines += [
+            "# HELP samabaja_sql_background_queries_total Consultas SQL fora de requisições (CLI, tarefas).",
+            "# TYPE samabaja_sql_background_queries_total counter",
+            f"samabaja_sql_background_queries_total {background[0]}",
+        ]
+        for name, value in (pool or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"# TYPE samabaja_db_pool_{name} gauge")
+                lines.append(f"samabaja_db_pool_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+def _copy(stats):
+    clone = RequestStats()
+    for attr in RequestStats.__slots__:
+        value = getattr(stats, attr)
+        setattr(clone, attr, list(value) if isinstance(value, list) else value)
+    return clone
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+registry = MetricsRegistry()
+
+# --- Ganchos do SQLAlchemy ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # O início fica no ExecutionContext da consulta (mais barato que `conn.info`)
+    context._metrics_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    current = _current.get()
+    if current is None:
+        registry.record_background_query(elapsed)
+        return
+    current.queries += 1
+    current.sql_seconds += elapsed
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# --- Ganchos do Flask ---
+def _before_request():
+    if request.endpoint in EXCLUDED_ENDPOINTS:
+        return
+    request.environ["metrics.token"] = _current.set(_Current())
+
+def _after_request(response):
+    current = _current.get()
+    if current is not None:
+        current.status = response.status_code
+    return response
+
+def _teardown_request(exc):
+    # Roda depois do streaming (stream_with_context), então inclui o tempo do corpo
+    token = request.environ.pop("metrics.token", None)
+    current = _current.get()
+    if token is None or current is None:
+        return
+    try:
+        if exc is not None:
+            current.status = 500
+        slow, elapsed = registry.record(request.endpoint or "<sem rota>", request.method, current, request.path)
+        if slow:
+            current_app.logger.warning("Requisição lenta: %s %s %d ms, %d consulta(s) SQL, %.1f ms no banco",
+                                       request.method, request.path, elapsed * 1000,
+                                       current.queries, current.sql_seconds * 1000)
+    finally:
+        _current.reset(token)
+
+def init_app(app):
+    """Liga as métricas (`METRICS_ENABLED`) na aplicação e nos engines do banco."""
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    registry.slow_request_ms = app.config.get("METRICS_SLOW_REQUEST_MS", registry.slow_request_ms)
+    registry.slow_query_count = app.config.get("METRICS_SLOW_QUERY_COUNT", registry.slow_query_count)
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
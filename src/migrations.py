@@ -0,0 +1,179 @@
+# src/migrations.py
+"""Migrações versionadas do esquema do banco.
+
+`db.create_all()` só cria tabelas que ainda não existem: não adiciona índices nem
+colunas a tabelas de bancos já em uso. Cada migração abaixo é idempotente (funciona
+tanto num banco antigo quanto num recém-criado pelo `create_all`) e a versão
+aplicada fica registrada na tabela `schema_version`.
+"""
+from datetime import datetime
+from sqlalchemy import select, insert, inspect, text
+from src.extensions import db
+
+class SchemaVersion(db.Model):
+    __tablename__ = "schema_version"
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(255), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SchemaVersion {self.version}: {self.description}>"
+
+# Lista de (versão, descrição, função); preenchida pelo decorador `migration`
+MIGRATIONS = []
+
+def migration(version, description):
+    """Registra uma função `fn(connection)` como a migração `version`."""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return decorator
+
+def create_missing_indexes(connection, table, *names):
+    """Cria os índices `names` declarados no modelo de `table` que ainda não existem no banco.
+
+    Cada migração nomeia só os índices que ela introduz: o modelo descreve o esquema
+    final, e um índice de uma migração posterior pode usar colunas que ainda não existem.
+    """
+    declared = {index.name: index for index in table.indexes}
+    for name in names:
+        declared[name].create(connection, checkfirst=True)
+
+def add_missing_columns(connection, table, *column_names):
+    """Adiciona a uma tabela existente as colunas (anuláveis) declaradas no modelo."""
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    preparer = connection.dialect.identifier_preparer
+    for name in column_names:
+        if name in existing:
+            continue
+        column = table.columns[name]
+        column_type = column.type.compile(dialect=connection.dialect)
+        connection.execute(text(
+            f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}"
+        ))
+
+def drop_columns(connection, table_name, *column_names):
+    """Remove de uma tabela existente as colunas que saíram do modelo (se ainda existirem)."""
+    existing = {column["name"] for column in inspect(connection).get_columns(table_name)}
+    preparer = connection.dialect.identifier_preparer
+    for name in column_names:
+        if name in existing:
+            connection.execute(text(f"ALTER TABLE {preparer.quote(table_name)} DROP COLUMN {preparer.quote(name)}"))
+
+# Nota gravada na descrição dos turnos fechados automaticamente pela migração 6
+STRANDED_SHIFT_NOTE = "[Saída registrada pela migração 6: havia outro turno aberto mais recente]"
+
+# --- Migrações ---
+@migration(1, "Índices compostos para as consultas frequentes")
+def _hot_query_indexes(connection):
+    from src.models.ponto import TimeEntry
+    from src.models.ordem_servico import OrdemServico
+    from src.models.document import Document
+    create_missing_indexes(connection, TimeEntry.__table__, "ix_time_entry_user_type_start", "ix_time_entry_type_start")
+    create_missing_indexes(connection, OrdemServico.__table__,
+                           "ix_ordem_servico_setor_status_data", "ix_ordem_servico_data_criacao")
+    create_missing_indexes(connection, Document.__table__, "ix_document_updated_at")
+
+@migration(2, "HTML pré-renderizado dos documentos")
+def _document_html_cache(connection):
+    from src.models.document import Document
+    add_missing_columns(connection, Document.__table__, "content_html", "content_hash")
+
+@migration(3, "Índice de busca textual (FULLTEXT no MySQL, FTS5 no SQLite)")
+def _search_index(connection):
+    from src.search import create_search_index
+    create_search_index(connection)
+
+@migration(4, "Totais diários de horas (daily_hours)")
+def _daily_hours(connection):
+    from src.models.ponto import DailyHours
+    # Preenchida pela migração 7, que recalcula a tabela com as colunas novas de `user`
+    DailyHours.__table__.create(connection, checkfirst=True)
+
+@migration(5, "Fila de tarefas em segundo plano (job)")
+def _jobs(connection):
+    from src.models.job import Job
+    Job.__table__.create(connection, checkfirst=True)
+
+@migration(6, "Um turno aberto por usuário (time_entry.open_user_id único)")
+def _open_shift_guard(connection):
+    from flask import current_app
+    from sqlalchemy import update, bindparam, func
+    from src.models.ponto import TimeEntry, EntryType
+    table = TimeEntry.__table__
+    add_missing_columns(connection, table, "open_user_id")
+    # Só o turno aberto mais recente de cada usuário recebe a marca (é o que o quadro
+    # de presença mostra). Os mais antigos, abertos em duplicidade antes da trava, não
+    # poderiam mais ser fechados: são fechados aqui com duração zero e uma nota.
+    latest, stranded = {}, []
+    for entry_id, user_id in connection.execute(
+        select(table.c.id, table.c.user_id)
+        .where(table.c.entry_type == EntryType.ENTRADA, table.c.end_time.is_(None))
+        .order_by(table.c.start_time, table.c.id)
+    ):
+        if user_id in latest:
+            stranded.append(latest[user_id])
+        latest[user_id] = entry_id
+    connection.execute(update(table).where(table.c.open_user_id.is_not(None)).values(open_user_id=None))
+    if latest:
+        connection.execute(update(table).where(table.c.id == bindparam("entry")).values(open_user_id=bindparam("owner")),
+                           [{"entry": entry_id, "owner": user_id} for user_id, entry_id in latest.items()])
+    if stranded:
+        connection.execute(update(table).where(table.c.id.in_(stranded)).values(
+            end_time=table.c.start_time,
+            description=func.coalesce(table.c.description.concat("\n"), "").concat(STRANDED_SHIFT_NOTE),
+        ))
+        current_app.logger.warning("Migração 6: %d turno(s) aberto(s) em duplicidade fechado(s) com duração zero "
+                                   "(time_entry.id %s); confira e corrija as saídas manualmente.",
+                                   len(stranded), ", ".join(map(str, sorted(stranded))))
+    create_missing_indexes(connection, table, "ux_time_entry_open_user")
+
+@migration(7, "Banco de horas pelo horário de cada dia (faltas contam)")
+def _expected_hours_from_schedule(connection):
+    from src.models.user import User
+    from src.models.ponto import rebuild_daily_hours
+    # Os minutos esperados deixam de ser gravados (só existiam nos dias com turno) e
+    # passam a sair do horário; o saldo conta a partir do primeiro turno do usuário.
+    add_missing_columns(connection, User.__table__, "first_shift_day")
+    drop_columns(connection, "user", "bank_of_hours")
+    drop_columns(connection, "daily_hours", "expected_minutes")
+    # Também conta os turnos fechados pela migração 6
+    rebuild_daily_hours(connection)
+
+@migration(8, "Presença lida do turno aberto (time_entry.open_user_id)")
+def _presence_from_open_shift(connection):
+    from src.models.ponto import TimeEntry
+    # O quadro não grava mais o turno aberto em user_presence: as colunas antigas são
+    # esvaziadas (a chave estrangeira não deixa removê-las no SQLite) para não prender
+    # registros de ponto apagados depois.
+    inspector = inspect(connection)
+    existing = ({column["name"] for column in inspector.get_columns("user_presence")}
+                if inspector.has_table("user_presence") else set())
+    stale = [name for name in ("entry_id", "clocked_in_at") if name in existing]
+    if stale:
+        preparer = connection.dialect.identifier_preparer
+        assignments = ", ".join(f"{preparer.quote(name)} = NULL" for name in stale)
+        connection.execute(text(f"UPDATE {preparer.quote('user_presence')} SET {assignments}"))
+    create_missing_indexes(connection, TimeEntry.__table__, "ix_time_entry_type_end")
+
+# --- Execução ---
+def applied_versions(bind):
+    SchemaVersion.__table__.create(bind, checkfirst=True)
+    with bind.connect() as connection:
+        return set(connection.execute(select(SchemaVersion.version)).scalars())
+
+def apply_migrations(bind=None):
+    """Aplica, em ordem, as migrações pendentes. Retorna as versões aplicadas."""
+    bind = bind if bind is not None else db.engine
+    done = applied_versions(bind)
+    applied = []
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in done:
+            continue
+        with bind.begin() as connection:
+            fn(connection)
+            connection.execute(insert(SchemaVersion.__table__).values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        applied.append(version)
+    return applied
@@ -1,10 +1,52 @@
 from datetime import datetime
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import load_only, joinedload
+from sqlalchemy.dialects import mysql
 from src.models.user import db, User # Import db instance and User for relationships
+import hashlib
+import threading
+import markdown
+
+def render_markdown(content):
+    return markdown.markdown(content) if content else ""
+
+def content_digest(content):
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+class MarkdownCache:
+    """LRU limitado de HTML renderizado, indexado pelo hash do conteúdo.
+
+    Cobre documentos criados antes do HTML ser salvo no banco (content_html vazio).
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, content):
+        digest = content_digest(content)
+        with self._lock:
+            html = self._items.get(digest)
+            if html is not None:
+                self._items.move_to_end(digest)
+                return html
+        html = render_markdown(content)
+        with self._lock:
+            self._items[digest] = html
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return html
+
+markdown_cache = MarkdownCache()
 
 class Document(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=True) # Store content as Markdown or plain text
+    # HTML pré-renderizado do conteúdo e o hash do Markdown que o gerou
+    content_html = db.Column(db.Text().with_variant(mysql.MEDIUMTEXT(), "mysql"), nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True)
     creator_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     last_editor_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -16,9 +58,33 @@ class Document(db.Model):
     creator = db.relationship("User", foreign_keys=[creator_id], backref=db.backref("created_documents", lazy=True))
     last_editor = db.relationship("User", foreign_keys=[last_editor_id], backref=db.backref("edited_documents", lazy=True))
 
+    __table_args__ = (
+        # Lista de documentos ordenada pela última atualização
+        db.Index("ix_document_updated_at", "updated_at"),
+    )
+
     def __repr__(self):
         return f"<Document {self.id}: {self.title}>"
 
+    @classmethod
+    def summary_query(cls):
+        """Consulta leve para listas: sem o conteúdo nem o HTML, com o nome do criador no mesmo SELECT."""
+        return cls.query.options(
+            load_only(cls.id, cls.title, cls.creator_id, cls.updated_at),
+            joinedload(cls.creator).load_only(User.id, User.username)
+        )
+
+    @classmethod
+    def detail_query(cls):
+        """Consulta da página do documento: criador e último editor no mesmo SELECT."""
+        return cls.query.options(joinedload(cls.creator), joinedload(cls.last_editor))
+
+    def rendered_html(self):
+        """HTML do conteúdo: o salvo no banco ou, para documentos antigos, o do LRU."""
+        if self.content_html is not None and self.content_hash is not None:
+            return self.content_html
+        return markdown_cache.render(self.content)
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -29,3 +95,12 @@ class Document(db.Model):
             # Content might be too large for a simple dict representation
         }
 
+
+
+@event.listens_for(Document.content, "set")
+def _render_on_content_change(target, value, oldvalue, initiator):
+    """Renderiza o Markdown uma única vez, quando o conteúdo é criado ou alterado."""
+    digest = content_digest(value)
+    if target.content_hash != digest or target.content_html is None:
+        target.content_hash = digest
+        target.content_html = render_markdown(value)
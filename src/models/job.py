@@ -0,0 +1,60 @@
+from datetime import datetime
+from src.extensions import db
+import enum
+import json
+
+class JobStatus(enum.Enum):
+    PENDING = 'Na fila'
+    RUNNING = 'Executando'
+    SUCCEEDED = 'Concluído'
+    FAILED = 'Falhou'
+
+class Job(db.Model):
+    """Tarefa em segundo plano, executada pelo `flask run-jobs` (ver src/jobs.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.Enum(JobStatus), nullable=False, default=JobStatus.PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    # Não executar antes deste horário (espera entre tentativas)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # Duração da última tentativa, em milissegundos
+    duration_ms = db.Column(db.Integer, nullable=True)
+    # Identificação do worker que pegou a tarefa (host:pid)
+    locked_by = db.Column(db.String(64), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True)
+    created_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+
+    created_by = db.relationship('User', foreign_keys=[created_by_id])
+
+    __table_args__ = (
+        # Próximas tarefas a executar
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.name} ({self.status.name})>'
+
+    def get_payload(self):
+        return json.loads(self.payload or '{}')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status.name.lower(),
+            'status_label': self.status.value,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_ms': self.duration_ms,
+            'error': self.error,
+            'result': json.loads(self.result) if self.result else None
+        }
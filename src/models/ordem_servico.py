@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy.orm import load_only, joinedload
 from src.models.user import db, User, UserSector # Import db instance and User/Sector for relationships
 import enum
 
@@ -30,9 +31,28 @@ class OrdemServico(db.Model):
     criador = db.relationship('User', foreign_keys=[criador_id], backref=db.backref('ordens_criadas', lazy=True))
     # responsavel = db.relationship('User', foreign_keys=[user_responsavel_id], backref=db.backref('ordens_responsaveis', lazy=True))
 
+    __table_args__ = (
+        # Listas por setor (e status) ordenadas pela data de criação
+        db.Index('ix_ordem_servico_setor_status_data', 'setor_responsavel', 'status', 'data_criacao'),
+        # Lista geral da Gestão ordenada pela data de criação
+        db.Index('ix_ordem_servico_data_criacao', 'data_criacao'),
+    )
+
     def __repr__(self):
         return f'<OrdemServico {self.id}: {self.titulo}>'
 
+    @classmethod
+    def summary_query(cls):
+        """Consulta leve para listas: só as colunas exibidas, sem os campos de texto longos."""
+        return cls.query.options(
+            load_only(cls.id, cls.titulo, cls.setor_responsavel, cls.status, cls.data_criacao)
+        )
+
+    @classmethod
+    def detail_query(cls):
+        """Consulta da página da ordem, com o criador no mesmo SELECT."""
+        return cls.query.options(joinedload(cls.criador))
+
     def to_dict(self):
         return {
             'id': self.id,
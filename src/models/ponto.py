@@ -1,7 +1,18 @@
-from datetime import datetime
-from src.models.user import db # Import db instance
+from datetime import datetime, timezone
+from sqlalchemy import event, select, insert, delete, update, func, bindparam
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.models.user import db, User # Import db instance and User for the presence hook
 import enum
 
+ROLLUP_BATCH = 1000
+
+def local_date(utc_moment):
+    """Data local (fuso do servidor) de um horário gravado em UTC."""
+    return utc_moment.replace(tzinfo=timezone.utc).astimezone().date()
+
 class EntryType(enum.Enum):
     ENTRADA = 'Entrada'          # Clock in
     SAIDA = 'Saida'              # Clock out
@@ -20,11 +31,26 @@ class TimeEntry(db.Model):
     
     # Quem registrou a ocorrência (para ocorrências)
     registered_by_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+
+    # = user_id enquanto o turno (ENTRADA) está aberto, NULL depois. O índice único
+    # garante no banco no máximo um turno aberto por usuário (NULLs não conflitam).
+    open_user_id = db.Column(db.Integer, nullable=True)
     
     # Add relationship back to User if needed (already commented out in user.py)
     user = db.relationship("User", backref=db.backref("time_entries", lazy=True), foreign_keys=[user_id])
     registered_by = db.relationship("User", foreign_keys=[registered_by_id], backref=db.backref("registered_occurrences", lazy=True))
 
+    __table_args__ = (
+        # Últimos registros de um usuário por tipo (ex.: última ENTRADA)
+        db.Index("ix_time_entry_user_type_start", "user_id", "entry_type", "start_time"),
+        # Feed global por tipo (ex.: ocorrências mais recentes)
+        db.Index("ix_time_entry_type_start", "entry_type", "start_time"),
+        # Um turno aberto por usuário; também é o caminho do clock_out até o turno
+        db.Index("ux_time_entry_open_user", "open_user_id", unique=True),
+        # Saídas mais recentes (cursor da sincronização do quadro de status)
+        db.Index("ix_time_entry_type_end", "entry_type", "end_time"),
+    )
+
     def __repr__(self):
         return f"<TimeEntry {self.id} for User {self.user_id}>"
     
@@ -54,3 +80,238 @@ class TimeEntry(db.Model):
             "duration_minutes": self.get_duration_minutes()
         }
 
+
+class UserPresence(db.Model):
+    """Marca de alteração por usuário do quadro de status.
+
+    Quem está trabalhando sai direto de `TimeEntry.open_user_id` (User LEFT JOIN no
+    turno aberto, pelo índice único); esta tabela só guarda `updated_at`, renovado
+    sempre que um dado do usuário exibido no quadro muda (ver
+    `_touch_presence_on_user_change`). Junto com os horários de entrada e saída
+    dos turnos, ele serve de cursor para a sincronização incremental de
+    `/ponto/api/status`.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = db.relationship("User", backref=db.backref("presence", uselist=False, lazy=True))
+
+    def __repr__(self):
+        return f"<UserPresence user={self.user_id} updated_at={self.updated_at}>"
+
+    def touch(self):
+        self.updated_at = datetime.utcnow()
+
+class DailyHours(db.Model):
+    """Totais diários de horas trabalhadas por usuário.
+
+    Cada turno fechado (ENTRADA com end_time) conta no dia local em que começou. A
+    linha é atualizada no clock_out, e `rebuild_daily_hours` recalcula a tabela
+    inteira a partir de TimeEntry. Os relatórios semanais/mensais somam estas linhas.
+
+    As horas esperadas não ficam aqui: saem do horário do usuário para cada dia do
+    período (`CompiledSchedule.expected_between`), então dias com horário e sem turno
+    também contam, como na análise de `src/analytics.py`. `User.total_hours_worked`
+    é a soma destas linhas e `User.first_shift_day` o dia da primeira delas.
+    """
+    __tablename__ = "daily_hours"
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    worked_minutes = db.Column(db.Integer, nullable=False, default=0)
+    shifts = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = db.relationship("User", backref=db.backref("daily_hours", lazy=True))
+
+    __table_args__ = (
+        # Relatórios por período de todos os usuários
+        db.Index("ix_daily_hours_day", "day"),
+    )
+
+    def __repr__(self):
+        return f"<DailyHours user={self.user_id} day={self.day} worked={self.worked_minutes}>"
+
+    @classmethod
+    def add_shift(cls, user, start_time, minutes):
+        """Soma um turno recém-fechado ao dia dele e aos totais do usuário.
+
+        Só escritas incrementais, sem ler as linhas: no MySQL e no SQLite a linha do
+        dia é um upsert (um comando); nos outros bancos, UPDATE e, no primeiro turno
+        do dia, INSERT.
+
+        O usuário é atualizado antes da linha do dia: durante `rebuild_daily_hours`,
+        que trava as linhas de `user`, o clock_out espera ali, antes de tocar em
+        `daily_hours`, e soma o turno depois do recálculo.
+        """
+        table = cls.__table__
+        day = local_date(start_time)
+        now = datetime.utcnow()
+        users = User.__table__
+        db.session.execute(
+            update(users).where(users.c.id == user.id)
+            .values(total_hours_worked=users.c.total_hours_worked + minutes,
+                    first_shift_day=func.coalesce(users.c.first_shift_day, day))
+        )
+        upsert = UPSERTS.get(db.session.get_bind().dialect.name)
+        if upsert is not None:
+            db.session.execute(upsert(table, {"user_id": user.id, "day": day, "worked_minutes": minutes, "shifts": 1,
+                                              "updated_at": now}, ("worked_minutes", "shifts")))
+        elif not db.session.execute(
+            update(table).where(table.c.user_id == user.id, table.c.day == day)
+            .values(worked_minutes=table.c.worked_minutes + minutes, shifts=table.c.shifts + 1, updated_at=now)
+        ).rowcount:
+            db.session.execute(insert(table).values(user_id=user.id, day=day, worked_minutes=minutes, shifts=1,
+                                                    updated_at=now))
+
+def _sqlite_upsert(table, values, increments):
+    statement = sqlite_insert(table).values(**values)
+    return statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={**{name: table.c[name] + statement.excluded[name] for name in increments},
+              "updated_at": statement.excluded.updated_at},
+    )
+
+def _mysql_upsert(table, values, increments):
+    statement = mysql_insert(table).values(**values)
+    return statement.on_duplicate_key_update(
+        **{name: table.c[name] + statement.inserted[name] for name in increments},
+        updated_at=statement.inserted.updated_at,
+    )
+
+# Dialeto -> fn(tabela, valores, colunas somadas) que monta o INSERT ... ON CONFLICT/DUPLICATE KEY
+UPSERTS = {"sqlite": _sqlite_upsert, "mysql": _mysql_upsert, "mariadb": _mysql_upsert}
+
+# --- Ações de ponto ---
+# Cada ação decide o resultado com uma escrita condicional: duas abas ou dois
+# toques seguidos não abrem dois turnos, e quem perde a corrida não grava nada.
+# Os totais diários e do usuário são atualizados na mesma transação, que o
+# chamador confirma com `db.session.commit()`.
+
+def clock_in(user_id, moment):
+    """Abre um turno com um INSERT; o índice único de `open_user_id` barra o segundo.
+
+    O INSERT roda num SAVEPOINT: se ele falhar, só ele é desfeito, e o resto da
+    transação de quem chamou continua valendo. Retorna o id do registro, ou None se
+    já havia turno aberto. Outras violações (usuário apagado, por exemplo) são
+    levantadas de novo.
+    """
+    savepoint = db.session.begin_nested()
+    try:
+        entry_id = db.session.execute(insert(TimeEntry.__table__).values(
+            user_id=user_id, start_time=moment, entry_type=EntryType.ENTRADA, open_user_id=user_id
+        )).inserted_primary_key[0]
+    except IntegrityError:
+        savepoint.rollback()
+        # Leitura com trava: no MySQL ela vê o turno que a outra requisição acabou de gravar,
+        # mesmo que o snapshot desta transação seja anterior
+        if db.session.execute(
+            select(TimeEntry.id).where(TimeEntry.open_user_id == user_id).with_for_update()
+        ).first() is None:
+            raise
+        return None
+    savepoint.commit()
+    return entry_id
+
+def clock_out(user, moment):
+    """Fecha o turno aberto com um único UPDATE condicionado a ele ainda estar aberto.
+
+    O início do turno volta pelo RETURNING do próprio UPDATE. O MySQL não tem
+    UPDATE ... RETURNING: lá o UPDATE decide pelo rowcount e o início é lido em
+    seguida, da linha que a transação acabou de travar.
+
+    Retorna a duração em minutos, ou None (transação desfeita) se não havia turno
+    aberto ou se outra requisição o fechou primeiro.
+    """
+    entries = TimeEntry.__table__
+    close = (
+        update(entries).where(entries.c.open_user_id == user.id, entries.c.end_time.is_(None))
+        .values(end_time=moment, open_user_id=None)
+    )
+    if db.session.get_bind().dialect.update_returning:
+        start_time = db.session.execute(close.returning(entries.c.start_time)).scalar()
+    elif db.session.execute(close).rowcount:
+        # O turno que estava aberto é sempre a ENTRADA mais recente do usuário
+        start_time = db.session.execute(
+            select(entries.c.start_time)
+            .where(entries.c.user_id == user.id, entries.c.entry_type == EntryType.ENTRADA)
+            .order_by(entries.c.start_time.desc(), entries.c.id.desc()).limit(1)
+        ).scalar_one()
+    else:
+        start_time = None
+    if start_time is None:
+        db.session.rollback()
+        return None
+    minutes = int((moment - start_time).total_seconds() / 60)
+    DailyHours.add_shift(user, start_time, minutes)
+    return minutes
+
+def rebuild_daily_hours(connection):
+    """Recalcula `daily_hours` e os totais dos usuários a partir de TimeEntry.
+
+    Lê só (usuário, início, fim) dos turnos fechados, em lotes, e grava as linhas
+    com INSERTs em lote. Retorna o número de linhas geradas.
+
+    Pode rodar com a aplicação no ar (tarefa em /jobs/): o primeiro comando trava
+    as linhas de `user` (`FOR UPDATE`) até o fim da transação. Um clock_out em
+    andamento termina antes (e entra na leitura dos turnos) ou espera no UPDATE do
+    usuário, antes de gravar em `daily_hours`, e soma o turno depois do recálculo.
+    Nenhum turno fechado no meio é apagado pelo DELETE. As saídas ficam em espera
+    enquanto o recálculo roda.
+    """
+    entries = TimeEntry.__table__
+    users = User.__table__
+    rollup = DailyHours.__table__
+
+    # Usuário -> [minutos trabalhados, primeiro dia com turno]
+    per_user = {user_id: [0, None]
+                for user_id in connection.execute(select(users.c.id).with_for_update()).scalars()}
+    days = {}
+    shifts = connection.execution_options(yield_per=5000).execute(
+        select(entries.c.user_id, entries.c.start_time, entries.c.end_time)
+        .where(entries.c.entry_type == EntryType.ENTRADA, entries.c.end_time.is_not(None))
+    )
+    for user_id, start, end in shifts:
+        key = (user_id, local_date(start))
+        totals = days.get(key)
+        if totals is None:
+            totals = days[key] = [0, 0]
+        totals[0] += int((end - start).total_seconds() / 60)
+        totals[1] += 1
+
+    now = datetime.utcnow()
+    rows = []
+    for (user_id, day), (worked, count) in days.items():
+        rows.append({"user_id": user_id, "day": day, "worked_minutes": worked, "shifts": count, "updated_at": now})
+        totals = per_user[user_id]
+        totals[0] += worked
+        if totals[1] is None or day < totals[1]:
+            totals[1] = day
+
+    connection.execute(delete(rollup))
+    for offset in range(0, len(rows), ROLLUP_BATCH):
+        connection.execute(insert(rollup), rows[offset:offset + ROLLUP_BATCH])
+    if per_user:
+        connection.execute(
+            update(users).where(users.c.id == bindparam("uid"))
+            .values(total_hours_worked=bindparam("worked"), first_shift_day=bindparam("first_day")),
+            [{"uid": user_id, "worked": worked, "first_day": first_day}
+             for user_id, (worked, first_day) in per_user.items()]
+        )
+    return len(rows)
+
+@event.listens_for(Session, "before_flush")
+def _touch_presence_on_user_change(session, flush_context, instances):
+    """Marca a linha de presença como alterada quando um usuário é criado ou editado."""
+    with session.no_autoflush:
+        for obj in list(session.new) + list(session.dirty):
+            if not isinstance(obj, User) or not session.is_modified(obj):
+                continue
+            if obj.id is None:
+                obj.presence = UserPresence()
+                obj.presence.touch()
+                continue
+            presence = session.get(UserPresence, obj.id)
+            if presence is None:
+                presence = UserPresence(user_id=obj.id)
+                session.add(presence)
+            presence.touch()
@@ -1,8 +1,14 @@
 from flask_login import UserMixin # Import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash # Keep these for reference
-# Import db and bcrypt from extensions
-from src.extensions import db, bcrypt 
+# Import db from extensions (bcrypt goes through src.hashing)
+from src.extensions import db
+from src.schedule import compile_schedule
+from src.hashing import password_hasher
+from src.cache import TTLCache, SharedVersions
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
 import enum
+from datetime import date
 
 # Removed db = SQLAlchemy() as it's now in extensions.py
 
@@ -41,8 +47,8 @@ class User(db.Model, UserMixin):
     # Total de horas trabalhadas (em minutos)
     total_hours_worked = db.Column(db.Integer, default=0, nullable=False)
     
-    # Banco de horas (em minutos) - positivo = a receber, negativo = a descontar
-    bank_of_hours = db.Column(db.Integer, default=0, nullable=False)
+    # Dia (local) do primeiro turno registrado; o banco de horas conta a partir dele
+    first_shift_day = db.Column(db.Date, nullable=True)
     
     # Foto de perfil (caminho relativo)
     profile_picture = db.Column(db.String(255), default=None, nullable=True)
@@ -50,12 +56,17 @@ class User(db.Model, UserMixin):
     def __repr__(self):
         return f'<User {self.username} ({self.role.value})>'
 
-    # Password hashing and checking methods using bcrypt
+    # Password hashing and checking methods using bcrypt (run on the bounded hashing pool,
+    # may raise HashingBusy when it is saturated)
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """True se a senha foi gravada com um custo de bcrypt diferente do atual."""
+        return password_hasher.needs_rehash(self.password_hash)
 
     # Flask-Login required properties/methods are handled by UserMixin and the fields
 
@@ -65,13 +76,13 @@ class User(db.Model, UserMixin):
         if self.role == UserRole.PENDING: # Assign a default role if still pending
              self.role = UserRole.MEMBRO # Or another default
 
+    def get_compiled_schedule(self):
+        """Horário compilado (em cache por versão do JSON); ver src/schedule.py."""
+        return compile_schedule(self.work_schedule)
+
     def get_work_schedule(self):
         """Retorna o horário de trabalho como dicionário."""
-        import json
-        try:
-            return json.loads(self.work_schedule) if self.work_schedule else {}
-        except:
-            return {}
+        return self.get_compiled_schedule().as_dict()
     
     def set_work_schedule(self, schedule_dict):
         """Define o horário de trabalho a partir de um dicionário."""
@@ -81,46 +92,29 @@ class User(db.Model, UserMixin):
     def get_today_schedule(self):
         """Retorna o horário de trabalho de hoje (se definido)."""
         from datetime import datetime
-        days_pt = {
-            0: 'segunda',
-            1: 'terca',
-            2: 'quarta',
-            3: 'quinta',
-            4: 'sexta',
-            5: 'sabado',
-            6: 'domingo'
-        }
-        today = days_pt.get(datetime.now().weekday(), None)
-        schedule = self.get_work_schedule()
-        return schedule.get(today) if today else None
+        return self.get_compiled_schedule().day(datetime.now().weekday())
     
     def format_hours(self, minutes):
-        """Formata minutos em formato HhMm."""
-        hours = minutes // 60
-        mins = minutes % 60
-        return f"{hours}h {mins}m"
+        """Formata minutos em formato HhMm (saldos negativos com o sinal na frente)."""
+        sign = "-" if minutes < 0 else ""
+        hours, mins = divmod(abs(minutes), 60)
+        return f"{sign}{hours}h {mins}m"
     
+    @property
+    def bank_of_hours(self):
+        """Banco de horas (em minutos) - positivo = a receber, negativo = a descontar.
+
+        Horas trabalhadas menos as esperadas pelo horário em cada dia, do primeiro turno
+        até hoje: dias com horário e sem turno (faltas) também descontam.
+        """
+        if self.first_shift_day is None:
+            return 0
+        expected = self.get_compiled_schedule().expected_between(self.first_shift_day, date.today())
+        return self.total_hours_worked - expected
+
     def get_weekly_hours(self):
         """Calcula o total de horas esperadas na semana (soma de todos os intervalos)."""
-        schedule = self.get_work_schedule()
-        total_minutes = 0
-        
-        for day, times in schedule.items():
-            if times and 'inicio' in times and 'fim' in times:
-                try:
-                    start = times['inicio'].split(':')
-                    end = times['fim'].split(':')
-                    
-                    start_minutes = int(start[0]) * 60 + int(start[1])
-                    end_minutes = int(end[0]) * 60 + int(end[1])
-                    
-                    duration = end_minutes - start_minutes
-                    if duration > 0:
-                        total_minutes += duration
-                except:
-                    pass
-        
-        return total_minutes
+        return self.get_compiled_schedule().weekly_minutes
 
     def to_dict(self):
         return {
@@ -137,3 +131,66 @@ class User(db.Model, UserMixin):
             'weekly_hours': self.get_weekly_hours()
         }
 
+
+# --- Cache do usuário da sessão e do contador de pendentes ---
+# O `user_loader` do Flask-Login e o contador do menu Admin rodam em quase toda
+# requisição. Os valores ficam em cache por alguns segundos (USER_CACHE_TTL) e são
+# invalidados quando um User é gravado. A invalidação vale para todos os workers
+# da máquina: cada entrada guarda a versão de `user_versions` (um arquivo por
+# usuário em USER_CACHE_DIR) e é descartada quando outro processo a renova.
+user_cache = TTLCache(ttl=30, maxsize=4096)
+pending_count_cache = TTLCache(ttl=30, maxsize=1)
+user_versions = SharedVersions()
+PENDING_VERSION_KEY = "pending"
+
+def load_session_user(user_id):
+    """Usuário da sessão, sem ir ao banco enquanto o cache for válido.
+
+    O cache guarda só os valores das colunas; a cada requisição eles viram uma
+    instância ligada à sessão atual via `merge(load=False)`, que não faz SELECT.
+    """
+    version = user_versions.get(user_id)
+    cached = user_cache.get(user_id)
+    if cached is None or cached[0] != version:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            user_cache.set(user_id, (version, {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}))
+        return user
+    user = User.__mapper__.class_manager.new_instance()
+    for key, value in cached[1].items():
+        setattr(user, key, value)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def pending_users_count():
+    """Quantidade de cadastros aguardando aprovação (em cache)."""
+    version = user_versions.get(PENDING_VERSION_KEY)
+    cached = pending_count_cache.get("pending")
+    if cached is None or cached[0] != version:
+        cached = (version, User.query.filter_by(role=UserRole.PENDING).count())
+        pending_count_cache.set("pending", cached)
+    return cached[1]
+
+def invalidate_user_cache(user_id=None):
+    """Descarta o usuário em cache (se informado) e o contador de pendentes, em todos os workers."""
+    if user_id is not None:
+        user_cache.invalidate(user_id)
+        user_versions.bump(user_id)
+    pending_count_cache.clear()
+    user_versions.bump(PENDING_VERSION_KEY)
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """Anota os usuários gravados; o cache só é invalidado depois do commit."""
+    changed = {obj.id for obj in list(session.new) + list(session.dirty) + list(session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault("changed_user_ids", set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user_cache(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)
@@ -0,0 +1,118 @@
+# src/pagination.py
+"""Paginação por cursor (keyset) para as listas longas.
+
+Em vez de OFFSET, cada página continua a partir dos valores de ordenação do último
+item da página anterior, então a página N custa o mesmo que a primeira (a consulta
+usa o índice da ordenação). O cursor é opaco para o cliente: os valores do último
+item codificados em base64.
+"""
+import base64
+import json
+from datetime import datetime, date
+from flask import request, render_template, make_response
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+from src.extensions import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class Page:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+    return value
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor, size):
+    """Decodifica o cursor; None (primeira página) quando ausente ou inválido."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != size:
+            return None
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        return None
+
+def _after(columns, values, descending):
+    """(a, b) depois de (va, vb) na ordenação, expandido para usar o índice em MySQL/SQLite."""
+    clauses = []
+    for i, column in enumerate(columns):
+        prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+def page_size_arg(default=DEFAULT_PAGE_SIZE):
+    """Lê `?limit=` da requisição, limitado a MAX_PAGE_SIZE."""
+    limit = request.args.get("limit", default, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def keyset_paginate(statement, columns, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=True, key=None):
+    """Executa uma página de `statement` (Query do ORM ou select) ordenada por `columns`.
+
+    `columns` deve terminar numa coluna única (normalmente o id) para desempatar.
+    `key(item)` devolve os valores de ordenação de um item; por padrão lê os
+    atributos com o mesmo nome das colunas.
+    """
+    values = decode_cursor(cursor, len(columns))
+    if values is not None:
+        statement = statement.where(_after(columns, values, descending))
+    statement = statement.order_by(*[c.desc() if descending else c.asc() for c in columns]).limit(limit + 1)
+
+    if isinstance(statement, Query):
+        items = statement.all()
+    else:
+        items = db.session.execute(statement).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        if key is None:
+            last_values = [getattr(last, c.key) for c in columns]
+        else:
+            last_values = key(last)
+        next_cursor = encode_cursor(last_values)
+    return Page(items, next_cursor)
+
+def is_partial_request():
+    """True quando o botão "Carregar mais" pede só as linhas da próxima página."""
+    return bool(request.args.get("partial"))
+
+def render_partial(template, page, **context):
+    """Renderiza só o fragmento da página e envia o próximo cursor em X-Next-Cursor."""
+    response = make_response(render_template(template, **context))
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return response
@@ -0,0 +1,235 @@
+# src/query_budgets.py
+"""Orçamento de consultas SQL por endpoint.
+
+Cada rota declara em `BUDGETS` quantas consultas pode fazer. `check_query_budgets`
+sobe a aplicação contra bancos SQLite temporários, populados com `src/seed.py` em
+dois tamanhos, faz cada requisição e conta os comandos SQL. Falha quando:
+
+*   uma requisição passa do orçamento;
+*   o número de consultas muda entre os dois tamanhos (a rota cresce com os dados:
+    um N+1 que o orçamento ainda não pegou);
+*   uma rota GET não tem orçamento declarado nem está em `UNBUDGETED`;
+*   a resposta é um erro 5xx.
+
+Roda offline, sem MySQL, em `tests/test_query_budgets.py` (com `python -m pytest`)
+e, para ver a tabela de consultas, com `flask --app src.main:app check-query-budgets`.
+
+Os caches por processo (usuário da sessão, contador de pendentes, partes globais
+da página de ponto) são esvaziados antes de cada requisição, então o número medido
+é o do pior caso. Orçamentos com `warm=True` medem o caso comum: a mesma requisição
+é feita uma vez antes, com os caches mantidos.
+"""
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from sqlalchemy import event
+
+# login: "gestao" (seed1), "membro" (usuário do próprio teste, com horário livre) ou None
+# warm: mede com os caches já preenchidos por uma requisição igual
+QueryBudget = namedtuple("QueryBudget", "endpoint path max_queries method data login warm",
+                         defaults=("GET", None, "gestao", False))
+
+BUDGETS = (
+    # main
+    QueryBudget("main.home", "/", 2),
+    QueryBudget("main.historia", "/historia", 0, login=None),
+    # auth
+    QueryBudget("auth.login", "/auth/login", 0, login=None),
+    QueryBudget("auth.register", "/auth/register", 0, login=None),
+    QueryBudget("auth.login", "/auth/login", 1, method="POST",
+                data={"username": "budget_membro", "password": "budget"}, login=None),
+    QueryBudget("auth.logout", "/auth/logout", 1),
+    # admin
+    QueryBudget("admin.dashboard", "/admin/dashboard", 3),
+    QueryBudget("admin.manage_users", "/admin/users", 3),
+    QueryBudget("admin.db_pool", "/admin/db-pool", 1),
+    QueryBudget("admin.metrics", "/admin/metrics", 2),
+    QueryBudget("admin.metrics_prometheus", "/admin/metrics/prometheus", 1),
+    # ponto
+    QueryBudget("ponto.registrar_ponto", "/ponto/", 5),
+    QueryBudget("ponto.registrar_ponto", "/ponto/", 4, login="membro"),
+    QueryBudget("ponto.registrar_ponto", "/ponto/", 1, warm=True),
+    QueryBudget("ponto.registrar_ponto", "/ponto/", 1, login="membro", warm=True),
+    # clock_in: INSERT dentro de SAVEPOINT/RELEASE
+    QueryBudget("ponto.registrar_ponto", "/ponto/", 4, method="POST", data={"action": "clock_in"}, login="membro"),
+    QueryBudget("ponto.registrar_ponto", "/ponto/", 4, method="POST", data={"action": "clock_out"}, login="membro"),
+    QueryBudget("ponto.registrar_ponto", "/ponto/", 3, method="POST",
+                data={"action": "register_occurrence", "occurrence_description": "Teste"}, login="membro"),
+    QueryBudget("ponto.set_schedule", "/ponto/set-schedule", 2),
+    QueryBudget("ponto.historico_horas", "/ponto/historico", 4),
+    QueryBudget("ponto.historico_publico", "/ponto/historico-publico", 3),
+    QueryBudget("ponto.relatorio_horas", "/ponto/relatorio/semanal", 3),
+    QueryBudget("ponto.api_relatorio_horas", "/ponto/api/relatorio/mensal", 2),
+    QueryBudget("ponto.analise_horas", "/ponto/analise?agrupamento=mes&user_id=2", 4),
+    QueryBudget("ponto.api_analise_horas", "/ponto/api/analise?setor=POWERTRAIN", 3),
+    QueryBudget("ponto.exportar_registros", "/ponto/export/csv", 2),
+    QueryBudget("ponto.api_status", "/ponto/api/status", 2),
+    QueryBudget("ponto.api_occurrences", "/ponto/api/occurrences", 2),
+    # ordens de serviço
+    QueryBudget("ordem.listar_ordens", "/ordens/", 3),
+    QueryBudget("ordem.listar_ordens", "/ordens/", 2, login="membro"),
+    QueryBudget("ordem.nova_ordem", "/ordens/nova", 2),
+    QueryBudget("ordem.nova_ordem", "/ordens/nova", 4, method="POST",
+                data={"titulo": "Ordem de teste", "setor_responsavel": "POWERTRAIN"}),
+    QueryBudget("ordem.ver_ordem", "/ordens/1", 3),
+    # documentos
+    QueryBudget("docs.list_documents", "/docs/", 3),
+    QueryBudget("docs.new_document", "/docs/new", 2),
+    QueryBudget("docs.new_document", "/docs/new", 5, method="POST", data={"title": "Doc", "content": "# Teste"}),
+    QueryBudget("docs.view_document", "/docs/1", 3),
+    QueryBudget("docs.edit_document", "/docs/1/edit", 3),
+    # busca
+    QueryBudget("search.search_page", "/search/?q=suspensão", 3),
+    QueryBudget("search.search_api", "/search/api?q=freio", 2),
+    # usuários
+    QueryBudget("user.get_users", "/user/users", 1, login=None),
+    QueryBudget("user.get_user", "/user/users/2", 1, login=None),
+    QueryBudget("user.dashboard", "/user/dashboard", 3),
+    QueryBudget("user.avatar", "/user/avatar/" + "0" * 64 + ".png", 0, login=None),
+    # tarefas
+    QueryBudget("jobs.list_jobs", "/jobs/", 3),
+    QueryBudget("jobs.job_status", "/jobs/1", 2),
+)
+
+# Rotas GET que não passam pelo orçamento, e por quê
+UNBUDGETED = {
+    "static": "arquivo estático",
+    "assets.serve": "arquivo estático pré-comprimido",
+    "ponto.stream": "conexão SSE longa",
+}
+
+def _missing_budgets(app):
+    """Endpoints GET da aplicação sem orçamento nem justificativa."""
+    covered = {budget.endpoint for budget in BUDGETS} | set(UNBUDGETED)
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()
+                   if "GET" in rule.methods and rule.endpoint not in covered})
+
+def _create_app(directory, users):
+    """Aplicação apontando para um SQLite novo em `directory`."""
+    from src.main import create_app
+
+    saved = {name: os.environ.get(name) for name in ("DATABASE_URL", "BCRYPT_LOG_ROUNDS")}
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, f'budget_{users}.db')}"
+    os.environ["BCRYPT_LOG_ROUNDS"] = "4"
+    try:
+        return create_app()
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def _build_app(directory, users, make_app=None):
+    """Aplicação com um SQLite novo, populado com `users` usuários.
+
+    `make_app` (a fixture dos testes) cria a aplicação; sem ela, o banco fica em `directory`.
+    """
+    from src.extensions import db
+    from src.cli import _import_models
+    from src.migrations import apply_migrations
+    from src.hashing import password_hasher
+    from src.seed import seed_database
+    from src.models.user import User, UserRole, UserSector
+    from src.jobs import enqueue
+
+    app = make_app() if make_app is not None else _create_app(directory, users)
+    app.config.update(TESTING=True, METRICS_SLOW_REQUEST_MS=10 ** 9)
+
+    with app.app_context():
+        _import_models()
+        db.create_all()
+        apply_migrations()
+        password_hash = password_hasher.hash("budget")
+        with db.engine.begin() as connection:
+            seed_database(connection, users=users, entries=users * 20, orders=users * 2,
+                          documents=users, password_hash=password_hash)
+        # Membro com horário livre e sem turno aberto, para as ações de ponto
+        membro = User(username="budget_membro", email="budget_membro@samabaja.local", password_hash=password_hash,
+                      role=UserRole.MEMBRO, sector=UserSector.POWERTRAIN, is_active=True,
+                      work_schedule=json.dumps({day: {"inicio": "00:00", "fim": "23:59"}
+                                                for day in ("segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo")}))
+        db.session.add(membro)
+        enqueue("rebuild_daily_hours", created_by=1)
+        db.session.commit()
+    return app
+
+LOGINS = {"gestao": "seed1", "membro": "budget_membro"}
+
+def _measure(app, budget):
+    """Faz a requisição do orçamento e retorna (consultas, status)."""
+    from src.extensions import db
+    from src.models.user import user_cache, pending_count_cache
+    from src.snapshot import invalidate_snapshot
+
+    client = app.test_client()
+    if budget.login:
+        response = client.post("/auth/login", data={"username": LOGINS[budget.login], "password": "budget"})
+        if response.status_code != 302:
+            raise RuntimeError(f"login de {budget.login} falhou ({response.status_code})")
+    user_cache.clear()
+    pending_count_cache.clear()
+    invalidate_snapshot()
+    if budget.warm:
+        client.open(budget.path, method=budget.method, data=budget.data).close()
+
+    count = [0]
+    def counter(*_):
+        count[0] += 1
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        response = client.open(budget.path, method=budget.method, data=budget.data)
+        response.get_data()  # respostas em streaming fazem as consultas aqui
+        response.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+    return count[0], response.status_code
+
+def check_query_budgets(sizes=(10, 40), log=print, make_app=None):
+    """Mede todas as rotas em cada tamanho de banco e retorna a lista de falhas.
+
+    `make_app()` cria cada aplicação (ver `_build_app`).
+    """
+    directory = tempfile.mkdtemp(prefix="samabaja-budgets-")
+    measured = {}
+    failures = []
+    try:
+        for users in sizes:
+            app = _build_app(directory, users, make_app)
+            if users == sizes[0]:
+                failures += [f"{endpoint}: rota GET sem orçamento em src/query_budgets.py"
+                             for endpoint in _missing_budgets(app)]
+            for index, budget in enumerate(BUDGETS):
+                measured[(index, users)] = _measure(app, budget)
+            with app.app_context():
+                from src.extensions import db
+                for engine in db.engines.values():
+                    engine.dispose()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    log(f"{'rota':52} {'limite':>6} " + " ".join(f"{f'{users} us.':>8}" for users in sizes))
+    for index, budget in enumerate(BUDGETS):
+        label = f"{budget.method} {budget.path}" + (f" [{budget.login}]" if budget.login != "gestao" else "")
+        if budget.warm:
+            label += " (cache)"
+        if budget.data and "action" in budget.data:
+            label += f" ({budget.data['action']})"
+        results = [measured[(index, users)] for users in sizes]
+        counts = [queries for queries, _ in results]
+        problems = []
+        if max(counts) > budget.max_queries:
+            problems.append(f"passou do limite ({max(counts)} > {budget.max_queries})")
+        if len(set(counts)) > 1:
+            problems.append("cresce com o volume de dados: " + " -> ".join(str(c) for c in counts))
+        errors = sorted({status for _, status in results if status >= 500})
+        if errors:
+            problems.append(f"status {', '.join(map(str, errors))}")
+        log(f"{label[:52]:52} {budget.max_queries:6} " + " ".join(f"{c:8}" for c in counts)
+            + ("   <- " + "; ".join(problems) if problems else ""))
+        failures += [f"{budget.endpoint} {label}: {problem}" for problem in problems]
+    return failures
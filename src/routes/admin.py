@@ -1,8 +1,12 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app, Response, abort
 from flask_login import login_required, current_user
 # Import db from extensions
 from src.extensions import db
-from src.models.user import User, UserRole, UserSector
+from src.models.user import User, UserRole, UserSector, invalidate_user_cache
+from src.pagination import keyset_paginate, is_partial_request, render_partial
+from src.database import pool_status
+from src.metrics import registry as metrics_registry
+import hmac
 from functools import wraps
 
 admin_bp = Blueprint("admin", __name__)
@@ -25,11 +29,45 @@ def dashboard():
     pending_users = User.query.filter_by(is_active=False, role=UserRole.PENDING).count()
     return render_template("admin/dashboard.html", pending_users=pending_users)
 
+@admin_bp.route("/db-pool")
+@login_required
+@admin_required
+def db_pool():
+    """Ocupação do pool de conexões deste worker (JSON)."""
+    return jsonify(pool_status())
+
+@admin_bp.route("/metrics")
+@login_required
+@admin_required
+def metrics():
+    """Latência e consultas SQL por endpoint neste worker (`?format=json` para JSON)."""
+    snapshot = metrics_registry.snapshot()
+    if request.args.get("format") == "json":
+        return jsonify(dict(snapshot, pool=pool_status()))
+    return render_template("admin/metrics.html", metrics=snapshot, pool=pool_status(),
+                           enabled=current_app.config.get("METRICS_ENABLED", True))
+
+@admin_bp.route("/metrics/prometheus")
+def metrics_prometheus():
+    """Mesmas métricas no formato do Prometheus.
+
+    Aceita a sessão da Gestão ou `Authorization: Bearer <METRICS_TOKEN>` (para o coletor).
+    """
+    token = current_app.config.get("METRICS_TOKEN")
+    header = request.headers.get("Authorization", "")
+    authorized = bool(token) and hmac.compare_digest(header.encode(), f"Bearer {token}".encode())
+    if not authorized and not (current_user.is_authenticated and current_user.role == UserRole.GESTAO):
+        abort(403)
+    return Response(metrics_registry.prometheus(pool_status()),
+                    content_type="text/plain; version=0.0.4; charset=utf-8")
+
 @admin_bp.route("/users")
 @login_required
 @admin_required
 def manage_users():
-    users = User.query.order_by(User.id).all()
+    users = keyset_paginate(User.query, [User.id], cursor=request.args.get("cursor"), descending=False)
+    if is_partial_request():
+        return render_partial("admin/_user_rows.html", users, users=users, roles=UserRole, sectors=UserSector)
     return render_template("admin/manage_users.html", users=users, roles=UserRole, sectors=UserSector)
 
 @admin_bp.route("/users/<int:user_id>/approve", methods=["POST"])
@@ -40,6 +78,7 @@ def approve_user(user_id):
     if user.role == UserRole.PENDING:
         user.activate_user() # Sets is_active=True and assigns default role if needed
         db.session.commit()
+        invalidate_user_cache(user.id)
         flash(f"Usuário {user.username} aprovado e ativado.", "success")
     else:
         flash(f"Usuário {user.username} já estava aprovado.", "info")
@@ -64,6 +103,7 @@ def update_role_sector(user_id):
             user.is_active = True
             
         db.session.commit()
+        invalidate_user_cache(user.id)
         flash(f"Cargo e setor do usuário {user.username} atualizados.", "success")
     except KeyError:
         flash("Cargo ou setor inválido selecionado.", "danger")
@@ -81,6 +121,7 @@ def toggle_active(user_id):
         
     user.is_active = not user.is_active
     db.session.commit()
+    invalidate_user_cache(user.id)
     status = "ativado" if user.is_active else "desativado"
     flash(f"Usuário {user.username} foi {status}.", "success")
     return redirect(url_for("admin.manage_users"))
@@ -2,7 +2,15 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 # Import db and bcrypt from extensions
 from src.extensions import db, bcrypt 
-from src.models.user import User, UserRole, UserSector
+from src.models.user import User, UserRole, UserSector, invalidate_user_cache
+from src.hashing import HashingBusy
+
+BUSY_MESSAGE = "Servidor ocupado no momento. Tente novamente em alguns segundos."
+
+def _busy(template):
+    """Resposta rápida quando o pool de hashing está saturado."""
+    flash(BUSY_MESSAGE, "warning")
+    return render_template(template), 503, {"Retry-After": "5"}
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -28,10 +36,14 @@ def register():
 
         # Use set_password method which uses bcrypt
         new_user = User(username=username, email=email, role=UserRole.PENDING, sector=UserSector.NONE, is_active=False)
-        new_user.set_password(password)
+        try:
+            new_user.set_password(password)
+        except HashingBusy:
+            return _busy("register.html")
         
         db.session.add(new_user)
         db.session.commit()
+        invalidate_user_cache() # Novo cadastro pendente: atualiza o contador do menu Admin
 
         flash("Registro bem-sucedido! Aguarde a aprovação do administrador para fazer login.", "success")
         return redirect(url_for("auth.login")) # Redirect to login page
@@ -51,15 +63,26 @@ def login():
         user = User.query.filter_by(username=username).first()
 
         # Use check_password method which uses bcrypt
-        if not user or not user.check_password(password):
-            flash("Usuário ou senha inválidos.", "danger")
-            return redirect(url_for("auth.login"))
+        try:
+            if not user or not user.check_password(password):
+                flash("Usuário ou senha inválidos.", "danger")
+                return redirect(url_for("auth.login"))
+        except HashingBusy:
+            return _busy("login.html")
 
         # Check if user is active (approved by admin)
         if not user.is_active:
              flash("Sua conta ainda não foi aprovada por um administrador ou está inativa.", "warning")
              return redirect(url_for("auth.login"))
 
+        # Refaz o hash se o custo do bcrypt mudou desde que a senha foi gravada
+        if user.password_needs_rehash():
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except HashingBusy:
+                pass # Tenta de novo no próximo login
+
         # Log user in using Flask-Login
         login_user(user, remember=remember)
         flash("Login bem-sucedido!", "success")
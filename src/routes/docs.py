@@ -4,7 +4,7 @@ from flask_login import login_required, current_user
 from src.extensions import db
 from src.models.user import UserRole
 from src.models.document import Document # Import Document model
-import markdown # Import markdown library
+from src.pagination import keyset_paginate, is_partial_request, render_partial
 
 docs_bp = Blueprint("docs", __name__)
 
@@ -18,7 +18,9 @@ def can_edit_doc(document):
 @docs_bp.route("/")
 @login_required
 def list_documents():
-    documents = Document.query.order_by(Document.updated_at.desc()).all()
+    documents = keyset_paginate(Document.summary_query(), [Document.updated_at, Document.id], cursor=request.args.get("cursor"))
+    if is_partial_request():
+        return render_partial("docs/_rows.html", documents, documents=documents, can_edit_doc=can_edit_doc)
     # Pass the helper function to the template context if needed directly in template
     return render_template("docs/list.html", documents=documents, can_edit_doc=can_edit_doc)
 
@@ -44,8 +46,8 @@ def new_document():
 @docs_bp.route("/<int:doc_id>")
 @login_required
 def view_document(doc_id):
-    doc = Document.query.get_or_404(doc_id)
-    html_content = markdown.markdown(doc.content) if doc.content else ""
+    doc = Document.detail_query().filter_by(id=doc_id).first_or_404()
+    html_content = doc.rendered_html()
     return render_template("docs/view.html", doc=doc, html_content=html_content, can_edit=can_edit_doc(doc))
 
 @docs_bp.route("/<int:doc_id>/edit", methods=["GET", "POST"])
@@ -0,0 +1,43 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify, abort
+from flask_login import login_required, current_user
+from src.extensions import db
+from src.models.user import UserRole
+from src.models.job import Job
+from src.jobs import enqueue
+from src.routes.admin import admin_required
+
+jobs_bp = Blueprint("jobs", __name__)
+
+# Tarefas que a Gestão pode disparar pelo painel
+ADMIN_JOBS = {
+    "rebuild_daily_hours": "Recalcular totais diários de horas",
+    "rebuild_search_index": "Reconstruir índice de busca",
+}
+RECENT_JOBS = 50
+
+@jobs_bp.route("/")
+@login_required
+@admin_required
+def list_jobs():
+    jobs = Job.query.order_by(Job.id.desc()).limit(RECENT_JOBS).all()
+    return render_template("admin/jobs.html", jobs=jobs, admin_jobs=ADMIN_JOBS)
+
+@jobs_bp.route("/<int:job_id>")
+@login_required
+def job_status(job_id):
+    """Status de uma tarefa (JSON), para acompanhamento pela interface."""
+    job = db.session.get(Job, job_id)
+    if job is None or (job.created_by_id != current_user.id and current_user.role != UserRole.GESTAO):
+        abort(404)
+    return jsonify(job.to_dict())
+
+@jobs_bp.route("/enqueue/<name>", methods=["POST"])
+@login_required
+@admin_required
+def enqueue_job(name):
+    if name not in ADMIN_JOBS:
+        abort(404)
+    job = enqueue(name, created_by=current_user)
+    db.session.commit()
+    flash(f"Tarefa \"{ADMIN_JOBS[name]}\" colocada na fila (#{job.id}).", "success")
+    return redirect(url_for("jobs.list_jobs"))
@@ -5,6 +5,7 @@ from src.models.user import User, UserSector, UserRole # Added UserRole
 from src.models.ordem_servico import OrdemServico, OrdemStatus
 from datetime import datetime
 from flask_login import login_required, current_user
+from src.pagination import keyset_paginate, is_partial_request, render_partial
 
 ordem_bp = Blueprint("ordem", __name__)
 
@@ -12,10 +13,13 @@ ordem_bp = Blueprint("ordem", __name__)
 @login_required
 def listar_ordens():
     if current_user.role == UserRole.GESTAO:
-        ordens = OrdemServico.query.order_by(OrdemServico.data_criacao.desc()).all()
+        query = OrdemServico.summary_query()
     else:
-        ordens = OrdemServico.query.filter_by(setor_responsavel=current_user.sector).order_by(OrdemServico.data_criacao.desc()).all()
-        
+        query = OrdemServico.summary_query().filter_by(setor_responsavel=current_user.sector)
+    ordens = keyset_paginate(query, [OrdemServico.data_criacao, OrdemServico.id], cursor=request.args.get("cursor"))
+
+    if is_partial_request():
+        return render_partial("_ordens_rows.html", ordens, ordens=ordens)
     return render_template("ordens_lista.html", ordens=ordens)
 
 @ordem_bp.route("/nova", methods=["GET", "POST"])
@@ -73,7 +77,7 @@ def nova_ordem():
 @ordem_bp.route("/<int:ordem_id>")
 @login_required
 def ver_ordem(ordem_id):
-    ordem = OrdemServico.query.get_or_404(ordem_id)
+    ordem = OrdemServico.detail_query().filter_by(id=ordem_id).first_or_404()
     if current_user.role != UserRole.GESTAO and current_user.sector != ordem.setor_responsavel:
         flash("Você não tem permissão para ver detalhes desta ordem de serviço.", "danger")
         return redirect(url_for("ordem.listar_ordens"))
@@ -1,14 +1,32 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from datetime import datetime, time
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, Response, stream_with_context, abort
+from datetime import datetime, time, timedelta, timezone
+from sqlalchemy import func, select, or_, and_, union
+from sqlalchemy.orm import aliased
 from flask_login import login_required, current_user
 from src.extensions import db
-from src.models.user import User, UserRole
-from src.models.ponto import TimeEntry, EntryType
+from src.events import broadcaster, BroadcasterFull, format_sse
+from src.pagination import keyset_paginate, page_size_arg, is_partial_request, render_partial
+from src.models.user import User, UserRole, UserSector, invalidate_user_cache
+from src.models.ponto import TimeEntry, EntryType, UserPresence, DailyHours, clock_in, clock_out
 from src.models.ordem_servico import OrdemServico, OrdemStatus
+from src.export import export_statement, iter_csv, iter_ndjson
+from src.analytics import hours_analysis, GRANULARITIES
+from src.snapshot import open_orders_cache, occurrence_cache
+from src.schedule import compile_schedule
 import json
+import queue
+from collections import namedtuple
 
 ponto_bp = Blueprint("ponto", __name__)
 
+OCCURRENCES_PAGE_SIZE = 50
+
+# formato -> (content type, gerador)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", iter_csv),
+    "ndjson": ("application/x-ndjson; charset=utf-8", iter_ndjson),
+}
+
 # --- Funções auxiliares ---
 def is_within_work_hours(user, check_time=None):
     """Verifica se o usuário está dentro do horário de trabalho definido."""
@@ -16,34 +34,301 @@ def is_within_work_hours(user, check_time=None):
         return True
     if check_time is None:
         check_time = datetime.now()
-    today_schedule = user.get_today_schedule()
-    if not today_schedule:
-        return True
-    try:
-        inicio = datetime.strptime(today_schedule.get('inicio', '00:00'), '%H:%M').time()
-        fim = datetime.strptime(today_schedule.get('fim', '23:59'), '%H:%M').time()
-        current_time = check_time.time()
-        return inicio <= current_time <= fim
-    except Exception as e:
-        print(f"Erro ao validar horário: {e}")
-        return True
+    return user.get_compiled_schedule().is_within(check_time)
 
-def get_user_status(user):
-    """Retorna o status atual do usuário (trabalhando, fora do horário, etc)."""
+_PRESENCE_NOT_LOADED = object()
+
+def get_user_status(user, open_entry_id=_PRESENCE_NOT_LOADED):
+    """Retorna o status atual do usuário (trabalhando, fora do horário, etc).
+
+    `open_entry_id` é o turno aberto do usuário (`TimeEntry.open_user_id`); quando o
+    chamador não o fornece, ele é lido pelo índice único.
+    """
     today_schedule = user.get_today_schedule()
     if not today_schedule:
         return {'status': 'sem_horario', 'message': 'Sem horário definido'}
-    
-    last_entry = TimeEntry.query.filter_by(
-        user_id=user.id,
-        entry_type=EntryType.ENTRADA
-    ).order_by(TimeEntry.start_time.desc()).first()
-    
-    if last_entry and last_entry.end_time is None:
-        return {'status': 'trabalhando', 'message': 'Trabalhando', 'entry_id': last_entry.id}
+
+    if open_entry_id is _PRESENCE_NOT_LOADED:
+        open_entry_id = db.session.scalar(select(TimeEntry.id).where(TimeEntry.open_user_id == user.id))
+
+    if open_entry_id is not None:
+        return {'status': 'trabalhando', 'message': 'Trabalhando', 'entry_id': open_entry_id}
     else:
         return {'status': 'nao_bateu', 'message': 'Não bateu ponto'}
 
+def _board_row(user, open_entry_id):
+    return {
+        'user': user,
+        'status': get_user_status(user, open_entry_id),
+        'today_schedule': user.get_today_schedule(),
+        'total_hours': user.format_hours(user.total_hours_worked),
+        'weekly_hours': user.format_hours(user.get_weekly_hours()),
+        'bank_of_hours': user.format_hours(user.bank_of_hours)
+    }
+
+def _board_query():
+    """User com o id do turno aberto (LEFT JOIN pelo índice único de `open_user_id`)."""
+    return db.session.query(User, TimeEntry.id).outerjoin(TimeEntry, TimeEntry.open_user_id == User.id)
+
+def get_status_board():
+    """Monta o quadro de status de todos os usuários ativos com uma única consulta."""
+    rows = _board_query().filter(User.is_active == True).all()
+
+    users_data = [_board_row(user, open_entry_id) for user, open_entry_id in rows]
+    users_data.sort(key=lambda x: (x['status']['status'] != 'trabalhando', x['user'].username))
+    return users_data
+
+def get_status_changes(since):
+    """Linhas do quadro alteradas depois de `since` (inclui usuários desativados).
+
+    Alterado = dados do usuário gravados (UserPresence.updated_at), entrada ou saída.
+    """
+    changed = union(
+        select(UserPresence.user_id).where(UserPresence.updated_at > since),
+        select(TimeEntry.user_id).where(TimeEntry.entry_type == EntryType.ENTRADA, TimeEntry.start_time > since),
+        select(TimeEntry.user_id).where(TimeEntry.entry_type == EntryType.ENTRADA, TimeEntry.end_time > since),
+    ).subquery()
+    rows = _board_query().filter(User.id.in_(select(changed.c.user_id))).all()
+    return [_board_row(user, open_entry_id) for user, open_entry_id in rows]
+
+def _occurrence_feed_statement():
+    """Consulta do feed de ocorrências, só com as colunas exibidas (sem ordenação).
+
+    As linhas (sem hidratar objetos do ORM) trazem `id`, `user_id`, `username`,
+    `description`, `start_time` e `registered_by` (nome de quem registrou ou None).
+    """
+    reporter = aliased(User)
+    return select(
+        TimeEntry.id,
+        TimeEntry.user_id,
+        User.username,
+        TimeEntry.description,
+        TimeEntry.start_time,
+        reporter.username.label("registered_by")
+    ).join(User, User.id == TimeEntry.user_id).outerjoin(
+        reporter, reporter.id == TimeEntry.registered_by_id
+    ).where(TimeEntry.entry_type == EntryType.OCORRENCIA)
+
+def get_occurrence_feed(limit, since_id=None):
+    """Ocorrências mais recentes em uma única consulta."""
+    statement = _occurrence_feed_statement()
+    if since_id is not None:
+        statement = statement.where(TimeEntry.id > since_id)
+    statement = statement.order_by(TimeEntry.start_time.desc(), TimeEntry.id.desc()).limit(limit)
+    return db.session.execute(statement).all()
+
+def get_occurrence_page(cursor=None, limit=OCCURRENCES_PAGE_SIZE):
+    """Uma página do feed de ocorrências (paginação por cursor, da mais nova para a mais antiga)."""
+    return keyset_paginate(_occurrence_feed_statement(), [TimeEntry.start_time, TimeEntry.id], cursor=cursor, limit=limit)
+
+# --- Página de ponto ---
+RECENT_ENTRIES = 10
+RECENT_OCCURRENCES = 20
+OPEN_ORDERS_LIMIT = 5
+
+def get_open_orders(sector=None):
+    """Ordens abertas mais recentes (de um setor, ou de todos com `sector=None`) como linhas simples."""
+    statement = select(
+        OrdemServico.id, OrdemServico.titulo, OrdemServico.setor_responsavel, OrdemServico.status
+    ).where(
+        OrdemServico.status != OrdemStatus.CONCLUIDA,
+        OrdemServico.status != OrdemStatus.CANCELADA
+    )
+    if sector is not None:
+        statement = statement.where(OrdemServico.setor_responsavel == sector)
+    return db.session.execute(statement.order_by(OrdemServico.data_criacao.desc()).limit(OPEN_ORDERS_LIMIT)).all()
+
+def get_ponto_snapshot(user):
+    """Dados da página de ponto do usuário.
+
+    A parte pessoal (últimos registros e se há turno aberto) sai de uma consulta; as
+    ordens abertas e as ocorrências recentes vêm dos caches de `src/snapshot.py`.
+    """
+    # O turno aberto pode ser mais antigo que os últimos registros: subconsulta pelo índice único
+    open_shift = aliased(TimeEntry)
+    rows = db.session.query(
+        TimeEntry, select(open_shift.id).where(open_shift.open_user_id == user.id).scalar_subquery()
+    ).filter(TimeEntry.user_id == user.id).order_by(TimeEntry.start_time.desc()).limit(RECENT_ENTRIES).all()
+
+    sector = None if user.role == UserRole.GESTAO else user.sector
+    return {
+        "time_entries": [entry for entry, _ in rows],
+        # Sem registros não há turno aberto
+        "is_clocked_in": bool(rows) and rows[0][1] is not None,
+        "open_orders": open_orders_cache.get_or_set(sector.name if sector else None, lambda: get_open_orders(sector)),
+        "all_occurrences": occurrence_cache.get_or_set("recentes", lambda: get_occurrence_feed(RECENT_OCCURRENCES)),
+    }
+
+# --- Sincronização incremental (ETag + cursor) ---
+# Margem de segurança do cursor: transações que confirmam com um pouco de atraso
+# ainda aparecem no próximo delta. Linhas repetidas são inofensivas no cliente.
+SYNC_CURSOR_OVERLAP = timedelta(seconds=5)
+
+# --- Relatórios de horas (a partir de DailyHours) ---
+REPORT_PERIODS = ("semanal", "mensal")
+
+def report_bounds(period, reference):
+    """Primeiro e último dia da semana (segunda a domingo) ou do mês de `reference`."""
+    if period == "semanal":
+        start = reference - timedelta(days=reference.weekday())
+        return start, start + timedelta(days=6)
+    start = reference.replace(day=1)
+    return start, (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+class DayHours(namedtuple("DayHours", "day worked_minutes expected_minutes shifts")):
+    """Um dia do relatório: horas trabalhadas (de `daily_hours`) e esperadas (do horário)."""
+    __slots__ = ()
+
+    @property
+    def balance_minutes(self):
+        return self.worked_minutes - self.expected_minutes
+
+def get_hours_report(start, end, user_id=None):
+    """Totais por usuário no período: uma agregação sobre as linhas diárias.
+
+    As horas esperadas saem do horário de cada usuário para todos os dias do período
+    até hoje, tenha havido turno ou não (como em `/ponto/analise`).
+    """
+    worked = (
+        select(DailyHours.user_id,
+               func.sum(DailyHours.worked_minutes).label("worked"),
+               func.count(DailyHours.day).label("days"))
+        .where(DailyHours.day >= start, DailyHours.day <= end)
+        .group_by(DailyHours.user_id)
+        .subquery()
+    )
+    statement = (
+        select(User.id, User.username, User.sector, User.work_schedule, worked.c.worked, worked.c.days)
+        .outerjoin(worked, worked.c.user_id == User.id)
+        # Quem tem horário a cumprir (usuários ativos) e quem trabalhou no período
+        .where(or_(and_(User.is_active.is_(True), User.role != UserRole.PENDING), worked.c.user_id.is_not(None)))
+        .order_by(User.username)
+    )
+    if user_id is not None:
+        statement = statement.where(User.id == user_id)
+    last_day = min(end, datetime.now().date())
+    report = []
+    for row in db.session.execute(statement):
+        expected = compile_schedule(row.work_schedule).expected_between(start, last_day)
+        if row.worked is None and not expected:
+            continue
+        report.append({
+            "user_id": row.id,
+            "username": row.username,
+            "sector": row.sector.value,
+            "worked_minutes": int(row.worked or 0),
+            "expected_minutes": expected,
+            "balance_minutes": int(row.worked or 0) - expected,
+            "days": row.days or 0,
+        })
+    return report
+
+def get_daily_hours(user_id, start, end):
+    """Dia a dia de um usuário no período: os dias com turno e os dias com horário até hoje."""
+    user = db.session.get(User, user_id)
+    if user is None:
+        return []
+    rows = {row.day: row for row in DailyHours.query.filter(
+        DailyHours.user_id == user_id, DailyHours.day >= start, DailyHours.day <= end
+    )}
+    expected = user.get_compiled_schedule().daily_minutes
+    days = []
+    day, last_day = start, min(end, datetime.now().date())
+    while day <= last_day:
+        row = rows.get(day)
+        if row is not None or expected[day.weekday()]:
+            days.append(DayHours(day, row.worked_minutes if row else 0, expected[day.weekday()], row.shifts if row else 0))
+        day += timedelta(days=1)
+    return days
+
+def _report_args(period):
+    """(início, fim, usuário detalhado) a partir da URL; None se o período for inválido."""
+    if period not in REPORT_PERIODS:
+        return None
+    try:
+        reference = datetime.strptime(request.args.get("data", ""), "%Y-%m-%d").date()
+    except ValueError:
+        reference = datetime.now().date()
+    start, end = report_bounds(period, reference)
+    # Só a Gestão vê os outros usuários
+    if current_user.role == UserRole.GESTAO:
+        detail_user_id = request.args.get("user_id", type=int)
+    else:
+        detail_user_id = current_user.id
+    return start, end, detail_user_id
+
+# Período padrão da análise de horas: as últimas 12 semanas
+ANALYSIS_DEFAULT_DAYS = 12 * 7 - 1
+# Limite do período da análise (a matriz de horas esperadas é usuários x dias)
+ANALYSIS_MAX_DAYS = 400
+
+def _analysis_args():
+    """(início, fim, agrupamento, setor, usuário detalhado) da URL; ValueError/KeyError se inválidos."""
+    today = datetime.now().date()
+    end = min(datetime.strptime(request.args["fim"], "%Y-%m-%d").date() if request.args.get("fim") else today, today)
+    if request.args.get("inicio"):
+        start = datetime.strptime(request.args["inicio"], "%Y-%m-%d").date()
+    else:
+        start = end - timedelta(days=ANALYSIS_DEFAULT_DAYS)
+    if start > end or (end - start).days >= ANALYSIS_MAX_DAYS:
+        raise ValueError("período")
+    granularity = request.args.get("agrupamento", "semana")
+    if granularity not in GRANULARITIES:
+        raise ValueError(granularity)
+    sector = UserSector[request.args["setor"]] if request.args.get("setor") else None
+    return start, end, granularity, sector, request.args.get("user_id", type=int)
+
+def _status_sync_state():
+    """Retorna (etag, cursor) do quadro de status com uma consulta agregada.
+
+    O cursor é a alteração mais recente: dados de um usuário, uma entrada ou uma
+    saída (os máximos de horário saem dos índices por tipo de registro).
+    """
+    last_change, rows, last_in, last_out = db.session.execute(select(
+        select(func.max(UserPresence.updated_at)).scalar_subquery(),
+        select(func.count(UserPresence.user_id)).scalar_subquery(),
+        select(func.max(TimeEntry.start_time)).where(TimeEntry.entry_type == EntryType.ENTRADA).scalar_subquery(),
+        select(func.max(TimeEntry.end_time)).where(TimeEntry.entry_type == EntryType.ENTRADA).scalar_subquery(),
+    )).one()
+    last_change = max((moment for moment in (last_change, last_in, last_out) if moment is not None), default=None)
+    # O status depende do dia da semana (horário de hoje), então a data local entra no estado
+    today = datetime.now().date().isoformat()
+    stamp = last_change.isoformat() if last_change else "0"
+    return f"status-{today}-{stamp}-{rows}", f"{today}~{stamp}"
+
+def _parse_status_cursor(cursor):
+    """Converte o cursor em datetime; None quando inválido ou de outro dia."""
+    try:
+        day, stamp = cursor.split("~", 1)
+        if day != datetime.now().date().isoformat():
+            return None
+        if stamp == "0":
+            return datetime.min
+        return datetime.fromisoformat(stamp) - SYNC_CURSOR_OVERLAP
+    except (AttributeError, ValueError):
+        return None
+
+def _occurrence_sync_state():
+    """Retorna (etag, cursor) do feed de ocorrências; o cursor é o maior id."""
+    last_id, total = db.session.query(
+        func.max(TimeEntry.id), func.count(TimeEntry.id)
+    ).filter(TimeEntry.entry_type == EntryType.OCORRENCIA).one()
+    last_id = last_id or 0
+    return f"occ-{last_id}-{total}", str(last_id)
+
+def _not_modified(etag, cursor):
+    """Resposta 304 quando o cliente já tem a versão atual."""
+    if not request.if_none_match.contains(etag):
+        return None
+    return _sync_headers(current_app.response_class(status=304), etag, cursor)
+
+def _sync_headers(response, etag, cursor):
+    response.set_etag(etag)
+    response.headers["X-Sync-Cursor"] = cursor
+    # Sempre revalidar: o ETag torna a revalidação barata
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 # --- Rotas ---
 @ponto_bp.route("/", methods=["GET", "POST"])
 @login_required
@@ -54,50 +339,27 @@ def registrar_ponto():
 
     if request.method == "POST":
         action = request.form.get("action")
-        last_entry = TimeEntry.query.filter_by(
-            user_id=user_id,
-            entry_type=EntryType.ENTRADA
-        ).order_by(TimeEntry.start_time.desc()).first()
-        is_clocked_in = last_entry and last_entry.end_time is None
 
         if action == "clock_in":
             if not is_within_work_hours(current_user, now):
                 flash("Você está fora do horário de trabalho definido!", "warning")
-            elif is_clocked_in:
+            elif clock_in(user_id, now_utc) is None:
                 flash("Você já registrou a entrada.", "warning")
             else:
-                new_entry = TimeEntry(
-                    user_id=user_id,
-                    start_time=now_utc,
-                    entry_type=EntryType.ENTRADA
-                )
-                db.session.add(new_entry)
                 db.session.commit()
+                broadcaster.publish("ponto", {"action": "entrada", "user_id": user_id})
                 flash("Ponto de entrada registrado com sucesso!", "success")
 
         elif action == "clock_out":
-            if not is_clocked_in:
+            minutes = clock_out(current_user, now_utc)
+            if minutes is None:
                 flash("Você não registrou a entrada.", "warning")
             else:
-                last_entry.end_time = now_utc
-                duration_seconds = (last_entry.end_time - last_entry.start_time).total_seconds()
-                duration_minutes = int(duration_seconds // 60)
-                current_user.total_hours_worked += duration_minutes
-
-                today_schedule = current_user.get_today_schedule()
-                if today_schedule:
-                    try:
-                        inicio = datetime.strptime(today_schedule.get('inicio', '00:00'), '%H:%M').time()
-                        fim = datetime.strptime(today_schedule.get('fim', '23:59'), '%H:%M').time()
-                        start_minutes = inicio.hour * 60 + inicio.minute
-                        end_minutes = fim.hour * 60 + fim.minute
-                        expected_minutes = end_minutes - start_minutes
-                        current_user.bank_of_hours = expected_minutes - duration_minutes
-                    except:
-                        pass
-
                 db.session.commit()
-                flash(f"Ponto de saída registrado com sucesso! ({last_entry.format_duration()})", "success")
+                # Os totais do usuário mudaram por UPDATE direto, fora do rastreio do ORM
+                invalidate_user_cache(user_id)
+                broadcaster.publish("ponto", {"action": "saida", "user_id": user_id})
+                flash(f"Ponto de saída registrado com sucesso! ({minutes // 60}h {minutes % 60}m)", "success")
 
         elif action == "register_occurrence":
             description = request.form.get("occurrence_description")
@@ -114,44 +376,17 @@ def registrar_ponto():
                 )
                 db.session.add(occurrence)
                 db.session.commit()
+                broadcaster.publish("ocorrencia", {"id": occurrence.id, "user_id": user_id})
                 flash("Ocorrência registrada com sucesso!", "success")
         
         return redirect(url_for("ponto.registrar_ponto"))
 
-    time_entries = TimeEntry.query.filter_by(user_id=user_id).order_by(TimeEntry.start_time.desc()).limit(10).all()
-    last_entry = TimeEntry.query.filter_by(
-        user_id=user_id,
-        entry_type=EntryType.ENTRADA
-    ).order_by(TimeEntry.start_time.desc()).first()
-    is_clocked_in = last_entry and last_entry.end_time is None
-
-    if current_user.role == UserRole.GESTAO:
-        open_orders = OrdemServico.query.filter(
-            OrdemServico.status != OrdemStatus.CONCLUIDA,
-            OrdemServico.status != OrdemStatus.CANCELADA
-        ).order_by(OrdemServico.data_criacao.desc()).limit(5).all()
-    else:
-        open_orders = OrdemServico.query.filter(
-            OrdemServico.setor_responsavel == current_user.sector,
-            OrdemServico.status != OrdemStatus.CONCLUIDA,
-            OrdemServico.status != OrdemStatus.CANCELADA
-        ).order_by(OrdemServico.data_criacao.desc()).limit(5).all()
-
-    today_schedule = current_user.get_today_schedule()
-    current_time_display = now.strftime("%H:%M:%S")
-    all_occurrences = TimeEntry.query.filter_by(
-        entry_type=EntryType.OCORRENCIA
-    ).order_by(TimeEntry.start_time.desc()).limit(20).all()
-
     return render_template(
         "ponto.html",
-        current_time=current_time_display,
-        time_entries=time_entries,
-        is_clocked_in=is_clocked_in,
-        open_orders=open_orders,
-        today_schedule=today_schedule,
+        current_time=now.strftime("%H:%M:%S"),
+        today_schedule=current_user.get_today_schedule(),
         total_hours_worked=current_user.format_hours(current_user.total_hours_worked),
-        all_occurrences=all_occurrences
+        **get_ponto_snapshot(current_user)
     )
 
 @ponto_bp.route("/set-schedule", methods=["GET", "POST"])
@@ -191,79 +426,244 @@ def historico_horas():
         flash("Você não tem permissão para acessar esta página.", "danger")
         return redirect(url_for("main.home"))
 
-    users = User.query.filter_by(is_active=True).all()
-    users_data = []
-    for user in users:
-        status = get_user_status(user)
-        today_schedule = user.get_today_schedule()
-        users_data.append({
-            'user': user,
-            'status': status,
-            'today_schedule': today_schedule,
-            'total_hours': user.format_hours(user.total_hours_worked),
-            'weekly_hours': user.format_hours(user.get_weekly_hours()),
-            'bank_of_hours': user.format_hours(user.bank_of_hours)
-        })
-
-    users_data.sort(key=lambda x: (x['status']['status'] != 'trabalhando', x['user'].username))
-    all_occurrences = TimeEntry.query.filter_by(entry_type=EntryType.OCORRENCIA).order_by(TimeEntry.start_time.desc()).all()
+    all_occurrences = get_occurrence_page(request.args.get("cursor"))
+    if is_partial_request():
+        return render_partial("_occurrence_items.html", all_occurrences, all_occurrences=all_occurrences)
+    users_data = get_status_board()
     
     return render_template("ponto_historico.html", users_data=users_data, all_occurrences=all_occurrences, admin_view=True)
 
 @ponto_bp.route("/historico-publico")
 def historico_publico():
     """Exibe o histórico de horas de todos os usuários (público)."""
-    users = User.query.filter_by(is_active=True).all()
-    users_data = []
-    for user in users:
-        status = get_user_status(user)
-        today_schedule = user.get_today_schedule()
-        users_data.append({
-            'user': user,
-            'status': status,
-            'today_schedule': today_schedule,
-            'total_hours': user.format_hours(user.total_hours_worked),
-            'weekly_hours': user.format_hours(user.get_weekly_hours()),
-            'bank_of_hours': user.format_hours(user.bank_of_hours)
-        })
-
-    users_data.sort(key=lambda x: (x['status']['status'] != 'trabalhando', x['user'].username))
-    all_occurrences = TimeEntry.query.filter_by(entry_type=EntryType.OCORRENCIA).order_by(TimeEntry.start_time.desc()).all()
+    all_occurrences = get_occurrence_page(request.args.get("cursor"))
+    if is_partial_request():
+        return render_partial("_occurrence_items.html", all_occurrences, all_occurrences=all_occurrences)
+    users_data = get_status_board()
 
     return render_template("ponto_historico.html", users_data=users_data, all_occurrences=all_occurrences, admin_view=False)
 
+@ponto_bp.route("/relatorio/<periodo>")
+@login_required
+def relatorio_horas(periodo):
+    """Relatório semanal/mensal de horas (`?data=AAAA-MM-DD` escolhe o período)."""
+    args = _report_args(periodo)
+    if args is None:
+        return redirect(url_for("ponto.relatorio_horas", periodo="semanal"))
+    start, end, detail_user_id = args
+    scope = None if current_user.role == UserRole.GESTAO else current_user.id
+    rows = get_hours_report(start, end, scope)
+    days = get_daily_hours(detail_user_id, start, end) if detail_user_id else []
+    step = timedelta(days=7) if periodo == "semanal" else timedelta(days=1)
+    return render_template(
+        "ponto_relatorio.html",
+        periodo=periodo, start=start, end=end, rows=rows, days=days,
+        detail_user_id=detail_user_id,
+        previous_date=(start - step).isoformat(),
+        next_date=(end + step).isoformat(),
+        format_hours=current_user.format_hours
+    )
+
+@ponto_bp.route("/api/relatorio/<periodo>")
+@login_required
+def api_relatorio_horas(periodo):
+    """Relatório semanal/mensal em JSON; com `user_id` (ou para não-Gestão) inclui os dias."""
+    args = _report_args(periodo)
+    if args is None:
+        return jsonify({"error": "Período inválido. Use 'semanal' ou 'mensal'."}), 400
+    start, end, detail_user_id = args
+    scope = None if current_user.role == UserRole.GESTAO else current_user.id
+    payload = {"start": start.isoformat(), "end": end.isoformat(), "users": get_hours_report(start, end, scope)}
+    if detail_user_id:
+        payload["days"] = [{
+            "day": row.day.isoformat(),
+            "worked_minutes": row.worked_minutes,
+            "expected_minutes": row.expected_minutes,
+            "balance_minutes": row.balance_minutes,
+            "shifts": row.shifts,
+        } for row in get_daily_hours(detail_user_id, start, end)]
+    return jsonify(payload)
+
+@ponto_bp.route("/analise")
+@login_required
+def analise_horas():
+    """Horas trabalhadas x horário por usuário, setor e semana/mês (apenas Gestão).
+
+    Parâmetros: `inicio` e `fim` (AAAA-MM-DD, padrão: últimas 12 semanas),
+    `agrupamento` (semana ou mes), `setor` e `user_id` (série do usuário).
+    """
+    if current_user.role != UserRole.GESTAO:
+        flash("Você não tem permissão para acessar esta página.", "danger")
+        return redirect(url_for("main.home"))
+    try:
+        start, end, granularity, sector, detail_user_id = _analysis_args()
+    except (ValueError, KeyError):
+        flash("Filtro inválido; mostrando as últimas 12 semanas.", "warning")
+        return redirect(url_for("ponto.analise_horas"))
+    analysis = hours_analysis(start, end, granularity, sector=sector)
+    return render_template(
+        "ponto_analise.html",
+        analysis=analysis, start=start, end=end, granularity=granularity, sector=sector,
+        sectors=[s for s in UserSector if s != UserSector.NONE],
+        users=analysis.users(), sector_rows=analysis.sectors(),
+        detail_user_id=detail_user_id,
+        user_periods=analysis.user_periods(detail_user_id) if detail_user_id else [],
+        format_hours=current_user.format_hours
+    )
+
+@ponto_bp.route("/api/analise")
+@login_required
+def api_analise_horas():
+    """A mesma análise de `analise_horas` em JSON (apenas Gestão)."""
+    if current_user.role != UserRole.GESTAO:
+        return jsonify({"error": "Acesso negado."}), 403
+    try:
+        start, end, granularity, sector, detail_user_id = _analysis_args()
+    except (ValueError, KeyError):
+        return jsonify({"error": "Filtro inválido."}), 400
+    return jsonify(hours_analysis(start, end, granularity, sector=sector).to_dict(detail_user_id))
+
+@ponto_bp.route("/export/<formato>")
+@login_required
+def exportar_registros(formato):
+    """Exporta os registros de ponto em CSV ou NDJSON, em streaming (apenas Gestão).
+
+    Filtros: `inicio` e `fim` (AAAA-MM-DD, datas locais, inclusive), `user_id`,
+    `setor` (nome do setor, ex.: POWERTRAIN) e `tipo` (ENTRADA, SAIDA, OCORRENCIA).
+    """
+    if current_user.role != UserRole.GESTAO:
+        flash("Você não tem permissão para acessar esta página.", "danger")
+        return redirect(url_for("main.home"))
+    if formato not in EXPORT_FORMATS:
+        abort(404)
+
+    def utc_day(name, shift=0):
+        value = request.args.get(name)
+        if not value:
+            return None
+        day = datetime.strptime(value, "%Y-%m-%d") + timedelta(days=shift)
+        # Meia-noite local -> UTC, como os registros são gravados
+        return day.astimezone(timezone.utc).replace(tzinfo=None)
+
+    try:
+        start = utc_day("inicio")
+        end = utc_day("fim", shift=1)
+        sector = UserSector[request.args["setor"]] if request.args.get("setor") else None
+        entry_type = EntryType[request.args["tipo"].upper()] if request.args.get("tipo") else None
+    except (ValueError, KeyError):
+        return jsonify({"error": "Filtro inválido."}), 400
+    statement = export_statement(start, end, request.args.get("user_id", type=int), sector, entry_type)
+
+    content_type, generate = EXPORT_FORMATS[formato]
+    label = "_".join(filter(None, ["ponto", request.args.get("inicio"), request.args.get("fim")]))
+    response = Response(stream_with_context(generate(statement)), content_type=content_type)
+    response.headers["Content-Disposition"] = f'attachment; filename="{label}.{formato}"'
+    # Proxies (nginx) não devem acumular a resposta antes de repassar
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
 @ponto_bp.route("/api/status")
 def api_status():
-    """API para obter o status atual de todos os usuários (para auto-atualização)."""
-    users = User.query.filter_by(is_active=True).all()
+    """API para obter o status atual de todos os usuários (para auto-atualização).
+
+    Suporta GET condicional (If-None-Match -> 304) e `?since=<cursor>`, que devolve
+    apenas os usuários alterados depois do cursor (desativados vêm com `removed`).
+    O próximo cursor é enviado no cabeçalho X-Sync-Cursor.
+    """
+    etag, cursor = _status_sync_state()
+    not_modified = _not_modified(etag, cursor)
+    if not_modified is not None:
+        return not_modified
+
+    since = _parse_status_cursor(request.args.get("since")) if request.args.get("since") else None
+    board = get_status_changes(since) if since is not None else get_status_board()
+
     users_status = []
-    for user in users:
-        status = get_user_status(user)
-        today_schedule = user.get_today_schedule()
+    for data in board:
+        user = data['user']
+        if not user.is_active:
+            users_status.append({'user_id': user.id, 'removed': True})
+            continue
         users_status.append({
             'user_id': user.id,
             'username': user.username,
-            'status': status['status'],
-            'message': status['message'],
-            'today_schedule': today_schedule,
-            'total_hours': user.format_hours(user.total_hours_worked),
-            'weekly_hours': user.format_hours(user.get_weekly_hours()),
-            'bank_of_hours': user.format_hours(user.bank_of_hours)
+            'sector': user.sector.value,
+            'status': data['status']['status'],
+            'message': data['status']['message'],
+            'today_schedule': data['today_schedule'],
+            'total_hours': data['total_hours'],
+            'weekly_hours': data['weekly_hours'],
+            'bank_of_hours': data['bank_of_hours']
         })
-    return jsonify(users_status)
+    response = jsonify(users_status)
+    # Sem `since` válido o cliente recebe o quadro completo e deve substituí-lo
+    response.headers["X-Sync-Full"] = "0" if since is not None else "1"
+    return _sync_headers(response, etag, cursor)
 
 @ponto_bp.route("/api/occurrences")
 def api_occurrences():
-    """API para obter as ocorrências recentes (para auto-atualização)."""
-    occurrences = TimeEntry.query.filter_by(entry_type=EntryType.OCORRENCIA).order_by(TimeEntry.start_time.desc()).limit(50).all()
+    """API para obter as ocorrências recentes (para auto-atualização).
+
+    Suporta GET condicional e `?since=<id>`, que devolve apenas ocorrências mais novas.
+    Com `?cursor=<cursor>` devolve a página seguinte (mais antigas); o cursor da
+    próxima página vem no cabeçalho X-Next-Cursor.
+    """
+    etag, cursor = _occurrence_sync_state()
+    if "cursor" in request.args:
+        page = get_occurrence_page(request.args.get("cursor"), page_size_arg(OCCURRENCES_PAGE_SIZE))
+        occurrences = page.items
+    else:
+        not_modified = _not_modified(etag, cursor)
+        if not_modified is not None:
+            return not_modified
+        page = None
+        occurrences = get_occurrence_feed(OCCURRENCES_PAGE_SIZE, since_id=request.args.get("since", type=int))
+
     occurrences_data = []
     for occ in occurrences:
         occurrences_data.append({
             'id': occ.id,
             'user_id': occ.user_id,
-            'username': occ.user.username,
+            'username': occ.username,
             'description': occ.description,
             'start_time': occ.start_time.isoformat(),
-            'registered_by': occ.registered_by.username if occ.registered_by else 'Desconhecido'
+            'registered_by': occ.registered_by or 'Desconhecido'
         })
-    return jsonify(occurrences_data)
+    response = _sync_headers(jsonify(occurrences_data), etag, cursor)
+    if page is not None and page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return response
+
+@ponto_bp.route("/stream")
+def stream():
+    """Canal SSE: avisa os quadros abertos sobre entradas, saídas e ocorrências.
+
+    Os eventos só sinalizam que algo mudou; o cliente busca o delta em
+    `api_status`/`api_occurrences` com o cursor. Quando o worker já está no limite
+    de conexões, responde 503 e a página continua no polling.
+    """
+    try:
+        subscriber = broadcaster.subscribe()
+    except BroadcasterFull:
+        return Response("Limite de conexões atingido", status=503, headers={"Retry-After": "60"})
+
+    heartbeat = current_app.config.get("SSE_HEARTBEAT_SECONDS", 25)
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comentário SSE para manter a conexão viva em proxies
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
@@ -0,0 +1,28 @@
+from flask import Blueprint, render_template, request, jsonify
+from flask_login import login_required, current_user
+from src.models.user import UserRole
+from src.search import search, SEARCH_PAGE_SIZE
+from src.pagination import page_size_arg
+
+search_bp = Blueprint("search", __name__)
+
+def _sector_scope():
+    # Gestão vê todas as ordens; os demais só as do próprio setor (como em listar_ordens)
+    return None if current_user.role == UserRole.GESTAO else current_user.sector
+
+@search_bp.route("/")
+@login_required
+def search_page():
+    query = request.args.get("q", "").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+    results, has_next = search(query, sector=_sector_scope(), page=page)
+    return render_template("search.html", query=query, results=results, page=page, has_next=has_next)
+
+@search_bp.route("/api")
+@login_required
+def search_api():
+    """Busca em JSON: `?q=termos&page=1&limit=20`."""
+    page = max(request.args.get("page", 1, type=int), 1)
+    results, has_next = search(request.args.get("q", ""), sector=_sector_scope(), page=page,
+                               per_page=page_size_arg(SEARCH_PAGE_SIZE))
+    return jsonify({"results": [r.to_dict() for r in results], "page": page, "has_next": has_next})
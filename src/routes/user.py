@@ -1,7 +1,9 @@
-from flask import Blueprint, jsonify, request, render_template, redirect, url_for, flash
+from flask import Blueprint, jsonify, request, render_template, redirect, url_for, flash, send_file, abort, current_app
 from flask_login import login_required, current_user
 from src.models.user import User, db
-from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
+from src.pagination import keyset_paginate, page_size_arg
+from src import avatars
 import os
 import json
 
@@ -9,8 +11,13 @@ user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """Lista usuários por páginas (`?limit=`, `?cursor=`); a próxima página vem em X-Next-Cursor."""
+    users = keyset_paginate(User.query, [User.id], cursor=request.args.get('cursor'),
+                            limit=page_size_arg(100), descending=False)
+    response = jsonify([user.to_dict() for user in users])
+    if users.next_cursor:
+        response.headers['X-Next-Cursor'] = users.next_cursor
+    return response
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -78,6 +85,8 @@ def update_schedule():
 def upload_profile_picture():
     """Faz upload da foto de perfil do usuário."""
     try:
+        # Recusa corpos maiores que o limite antes de ler o upload
+        request.max_content_length = current_app.config['AVATAR_MAX_BYTES'] + avatars.CHUNK_SIZE
         if 'profile_picture' not in request.files:
             flash('Nenhum arquivo selecionado.', 'danger')
             return redirect(url_for('user.dashboard'))
@@ -88,48 +97,75 @@ def upload_profile_picture():
             flash('Nenhum arquivo selecionado.', 'danger')
             return redirect(url_for('user.dashboard'))
         
-        # Verifica se o arquivo é uma imagem
-        allowed_extensions = {'png', 'jpg', 'jpeg', 'gif'}
-        if not ('.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
-            flash('Apenas imagens são permitidas (PNG, JPG, JPEG, GIF).', 'danger')
-            return redirect(url_for('user.dashboard'))
-        
-        # Cria o diretório de uploads se não existir
-        upload_dir = 'src/static/uploads'
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Salva o arquivo com um nome seguro
-        filename = secure_filename(f"{current_user.id}_{file.filename}")
-        filepath = os.path.join(upload_dir, filename)
-        file.save(filepath)
-        
-        # Atualiza o perfil do usuário
-        current_user.profile_picture = f'uploads/{filename}'
+        # Grava em blocos com o hash do conteúdo; o formato é verificado pelos bytes do arquivo
+        previous = current_user.profile_picture
+        current_user.profile_picture = avatars.save_upload(file.stream)
+        released = previous and previous != current_user.profile_picture
+        if released and previous.startswith(avatars.PREFIX):
+            avatars.release(previous)
         db.session.commit()
+        if released:
+            _release_picture(previous)
         
         flash('Foto de perfil atualizada com sucesso!', 'success')
+    except avatars.AvatarError as e:
+        flash(str(e), 'danger')
+    except RequestEntityTooLarge:
+        flash(f"A imagem deve ter no máximo {current_app.config['AVATAR_MAX_BYTES'] // (1024 * 1024)} MB.", 'danger')
     except Exception as e:
         flash(f'Erro ao fazer upload: {str(e)}', 'danger')
     
     return redirect(url_for('user.dashboard'))
 
+def _release_picture(value):
+    """Apaga o arquivo de um upload antigo (na pasta estática) que deixou de ser usado.
+
+    Fotos `avatars/...` são compartilhadas: `avatars.release`, chamado antes do commit,
+    agenda a remoção delas pelo worker de tarefas.
+    """
+    if not value.startswith(avatars.PREFIX):
+        filepath = os.path.join(current_app.static_folder, value)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
 @user_bp.route('/remove-profile-picture', methods=['POST'])
 @login_required
 def remove_profile_picture():
     """Remove a foto de perfil do usuário."""
     try:
         if current_user.profile_picture:
-            # Remove o arquivo do servidor
-            filepath = os.path.join('src/static', current_user.profile_picture)
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            previous = current_user.profile_picture
             
             # Atualiza o perfil do usuário
             current_user.profile_picture = None
+            if previous.startswith(avatars.PREFIX):
+                avatars.release(previous)
             db.session.commit()
+            # Remove o arquivo do servidor
+            _release_picture(previous)
             
             flash('Foto de perfil removida com sucesso!', 'success')
     except Exception as e:
         flash(f'Erro ao remover foto: {str(e)}', 'danger')
     
     return redirect(url_for('user.dashboard'))
+
+@user_bp.route('/avatar/<name>')
+def avatar(name):
+    """Serve uma foto/miniatura pelo hash do conteúdo, com cache imutável, ETag e Range."""
+    match = avatars.NAME_RE.match(name)
+    if not match:
+        abort(404)
+    path = avatars.path_for(name)
+    if os.path.exists(path):
+        response = send_file(path, conditional=True, etag=name.rsplit('.', 1)[0], max_age=365 * 24 * 3600)
+        response.cache_control.immutable = True
+        return response
+    if match.group('size') is None:
+        abort(404)
+    # Miniatura ainda não gerada (ou Pillow ausente): entrega a original, sem cache longo
+    for ext in ('jpg', 'png', 'gif'):
+        original = avatars.path_for(f"{match.group('digest')}.{ext}")
+        if os.path.exists(original):
+            return send_file(original, conditional=True, etag=match.group('digest'), max_age=60)
+    abort(404)
@@ -0,0 +1,105 @@
+# src/schedule.py
+"""Horário de trabalho compilado.
+
+`User.work_schedule` é um JSON ({"segunda": {"inicio": "08:00", "fim": "17:00"}, ...}).
+Em vez de fazer `json.loads` e `strptime` a cada consulta, o JSON é compilado uma
+vez por versão (o próprio texto é a chave do cache) em intervalos de minutos do dia
+por dia da semana, com os totais já calculados.
+"""
+import json
+from functools import lru_cache
+
+# Índice = datetime.weekday()
+DAYS = ('segunda', 'terca', 'quarta', 'quinta', 'sexta', 'sabado', 'domingo')
+
+def _minute_of_day(value):
+    hours, minutes = value.split(':')[:2]
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(value)
+    return hours * 60 + minutes
+
+class CompiledSchedule:
+    """Horário semanal pré-processado; todas as consultas são O(1)."""
+    __slots__ = ("raw", "days", "windows", "weekly_minutes", "daily_minutes")
+
+    def __init__(self, raw):
+        self.raw = raw
+        # Horário de cada dia como cadastrado (ou None)
+        self.days = tuple(raw.get(day) for day in DAYS)
+        # (início, fim) em minutos do dia, ou None quando o dia não tem horário válido
+        windows = []
+        for times in self.days:
+            if not times:
+                windows.append(None)
+                continue
+            try:
+                windows.append((_minute_of_day(times.get('inicio', '00:00')), _minute_of_day(times.get('fim', '23:59'))))
+            except (AttributeError, TypeError, ValueError):
+                windows.append(None)
+        self.windows = tuple(windows)
+        # Minutos esperados em cada dia da semana (0 sem horário ou com fim <= início)
+        self.daily_minutes = tuple(max(window[1] - window[0], 0) if window else 0 for window in windows)
+        # Soma dos intervalos positivos de todas as entradas do JSON
+        total = 0
+        for times in raw.values():
+            if times and 'inicio' in times and 'fim' in times:
+                try:
+                    duration = _minute_of_day(times['fim']) - _minute_of_day(times['inicio'])
+                except (AttributeError, TypeError, ValueError):
+                    continue
+                if duration > 0:
+                    total += duration
+        self.weekly_minutes = total
+
+    def as_dict(self):
+        """Cópia do horário como dicionário (pode ser alterada pelo chamador)."""
+        return {day: dict(times) if isinstance(times, dict) else times for day, times in self.raw.items()}
+
+    def day(self, weekday):
+        """Horário cadastrado para o dia da semana (0 = segunda), ou None."""
+        times = self.days[weekday]
+        return dict(times) if isinstance(times, dict) else times
+
+    def has_window(self, weekday):
+        return self.windows[weekday] is not None
+
+    def is_within(self, moment):
+        """True se `moment` está dentro do horário do dia (inclusive nas pontas).
+
+        Dias sem horário (ou com horário inválido) não restringem: retorna True.
+        """
+        window = self.windows[moment.weekday()]
+        if window is None:
+            return True
+        second = moment.hour * 3600 + moment.minute * 60 + moment.second
+        return window[0] * 60 <= second <= window[1] * 60
+
+    def expected_minutes(self, weekday):
+        """Minutos esperados no dia (fim - início), ou None se o dia não tem horário válido."""
+        window = self.windows[weekday]
+        return window[1] - window[0] if window is not None else None
+
+    def expected_between(self, start, end):
+        """Minutos esperados de `start` a `end` (datas, inclusive), dia a dia pelo horário.
+
+        Semanas completas valem a soma dos sete dias; só as sobras são somadas uma a uma.
+        """
+        if end < start:
+            return 0
+        weeks, rest = divmod((end - start).days + 1, 7)
+        first = start.weekday()
+        return weeks * sum(self.daily_minutes) + sum(self.daily_minutes[(first + offset) % 7] for offset in range(rest))
+
+EMPTY_SCHEDULE = CompiledSchedule({})
+
+@lru_cache(maxsize=1024)
+def compile_schedule(raw_json):
+    """Compila o JSON do horário; resultados ficam em cache por texto do JSON."""
+    try:
+        raw = json.loads(raw_json) if raw_json else {}
+    except ValueError:
+        return EMPTY_SCHEDULE
+    if not isinstance(raw, dict):
+        return EMPTY_SCHEDULE
+    return CompiledSchedule(raw)
@@ -0,0 +1,203 @@
+# src/search.py
+"""Busca textual em documentos e ordens de serviço.
+
+O backend depende do banco:
+
+*   MySQL: índices FULLTEXT em `document` e `ordem_servico` (migração 3), consultados
+    com MATCH ... AGAINST. O próprio InnoDB mantém os índices a cada INSERT/UPDATE.
+*   SQLite: tabela virtual FTS5 `search_index`, atualizada pelo hook `after_flush`
+    abaixo sempre que um Document ou OrdemServico é criado, editado ou removido.
+*   Outros bancos (ou SQLite sem FTS5): LIKE simples, sem ranking por relevância.
+
+Os resultados vêm ordenados por relevância e paginados por página/limite.
+"""
+import re
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+from src.extensions import db
+from src.models.document import Document
+from src.models.ordem_servico import OrdemServico
+
+SEARCH_PAGE_SIZE = 20
+SNIPPET_LENGTH = 200
+
+ORDEM_TEXT_FIELDS = ("descricao_resumida", "descricao_detalhada", "materiais_necessarios", "materiais_indiretos")
+
+FTS5_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "kind UNINDEXED, ref_id UNINDEXED, sector UNINDEXED, title, body, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+class SearchResult:
+    __slots__ = ("kind", "ref_id", "title", "snippet", "score")
+
+    def __init__(self, kind, ref_id, title, snippet, score):
+        self.kind = kind
+        self.ref_id = int(ref_id)
+        self.title = title
+        self.snippet = snippet
+        self.score = score
+
+    def to_dict(self):
+        return {"kind": self.kind, "id": self.ref_id, "title": self.title,
+                "snippet": self.snippet, "score": self.score}
+
+def _tokens(query):
+    return re.findall(r"\w+", query or "", flags=re.UNICODE)
+
+def _ordem_body(ordem):
+    return "\n".join(value for value in (getattr(ordem, field) for field in ORDEM_TEXT_FIELDS) if value)
+
+# --- Detecção do backend ---
+# Backend por URL do banco; evita inspecionar o esquema a cada busca/flush
+_backends = {}
+
+def backend_for(bind):
+    key = str(bind.engine.url)
+    backend = _backends.get(key)
+    if backend is None:
+        dialect = bind.dialect.name
+        if dialect == "mysql":
+            backend = "mysql"
+        elif dialect == "sqlite" and inspect(bind).has_table("search_index"):
+            backend = "fts5"
+        else:
+            backend = "like"
+        _backends[key] = backend
+    return backend
+
+# --- Manutenção do índice (SQLite/FTS5) ---
+def create_search_index(connection):
+    """Cria o índice do backend do banco (usado pela migração 3)."""
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        existing = {index["name"] for index in inspect(connection).get_indexes("document")}
+        if "ft_document" not in existing:
+            connection.execute(text("ALTER TABLE document ADD FULLTEXT INDEX ft_document (title, content)"))
+        existing = {index["name"] for index in inspect(connection).get_indexes("ordem_servico")}
+        if "ft_ordem_servico" not in existing:
+            connection.execute(text(
+                "ALTER TABLE ordem_servico ADD FULLTEXT INDEX ft_ordem_servico "
+                f"(titulo, {', '.join(ORDEM_TEXT_FIELDS)})"
+            ))
+    elif dialect == "sqlite":
+        try:
+            connection.execute(text(FTS5_DDL))
+        except Exception:
+            # SQLite compilado sem FTS5: a busca usa o LIKE
+            return
+        _backends.pop(str(connection.engine.url), None)
+        rebuild_search_index(connection)
+
+def rebuild_search_index(connection):
+    """Reconstrói o índice FTS5 inteiro a partir das tabelas (SQLite)."""
+    if backend_for(connection) != "fts5":
+        return
+    connection.execute(text("DELETE FROM search_index"))
+    connection.execute(text(
+        "INSERT INTO search_index (kind, ref_id, sector, title, body) "
+        "SELECT 'doc', id, NULL, title, COALESCE(content, '') FROM document"
+    ))
+    body = " || char(10) || ".join(f"COALESCE({field}, '')" for field in ORDEM_TEXT_FIELDS)
+    connection.execute(text(
+        "INSERT INTO search_index (kind, ref_id, sector, title, body) "
+        f"SELECT 'ordem', id, setor_responsavel, titulo, {body} FROM ordem_servico"
+    ))
+
+def _index_entry(connection, kind, ref_id, sector, title, body):
+    connection.execute(text("DELETE FROM search_index WHERE kind = :kind AND ref_id = :ref_id"),
+                       {"kind": kind, "ref_id": ref_id})
+    if title is not None:
+        connection.execute(text(
+            "INSERT INTO search_index (kind, ref_id, sector, title, body) VALUES (:kind, :ref_id, :sector, :title, :body)"
+        ), {"kind": kind, "ref_id": ref_id, "sector": sector, "title": title, "body": body})
+
+@event.listens_for(Session, "after_flush")
+def _update_search_index(session, flush_context):
+    """Atualiza o índice FTS5 incrementalmente com o que acabou de ser gravado."""
+    changed = [obj for obj in list(session.new) + list(session.dirty) if isinstance(obj, (Document, OrdemServico))]
+    deleted = [obj for obj in session.deleted if isinstance(obj, (Document, OrdemServico))]
+    if not changed and not deleted:
+        return
+    connection = session.connection()
+    if backend_for(connection) != "fts5":
+        return
+    for obj in changed:
+        if isinstance(obj, Document):
+            _index_entry(connection, "doc", obj.id, None, obj.title, obj.content or "")
+        else:
+            _index_entry(connection, "ordem", obj.id, obj.setor_responsavel.name, obj.titulo, _ordem_body(obj))
+    for obj in deleted:
+        _index_entry(connection, "doc" if isinstance(obj, Document) else "ordem", obj.id, None, None, None)
+
+# --- Consulta ---
+def search(query, sector=None, page=1, per_page=SEARCH_PAGE_SIZE):
+    """Busca `query` em documentos e ordens, da mais para a menos relevante.
+
+    `sector` restringe as ordens ao setor do usuário (None = todas, para a Gestão).
+    Retorna (resultados, há_próxima_página).
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return [], False
+    connection = db.session.connection()
+    backend = backend_for(connection)
+    offset = (max(page, 1) - 1) * per_page
+    params = {"limit": per_page + 1, "offset": offset}
+    if sector is not None:
+        params["sector"] = sector.name
+
+    if backend == "fts5":
+        # Cada termo entre aspas (sem operadores do FTS5) e o último como prefixo
+        params["q"] = " ".join('"%s"' % t for t in tokens[:-1]) + (' "%s"*' % tokens[-1])
+        sector_filter = "AND (kind = 'doc' OR sector = :sector)" if sector is not None else ""
+        rows = connection.execute(text(
+            "SELECT kind, ref_id, title, snippet(search_index, 4, '', '', '…', 24) AS snippet, "
+            "bm25(search_index, 0.0, 0.0, 0.0, 10.0, 1.0) AS score FROM search_index "
+            f"WHERE search_index MATCH :q {sector_filter} "
+            "ORDER BY score LIMIT :limit OFFSET :offset"
+        ), params).all()
+        results = [SearchResult(r.kind, r.ref_id, r.title, r.snippet, -r.score) for r in rows]
+    elif backend == "mysql":
+        params["q"] = " ".join(tokens)
+        doc_match = "MATCH(title, content) AGAINST (:q IN NATURAL LANGUAGE MODE)"
+        ordem_match = f"MATCH(titulo, {', '.join(ORDEM_TEXT_FIELDS)}) AGAINST (:q IN NATURAL LANGUAGE MODE)"
+        sector_filter = "AND setor_responsavel = :sector" if sector is not None else ""
+        rows = connection.execute(text(
+            f"SELECT 'doc' AS kind, id AS ref_id, title, LEFT(content, {SNIPPET_LENGTH}) AS snippet, {doc_match} AS score "
+            f"FROM document WHERE {doc_match} "
+            "UNION ALL "
+            f"SELECT 'ordem', id, titulo, LEFT(COALESCE(descricao_resumida, descricao_detalhada), {SNIPPET_LENGTH}), {ordem_match} "
+            f"FROM ordem_servico WHERE {ordem_match} {sector_filter} "
+            "ORDER BY score DESC LIMIT :limit OFFSET :offset"
+        ), params).all()
+        results = [SearchResult(r.kind, r.ref_id, r.title, r.snippet, float(r.score)) for r in rows]
+    else:
+        results = _like_search(tokens, sector, per_page + 1, offset)
+
+    return results[:per_page], len(results) > per_page
+
+def _like_search(tokens, sector, limit, offset):
+    """Busca sem índice textual: todos os termos precisam aparecer; título pesa mais."""
+    results = []
+    doc_query = Document.summary_query()
+    ordem_query = OrdemServico.query
+    for token in tokens:
+        pattern = f"%{token}%"
+        doc_query = doc_query.filter(Document.title.ilike(pattern) | Document.content.ilike(pattern))
+        ordem_query = ordem_query.filter(
+            OrdemServico.titulo.ilike(pattern)
+            | db.or_(*[getattr(OrdemServico, field).ilike(pattern) for field in ORDEM_TEXT_FIELDS])
+        )
+    if sector is not None:
+        ordem_query = ordem_query.filter(OrdemServico.setor_responsavel == sector)
+    window = offset + limit
+    for doc in doc_query.limit(window).all():
+        score = sum(token.lower() in doc.title.lower() for token in tokens)
+        results.append(SearchResult("doc", doc.id, doc.title, None, float(score)))
+    for ordem in ordem_query.limit(window).all():
+        score = sum(token.lower() in ordem.titulo.lower() for token in tokens)
+        results.append(SearchResult("ordem", ordem.id, ordem.titulo, ordem.descricao_resumida, float(score)))
+    results.sort(key=lambda r: r.score, reverse=True)
+    return results[offset:offset + limit]
@@ -0,0 +1,205 @@
+# src/seed.py
+"""Dados sintéticos em volume, para benchmarks e testes de carga.
+
+`seed_database` gera usuários com horários, turnos de ponto, ocorrências, ordens de
+serviço e documentos com INSERTs em lote (Core, sem objetos do ORM) e depois
+recalcula o que é derivado: totais diários (`daily_hours`) e o
+índice de busca. O gerador é determinístico (`seed`), então duas execuções com os
+mesmos parâmetros produzem o mesmo banco e os benchmarks ficam comparáveis.
+
+Os turnos seguem o horário de cada usuário: um por dia de trabalho, voltando no
+tempo a partir de ontem até completar a cota do usuário. Alguns usuários ficam com
+o turno de hoje aberto, para o quadro de status ter gente trabalhando.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, func
+from src.models.user import User, UserRole, UserSector
+from src.models.ponto import TimeEntry, EntryType, rebuild_daily_hours
+from src.models.ordem_servico import OrdemServico, OrdemStatus
+from src.models.document import Document, render_markdown, content_digest
+from src.schedule import DAYS
+
+SEED_BATCH = 20000
+SEED_PREFIX = "seed"
+# Proporção de ocorrências entre os registros de ponto
+OCCURRENCE_RATIO = 0.05
+# Proporção de usuários com o turno de hoje aberto
+CLOCKED_IN_RATIO = 0.15
+
+OCCURRENCES = (
+    "Falta de material para a {part}",
+    "Ferramenta quebrada durante a montagem da {part}",
+    "Atraso na entrega de peças da {part}",
+    "Teste da {part} reprovado, refazer",
+    "Bancada ocupada, {part} adiada",
+)
+PARTS = ("suspensão", "caixa de redução", "gaiola", "pinça de freio", "chicote elétrico", "manga de eixo",
+         "carenagem", "coluna de direção")
+
+def _schedule(rng):
+    """Horário de 3 a 5 dias da semana, com turnos de 2 a 5 horas."""
+    schedule = {}
+    for day in rng.sample(DAYS[:6], rng.randint(3, 5)):
+        start = rng.choice((8, 9, 10, 13, 14, 15, 18))
+        schedule[day] = {"inicio": f"{start:02d}:00", "fim": f"{start + rng.randint(2, 5):02d}:00"}
+    return schedule
+
+def _document_content(rng, number, paragraphs):
+    parts = [f"# Documento {number}", ""]
+    for index in range(paragraphs):
+        part = rng.choice(PARTS)
+        parts.append(f"## Seção {index + 1}: {part}")
+        parts.append(f"Procedimento de montagem e inspeção da **{part}**. " * rng.randint(3, 8))
+        parts.append("")
+        parts.extend(f"- Verificar item {item} da {part}" for item in range(rng.randint(2, 5)))
+        parts.append("")
+    return "\n".join(parts)
+
+def _insert_batches(connection, table, rows, log=None, label=None, total=None):
+    batch = []
+    done = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= SEED_BATCH:
+            connection.execute(insert(table), batch)
+            done += len(batch)
+            batch = []
+            if log and label:
+                log(f"  {done}/{total} {label}")
+    if batch:
+        connection.execute(insert(table), batch)
+        done += len(batch)
+    return done
+
+def seed_database(connection, users=200, entries=1_000_000, orders=2000, documents=500,
+                  password_hash="x" * 60, seed=42, now=None, log=None):
+    """Popula o banco (que já deve ter o esquema) e retorna as contagens geradas.
+
+    Os usuários se chamam `seed1`, `seed2`, ...; `seed1` é da Gestão. Todos usam
+    `password_hash`, calculado uma vez pelo chamador. Falha se já houver usuários
+    com esse prefixo, para não misturar duas gerações.
+    """
+    user_table = User.__table__
+    existing = connection.execute(
+        select(func.count()).select_from(user_table).where(user_table.c.username.like(f"{SEED_PREFIX}%"))
+    ).scalar()
+    if existing:
+        raise ValueError(f"O banco já tem {existing} usuários '{SEED_PREFIX}*'.")
+
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    sectors = [s for s in UserSector if s not in (UserSector.NONE, UserSector.GESTAO)]
+
+    # --- Usuários ---
+    user_rows = []
+    for index in range(1, users + 1):
+        if index == 1:
+            role, sector = UserRole.GESTAO, UserSector.GESTAO
+        else:
+            role = UserRole.GERENTE if index % 20 == 0 else UserRole.MEMBRO
+            sector = sectors[index % len(sectors)]
+        user_rows.append({
+            "username": f"{SEED_PREFIX}{index}", "email": f"{SEED_PREFIX}{index}@samabaja.local",
+            "password_hash": password_hash, "role": role, "sector": sector, "is_active": True,
+            "work_schedule": json.dumps(_schedule(rng)), "total_hours_worked": 0,
+        })
+    connection.execute(insert(user_table), user_rows)
+    user_ids = connection.execute(
+        select(user_table.c.id, user_table.c.work_schedule)
+        .where(user_table.c.username.like(f"{SEED_PREFIX}%")).order_by(user_table.c.id)
+    ).all()
+    if log:
+        log(f"{len(user_ids)} usuários")
+
+    # --- Registros de ponto ---
+    occurrences = int(entries * OCCURRENCE_RATIO)
+    shifts = entries - occurrences
+    per_user = [shifts // len(user_ids) + (1 if i < shifts % len(user_ids) else 0) for i in range(len(user_ids))]
+    clocked_in = set(rng.sample(range(len(user_ids)), int(len(user_ids) * CLOCKED_IN_RATIO)))
+
+    def shift_rows():
+        for position, ((user_id, raw_schedule), quota) in enumerate(zip(user_ids, per_user)):
+            schedule = json.loads(raw_schedule)
+            workdays = {DAYS.index(day): times for day, times in schedule.items()}
+            if position in clocked_in and quota:
+                yield {"user_id": user_id, "start_time": now - timedelta(minutes=rng.randint(10, 180)),
+                       "end_time": None, "entry_type": EntryType.ENTRADA, "description": None,
+                       "registered_by_id": None, "open_user_id": user_id}
+                quota -= 1
+            day = today
+            while quota:
+                day -= timedelta(days=1)
+                times = workdays.get(day.weekday())
+                if times is None:
+                    continue
+                begin_hour = int(times["inicio"][:2])
+                length = (int(times["fim"][:2]) - begin_hour) * 60
+                begin = day + timedelta(hours=begin_hour, minutes=rng.randint(-20, 30))
+                yield {"user_id": user_id, "start_time": begin,
+                       "end_time": begin + timedelta(minutes=max(15, length + rng.randint(-60, 45))),
+                       "entry_type": EntryType.ENTRADA, "description": None, "registered_by_id": None,
+                       "open_user_id": None}
+                quota -= 1
+
+    span_days = max(1, max(per_user, default=0) * 7 // 3)
+
+    def occurrence_rows():
+        for _ in range(occurrences):
+            user_id = rng.choice(user_ids)[0]
+            moment = now - timedelta(minutes=rng.randint(1, span_days * 24 * 60))
+            yield {"user_id": user_id, "start_time": moment, "end_time": moment, "entry_type": EntryType.OCORRENCIA,
+                   "description": rng.choice(OCCURRENCES).format(part=rng.choice(PARTS)),
+                   "registered_by_id": user_id}
+
+    entry_table = TimeEntry.__table__
+    total = _insert_batches(connection, entry_table, shift_rows(), log, "turnos", shifts)
+    total += _insert_batches(connection, entry_table, occurrence_rows(), log, "ocorrências", occurrences)
+    if log:
+        log(f"{total} registros de ponto")
+
+    # --- Ordens de serviço ---
+    statuses = [OrdemStatus.ABERTA] * 3 + [OrdemStatus.EM_ANDAMENTO] * 2 + [OrdemStatus.CONCLUIDA] * 4 + [OrdemStatus.CANCELADA]
+    creators = [user_id for user_id, _ in user_ids[: max(1, len(user_ids) // 10)]]
+
+    def order_rows():
+        for index in range(1, orders + 1):
+            part = rng.choice(PARTS)
+            yield {
+                "titulo": f"Ordem {index}: {part}", "setor_responsavel": rng.choice(sectors),
+                "descricao_resumida": f"Fabricação/ajuste da {part}",
+                "descricao_detalhada": f"Executar a fabricação da {part} conforme o desenho. " * rng.randint(2, 10),
+                "criador_id": rng.choice(creators),
+                "data_criacao": now - timedelta(minutes=rng.randint(1, span_days * 24 * 60)),
+                "status": rng.choice(statuses), "materiais_necessarios": "Aço 1020, parafusos M8",
+            }
+
+    _insert_batches(connection, OrdemServico.__table__, order_rows())
+
+    # --- Documentos (com o HTML já renderizado, como as rotas gravam) ---
+    def document_rows():
+        for index in range(1, documents + 1):
+            content = _document_content(rng, index, rng.randint(2, 12))
+            created = now - timedelta(minutes=rng.randint(1, span_days * 24 * 60))
+            yield {
+                "title": f"Documento {index}: {rng.choice(PARTS)}", "content": content,
+                "content_html": render_markdown(content), "content_hash": content_digest(content),
+                "creator_id": rng.choice(creators), "last_editor_id": None,
+                "created_at": created, "updated_at": created + timedelta(days=rng.randint(0, 30)),
+            }
+
+    _insert_batches(connection, Document.__table__, document_rows())
+    if log:
+        log(f"{orders} ordens de serviço, {documents} documentos")
+
+    # --- Dados derivados ---
+    daily_rows = rebuild_daily_hours(connection)
+    from src.search import rebuild_search_index
+    rebuild_search_index(connection)
+    if log:
+        log(f"{daily_rows} linhas diárias de horas; índice de busca atualizado")
+
+    return {"users": len(user_ids), "entries": total, "open_shifts": sum(1 for position in clocked_in if per_user[position]),
+            "orders": orders, "documents": documents, "daily_rows": daily_rows}
@@ -0,0 +1,47 @@
+# src/snapshot.py
+"""Cache das partes globais da página de ponto (`registrar_ponto`).
+
+As ocorrências recentes e as ordens abertas (de todos os setores, para a Gestão,
+ou de um setor) são iguais para muitos usuários e mudam bem menos do que a página
+é aberta. Ficam nos caches abaixo e são descartadas no commit de qualquer
+transação que grave uma ordem de serviço, uma ocorrência ou um usuário (o nome
+aparece no feed) neste processo, no mesmo esquema do cache de usuários em
+`src/models/user.py`. Nos outros workers valem até o TTL.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.cache import TTLCache
+from src.models.user import User
+from src.models.ordem_servico import OrdemServico
+from src.models.ponto import TimeEntry, EntryType
+
+# Chave: nome do setor, ou None para a lista da Gestão (todos os setores)
+open_orders_cache = TTLCache(ttl=15, maxsize=32)
+# Uma chave só: o feed das ocorrências mais recentes
+occurrence_cache = TTLCache(ttl=15, maxsize=1)
+
+def invalidate_snapshot(orders=True, occurrences=True):
+    if orders:
+        open_orders_cache.clear()
+    if occurrences:
+        occurrence_cache.clear()
+
+@event.listens_for(Session, "after_flush")
+def _collect_snapshot_changes(session, flush_context):
+    """Anota o que foi gravado; os caches só são descartados depois do commit."""
+    changed = session.info.setdefault("snapshot_changes", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, OrdemServico):
+            changed.add("orders")
+        elif isinstance(obj, User) or (isinstance(obj, TimeEntry) and obj.entry_type == EntryType.OCORRENCIA):
+            changed.add("occurrences")
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_snapshot_changes(session):
+    changed = session.info.pop("snapshot_changes", ())
+    if changed:
+        invalidate_snapshot(orders="orders" in changed, occurrences="occurrences" in changed)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_snapshot_changes(session):
+    session.info.pop("snapshot_changes", None)
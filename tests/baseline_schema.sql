@@ -0,0 +1,65 @@
+-- Esquema do SQLite criado pelo `db.create_all()` da versão anterior às migrações
+-- (antes de `schema_version`): o ponto de partida dos bancos já em uso.
+
+CREATE TABLE user (
+	id INTEGER NOT NULL,
+	username VARCHAR(80) NOT NULL,
+	email VARCHAR(120) NOT NULL,
+	password_hash VARCHAR(60) NOT NULL,
+	role VARCHAR(7) NOT NULL,
+	sector VARCHAR(18) NOT NULL,
+	is_active BOOLEAN NOT NULL,
+	work_schedule TEXT NOT NULL,
+	total_hours_worked INTEGER NOT NULL,
+	bank_of_hours INTEGER NOT NULL,
+	profile_picture VARCHAR(255),
+	PRIMARY KEY (id),
+	UNIQUE (username),
+	UNIQUE (email)
+);
+
+CREATE TABLE time_entry (
+	id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	start_time DATETIME NOT NULL,
+	end_time DATETIME,
+	description TEXT,
+	entry_type VARCHAR(10) NOT NULL,
+	registered_by_id INTEGER,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES user (id),
+	FOREIGN KEY(registered_by_id) REFERENCES user (id)
+);
+
+CREATE TABLE ordem_servico (
+	id INTEGER NOT NULL,
+	titulo VARCHAR(200) NOT NULL,
+	descricao_resumida VARCHAR(500),
+	descricao_detalhada TEXT,
+	setor_responsavel VARCHAR(18) NOT NULL,
+	criador_id INTEGER NOT NULL,
+	data_criacao DATETIME NOT NULL,
+	data_prevista_conclusao DATE,
+	status VARCHAR(12) NOT NULL,
+	materiais_necessarios TEXT,
+	materiais_indiretos TEXT,
+	equipamentos_ferramentas TEXT,
+	epis TEXT,
+	anexos_link VARCHAR(500),
+	observacoes TEXT,
+	PRIMARY KEY (id),
+	FOREIGN KEY(criador_id) REFERENCES user (id)
+);
+
+CREATE TABLE document (
+	id INTEGER NOT NULL,
+	title VARCHAR(255) NOT NULL,
+	content TEXT,
+	creator_id INTEGER NOT NULL,
+	last_editor_id INTEGER,
+	created_at DATETIME NOT NULL,
+	updated_at DATETIME NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(creator_id) REFERENCES user (id),
+	FOREIGN KEY(last_editor_id) REFERENCES user (id)
+);
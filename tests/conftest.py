@@ -0,0 +1,59 @@
+"""Fixtures dos testes: cada teste roda contra um SQLite novo em `tmp_path`.
+
+Rodar da raiz do projeto: `python -m pytest`.
+"""
+import os
+import sqlite3
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# `src.main` cria uma aplicação ao ser importado; sem isto ela apontaria para o MySQL
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("BCRYPT_LOG_ROUNDS", "4")
+
+BASELINE_SCHEMA = os.path.join(os.path.dirname(__file__), "baseline_schema.sql")
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Fábrica de aplicações; `baseline=True` parte do esquema anterior às migrações."""
+    from src.main import create_app
+    from src.extensions import db
+    from src.models.user import user_cache, pending_count_cache
+    from src.snapshot import invalidate_snapshot
+
+    apps = []
+    def factory(baseline=False):
+        path = tmp_path / f"app{len(apps)}.db"
+        if baseline:
+            with sqlite3.connect(path) as connection, open(BASELINE_SCHEMA, encoding="utf-8") as schema:
+                connection.executescript(schema.read())
+        monkeypatch.setenv("DATABASE_URL", f"sqlite:///{path}")
+        monkeypatch.setenv("USER_CACHE_DIR", str(tmp_path / "user-cache"))
+        app = create_app()
+        app.config.update(TESTING=True)
+        apps.append(app)
+        return app
+
+    user_cache.clear()
+    pending_count_cache.clear()
+    invalidate_snapshot()
+    yield factory
+    for app in apps:
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+def init_db(app):
+    """Roda `flask init-db`, como no build; falha o teste se o comando falhar."""
+    result = app.test_cli_runner().invoke(args=["init-db", "--admin-password", "admin"])
+    assert result.exit_code == 0, result.output + repr(result.exception)
+    return result
+
+@pytest.fixture
+def app(make_app):
+    """Aplicação com o banco criado por `init-db` (admin/admin)."""
+    app = make_app()
+    init_db(app)
+    return app
@@ -0,0 +1,79 @@
+import io
+import os
+import time
+from datetime import datetime
+
+# Cabeçalho PNG basta: o formato é reconhecido pelos primeiros bytes
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 64
+
+def _age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+def _setup(app, tmp_path):
+    app.config["AVATAR_DIR"] = str(tmp_path / "avatars")
+
+def test_release_is_queued_in_the_same_transaction(app, tmp_path):
+    from src import avatars
+    from src.extensions import db
+    from src.models.job import Job
+    from src.models.user import User
+
+    _setup(app, tmp_path)
+    with app.app_context():
+        admin = User.query.filter_by(username="admin").one()
+        admin.profile_picture = avatars.save_upload(io.BytesIO(PNG))
+        db.session.commit()
+        value = admin.profile_picture
+
+        admin.profile_picture = None
+        avatars.release(value)
+        db.session.rollback()
+        assert Job.query.filter_by(name="avatar_release").count() == 0
+
+        admin.profile_picture = None
+        avatars.release(value)
+        db.session.commit()
+        job = Job.query.filter_by(name="avatar_release").one()
+        assert job.get_payload() == {"value": value}
+        assert job.run_after > datetime.utcnow()
+        assert os.path.exists(avatars.path_for(value[len(avatars.PREFIX):]))
+
+def test_reupload_before_commit_keeps_the_file(app, tmp_path):
+    """Outro usuário envia a mesma imagem e ainda não fez commit quando a liberação roda."""
+    from src import avatars
+    from src.extensions import db
+    from src.models.user import User
+
+    _setup(app, tmp_path)
+    with app.app_context():
+        value = avatars.save_upload(io.BytesIO(PNG))
+        path = avatars.path_for(value[len(avatars.PREFIX):])
+        _age(path, avatars.RELEASE_GRACE_SECONDS + 60)
+
+        admin = User.query.filter_by(username="admin").one()
+        admin.profile_picture = avatars.save_upload(io.BytesIO(PNG))  # renova o mtime
+        assert not avatars.delete_if_unreferenced(value)  # ninguém referencia ainda
+        db.session.commit()
+        assert os.path.exists(path)
+
+def test_unreferenced_file_is_deleted_after_the_grace_period(app, tmp_path):
+    from src import avatars
+    from src.extensions import db
+    from src.models.user import User
+
+    _setup(app, tmp_path)
+    with app.app_context():
+        value = avatars.save_upload(io.BytesIO(PNG))
+        path = avatars.path_for(value[len(avatars.PREFIX):])
+        _age(path, avatars.RELEASE_GRACE_SECONDS + 60)
+
+        admin = User.query.filter_by(username="admin").one()
+        admin.profile_picture = value
+        db.session.commit()
+        assert not avatars.delete_if_unreferenced(value)  # ainda em uso
+
+        admin.profile_picture = None
+        db.session.commit()
+        assert avatars.delete_if_unreferenced(value)
+        assert not os.path.exists(path)
@@ -0,0 +1,18 @@
+def test_relay_loop_backs_off_on_repeated_socket_errors(monkeypatch):
+    from src import events
+
+    class BrokenSocket:
+        """recv falha sempre; o socket "fecha" depois de 6 erros."""
+        def __init__(self):
+            self.errors = 0
+        def recv(self, size):
+            self.errors += 1
+            raise OSError("falha de leitura")
+        def fileno(self):
+            return -1 if self.errors > 6 else 3
+
+    sleeps = []
+    monkeypatch.setattr(events.time, "sleep", sleeps.append)
+    events.EventBroadcaster()._relay_loop(BrokenSocket())
+
+    assert sleeps == [0.1, 0.2, 0.4, 0.8, 1.6, 3.2]
@@ -0,0 +1,37 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+FORMULAS = ["=HYPERLINK(\"http://exemplo\")", "+1+1", "-2+3", "@SUM(A1)", "\tcmd", "sem fórmula"]
+
+def _add_occurrences(app):
+    from src.extensions import db
+    from src.models.ponto import TimeEntry, EntryType
+    from src.models.user import User
+
+    with app.app_context():
+        admin = User.query.filter_by(username="admin").one()
+        for description in FORMULAS:
+            db.session.add(TimeEntry(user_id=admin.id, entry_type=EntryType.OCORRENCIA, start_time=datetime.utcnow(),
+                                     description=description, registered_by_id=admin.id))
+        db.session.commit()
+
+def _login(app):
+    client = app.test_client()
+    assert client.post("/auth/login", data={"username": "admin", "password": "admin"}).status_code == 302
+    return client
+
+def test_csv_escapes_formulas(app):
+    _add_occurrences(app)
+    response = _login(app).get("/ponto/export/csv?tipo=OCORRENCIA")
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row["description"] for row in rows] == ["'" + value for value in FORMULAS[:-1]] + ["sem fórmula"]
+
+def test_ndjson_keeps_the_original_text(app):
+    _add_occurrences(app)
+    response = _login(app).get("/ponto/export/ndjson?tipo=OCORRENCIA")
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["description"] for line in lines] == FORMULAS
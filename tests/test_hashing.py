@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from flask import Flask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _hasher(**config):
+    from src.hashing import PasswordHasher
+    app = Flask(__name__)
+    app.config.update(config)
+    return PasswordHasher(app)
+
+def test_timeout_is_busy_and_keeps_the_slot_until_the_hash_ends():
+    from src.hashing import HashingBusy
+
+    hasher = _hasher(BCRYPT_WORKERS=1, BCRYPT_MAX_PENDING=1, BCRYPT_TIMEOUT_SECONDS=0.05)
+    release = threading.Event()
+    with pytest.raises(HashingBusy):
+        hasher._run(release.wait)
+    # O hash abandonado ainda ocupa a vaga: a fila continua limitando o trabalho real
+    assert hasher.pending == 1
+    with pytest.raises(HashingBusy):
+        hasher._run(lambda: None)
+
+    release.set()
+    hasher._executor.submit(lambda: None).result(timeout=5)  # espera o pool esvaziar
+    assert hasher.pending == 0
+    assert hasher._run(lambda: 42) == 42
+
+# Sob gevent (como no gunicorn) o pool tem BCRYPT_WORKERS threads reais e o
+# timeout também vira HashingBusy
+GEVENT_SCRIPT = """
+from gevent import monkey
+monkey.patch_all()
+import time
+from flask import Flask
+from src.hashing import PasswordHasher, HashingBusy
+app = Flask(__name__)
+app.config.update(BCRYPT_WORKERS=3, BCRYPT_MAX_PENDING=4, BCRYPT_TIMEOUT_SECONDS=0.05)
+hasher = PasswordHasher(app)
+assert hasher._run(lambda: 42) == 42
+assert hasher._executor._threadpool.maxsize == 3, hasher._executor._threadpool.maxsize
+try:
+    hasher._run(time.sleep, 0.5)
+except HashingBusy:
+    pass
+else:
+    raise AssertionError("sem HashingBusy")
+assert hasher.pending == 1
+time.sleep(1)
+assert hasher.pending == 0
+"""
+
+def test_gevent_pool_uses_the_configured_workers():
+    pytest.importorskip("gevent")
+    result = subprocess.run([sys.executable, "-c", GEVENT_SCRIPT], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
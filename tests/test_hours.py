@@ -0,0 +1,127 @@
+import json
+from datetime import datetime, time, timedelta, timezone
+from src.models.ponto import clock_in, clock_out
+
+WORKDAYS = ("segunda", "terca", "quarta", "quinta", "sexta")
+
+def _member(db, username="horas"):
+    from src.models.user import User, UserRole, UserSector
+    user = User(username=username, email=f"{username}@samabaja.local", password_hash="x", role=UserRole.MEMBRO,
+                sector=UserSector.POWERTRAIN, is_active=True,
+                work_schedule=json.dumps({day: {"inicio": "14:00", "fim": "18:00"} for day in WORKDAYS}))
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def _work(db, user, day, minutes):
+    """Um turno de `minutes` no dia local `day`, a partir das 14h."""
+    start = datetime.combine(day, time(14)).astimezone().astimezone(timezone.utc).replace(tzinfo=None)
+    clock_in(user.id, start)
+    clock_out(user, start + timedelta(minutes=minutes))
+    db.session.commit()
+
+def _last_week():
+    today = datetime.now().date()
+    monday = today - timedelta(days=today.weekday() + 7)
+    return monday, monday + timedelta(days=6)
+
+def test_scheduled_day_without_shift_counts_as_expected(app):
+    from src.extensions import db
+    from src.routes.ponto import get_hours_report, get_daily_hours
+
+    monday, sunday = _last_week()
+    with app.app_context():
+        user = _member(db)
+        # Trabalhou segunda e quarta; faltou terça, quinta e sexta
+        _work(db, user, monday, 240)
+        _work(db, user, monday + timedelta(days=2), 300)
+
+        [row] = get_hours_report(monday, sunday, user.id)
+        assert row["worked_minutes"] == 540
+        assert row["expected_minutes"] == 5 * 240
+        assert row["balance_minutes"] == 540 - 5 * 240
+        assert row["days"] == 2
+
+        days = get_daily_hours(user.id, monday, sunday)
+        assert [day.day for day in days] == [monday + timedelta(days=offset) for offset in range(5)]
+        assert [day.worked_minutes for day in days] == [240, 0, 300, 0, 0]
+        assert days[1].balance_minutes == -240
+
+def test_report_matches_analysis(app):
+    from src.extensions import db
+    from src.analytics import hours_analysis
+    from src.routes.ponto import get_hours_report
+
+    monday, sunday = _last_week()
+    with app.app_context():
+        user = _member(db)
+        _work(db, user, monday + timedelta(days=1), 200)
+        [report] = get_hours_report(monday, sunday, user.id)
+        [analysis] = hours_analysis(monday, sunday, user_ids=[user.id]).users()
+        for field in ("worked_minutes", "expected_minutes", "balance_minutes"):
+            assert report[field] == analysis[field]
+
+def test_bank_of_hours_counts_absences_until_today(app):
+    from src.extensions import db
+    from src.models.user import User
+
+    monday, _ = _last_week()
+    with app.app_context():
+        user = _member(db)
+        _work(db, user, monday, 300)
+        user = db.session.get(User, user.id)
+        assert user.first_shift_day == monday
+        expected = user.get_compiled_schedule().expected_between(monday, datetime.now().date())
+        assert expected >= 5 * 240
+        assert user.bank_of_hours == 300 - expected
+
+def test_member_without_shifts_appears_in_report(app):
+    from src.extensions import db
+    from src.routes.ponto import get_hours_report
+
+    monday, sunday = _last_week()
+    with app.app_context():
+        user = _member(db, "ausente")
+        [row] = [row for row in get_hours_report(monday, sunday) if row["user_id"] == user.id]
+        assert row["worked_minutes"] == 0 and row["days"] == 0
+        assert row["balance_minutes"] == -5 * 240
+
+def test_rebuild_locks_users_before_clock_out_writes_daily_hours(app):
+    """O recálculo trava `user` antes de ler os turnos; o clock_out grava `user` antes de `daily_hours`.
+
+    Assim, um clock_out concorrente espera o recálculo terminar antes de tocar na
+    linha do dia, e o DELETE do recálculo não apaga o turno dele.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.dialects import mysql
+    from src.extensions import db
+    from src.models.ponto import rebuild_daily_hours
+
+    with app.app_context():
+        user = _member(db)
+        _work(db, user, _last_week()[0], 240)
+
+        executed = []
+        listener = lambda conn, clause, *args: executed.append(clause)
+        event.listen(db.engine, "before_execute", listener)
+        try:
+            with db.engine.begin() as connection:
+                rebuild_daily_hours(connection)
+        finally:
+            event.remove(db.engine, "before_execute", listener)
+        first = str(executed[0].compile(dialect=mysql.dialect()))
+        assert first.startswith("SELECT user.id") and first.endswith("FOR UPDATE")
+        assert db.session.get(type(user), user.id).total_hours_worked == 240
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement.lstrip().upper())
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            _work(db, user, _last_week()[0] + timedelta(days=1), 60)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        writes = [statement.split("(")[0].split()[:3] for statement in statements
+                  if statement.startswith(("UPDATE", "INSERT"))]
+        user_write = next(i for i, words in enumerate(writes) if words[:2] == ["UPDATE", "USER"])
+        daily_write = next(i for i, words in enumerate(writes) if "DAILY_HOURS" in words)
+        assert user_write < daily_write
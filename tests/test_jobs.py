@@ -0,0 +1,34 @@
+import sys
+import time
+
+# Filho de teste: na primeira execução cai; nas seguintes fica de pé
+CRASH_ONCE = """
+import os, sys, time
+marker = sys.argv[1]
+if not os.path.exists(marker):
+    open(marker, "w").close()
+    sys.exit(1)
+time.sleep(60)
+"""
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "tempo esgotado"
+        time.sleep(0.05)
+
+def test_supervisor_restarts_the_worker_and_stops_it(tmp_path):
+    from src.jobs import WorkerSupervisor
+
+    supervisor = WorkerSupervisor([sys.executable, "-c", CRASH_ONCE, str(tmp_path / "crashed")],
+                                  log=lambda message: None, min_delay=0.1, check_interval=0.05)
+    supervisor.start()
+    _wait_for(lambda: supervisor.restarts == 1 and supervisor.process.poll() is None)
+    process = supervisor.process
+    time.sleep(0.3)
+    assert supervisor.restarts == 1 and process.poll() is None
+
+    supervisor.stop(timeout=5)
+    assert process.poll() is not None
+    time.sleep(0.3)
+    assert supervisor.process is process  # nada é reiniciado depois do stop
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, select, text
+from conftest import init_db
+
+def _insert_user(connection, username):
+    connection.execute(text(
+        "INSERT INTO user (username, email, password_hash, role, sector, is_active, work_schedule, "
+        "total_hours_worked, bank_of_hours) VALUES (:name, :email, 'x', 'MEMBRO', 'POWERTRAIN', 1, '{}', 0, 0)"
+    ), {"name": username, "email": f"{username}@samabaja.local"})
+    return connection.execute(text("SELECT id FROM user WHERE username = :name"), {"name": username}).scalar_one()
+
+def _insert_entry(connection, user_id, start, end=None):
+    connection.execute(text(
+        "INSERT INTO time_entry (user_id, start_time, end_time, entry_type) VALUES (:user, :start, :end, 'ENTRADA')"
+    ), {"user": user_id, "start": start, "end": end})
+    return connection.execute(text("SELECT max(id) FROM time_entry")).scalar_one()
+
+def test_baseline_database_migrates_to_head(make_app):
+    from src.extensions import db
+    from src.migrations import MIGRATIONS, SchemaVersion
+
+    app = make_app(baseline=True)
+    init_db(app)
+    with app.app_context():
+        inspector = inspect(db.engine)
+        assert "open_user_id" in {column["name"] for column in inspector.get_columns("time_entry")}
+        indexes = {index["name"] for index in inspector.get_indexes("time_entry")}
+        assert {"ix_time_entry_user_type_start", "ix_time_entry_type_start", "ux_time_entry_open_user"} <= indexes
+        applied = set(db.session.scalars(select(SchemaVersion.version)))
+        assert applied == {version for version, _, _ in MIGRATIONS}
+    # Rodar de novo (cada deploy roda init-db) não aplica nada
+    assert "Nenhuma migração pendente." in init_db(app).output
+
+def test_open_shift_migration_closes_older_duplicates(make_app):
+    from src.extensions import db
+    from src.migrations import STRANDED_SHIFT_NOTE
+    from src.models.ponto import TimeEntry, DailyHours, clock_in, clock_out, local_date
+    from src.models.user import User
+
+    app = make_app(baseline=True)
+    older_start = datetime(2025, 3, 3, 11, 0)
+    with app.app_context(), db.engine.begin() as connection:
+        user_id = _insert_user(connection, "duplicado")
+        older = _insert_entry(connection, user_id, older_start)
+        newer = _insert_entry(connection, user_id, older_start + timedelta(hours=2))
+    init_db(app)
+
+    with app.app_context():
+        older_entry, newer_entry = db.session.get(TimeEntry, older), db.session.get(TimeEntry, newer)
+        assert older_entry.end_time == older_start and older_entry.open_user_id is None
+        assert older_entry.description == STRANDED_SHIFT_NOTE
+        assert newer_entry.end_time is None and newer_entry.open_user_id == user_id
+        # O turno fechado conta no dia, com 0 minutos
+        assert db.session.get(DailyHours, (user_id, local_date(older_start))).shifts == 1
+
+        # Só o turno mais recente continua aberto, e ele pode ser fechado e reaberto
+        user = db.session.get(User, user_id)
+        assert clock_in(user_id, datetime.utcnow()) is None
+        assert clock_out(user, datetime.utcnow()) is not None
+        db.session.commit()
+        assert clock_in(user_id, datetime.utcnow()) is not None
+        db.session.commit()
+        open_entries = db.session.scalars(select(TimeEntry.id).where(TimeEntry.end_time.is_(None))).all()
+        assert len(open_entries) == 1 and open_entries[0] not in (older, newer)
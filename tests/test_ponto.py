@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+
+def _login(app, username="admin", password="admin"):
+    client = app.test_client()
+    assert client.post("/auth/login", data={"username": username, "password": password}).status_code == 302
+    return client
+
+# Sem RETURNING (como no MySQL) o início do turno é lido depois do UPDATE
+@pytest.mark.parametrize("returning", [True, False], ids=["returning", "sem-returning"])
+def test_clock_out_closes_the_shift_with_one_update(app, monkeypatch, returning):
+    from src.extensions import db
+    from src.models.user import User
+    from src.models.ponto import TimeEntry, DailyHours, clock_in, clock_out, local_date
+
+    start = datetime.utcnow() - timedelta(hours=2)
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, "update_returning", returning)
+        admin = User.query.filter_by(username="admin").one()
+        entry_id = clock_in(admin.id, start)
+        db.session.commit()
+        db.session.refresh(admin)
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            assert clock_out(admin, start + timedelta(minutes=90)) == 90
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        db.session.commit()
+
+        # Fechar o turno, somar ao dia e somar ao usuário: um comando cada
+        assert len(statements) == (3 if returning else 4)
+        assert statements[0].lstrip().upper().startswith("UPDATE TIME_ENTRY")
+        entry = db.session.get(TimeEntry, entry_id)
+        assert entry.open_user_id is None and entry.end_time == start + timedelta(minutes=90)
+        assert db.session.get(DailyHours, (admin.id, local_date(start))).worked_minutes == 90
+        assert db.session.get(User, admin.id).total_hours_worked == 90
+        # Sem turno aberto, a segunda saída não grava nada
+        assert clock_out(admin, start + timedelta(minutes=95)) is None
+
+def test_status_sync_reports_clock_in_and_out(app):
+    from src.extensions import db
+    from src.models.user import User
+
+    with app.app_context():
+        admin = User.query.filter_by(username="admin").one()
+        admin.set_work_schedule({day: {"inicio": "00:00", "fim": "23:59"}
+                                 for day in ("segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo")})
+        db.session.commit()
+    client = _login(app)
+    first = client.get("/ponto/api/status")
+    cursor = first.headers["X-Sync-Cursor"]
+    assert client.get("/ponto/api/status", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    client.post("/ponto/", data={"action": "clock_in"})
+    changed = client.get(f"/ponto/api/status?since={cursor}")
+    assert changed.headers["X-Sync-Full"] == "0"
+    assert [row["status"] for row in changed.get_json()] == ["trabalhando"]
+
+    cursor = changed.headers["X-Sync-Cursor"]
+    client.post("/ponto/", data={"action": "clock_out"})
+    board = client.get("/ponto/api/status").get_json()
+    assert [row["status"] for row in board] == ["nao_bateu"]
+    assert board[0]["user_id"] in [row["user_id"] for row in client.get(f"/ponto/api/status?since={cursor}").get_json()]
+
+def test_second_clock_in_only_undoes_its_insert(app):
+    from src.extensions import db
+    from src.models.user import User
+    from src.models.ponto import TimeEntry, clock_in
+
+    start = datetime.utcnow() - timedelta(hours=1)
+    with app.app_context():
+        admin = User.query.filter_by(username="admin").one()
+        entry_id = clock_in(admin.id, start)
+        db.session.commit()
+
+        # Alteração pendente da mesma transação: não pode ser descartada pelo clock_in repetido
+        admin.email = "outro@samabaja.local"
+        db.session.flush()
+        assert clock_in(admin.id, start + timedelta(minutes=5)) is None
+        db.session.commit()
+        assert db.session.get(User, admin.id).email == "outro@samabaja.local"
+        assert [entry.id for entry in TimeEntry.query.filter_by(open_user_id=admin.id)] == [entry_id]
+
+def test_clock_in_reraises_other_integrity_errors(app):
+    from sqlalchemy.exc import IntegrityError
+    from src.extensions import db
+    from src.models.ponto import clock_in
+
+    with app.app_context():
+        # Usuário inexistente: falha de chave estrangeira, não "entrada já registrada"
+        with pytest.raises(IntegrityError):
+            clock_in(999999, datetime.utcnow())
+        db.session.rollback()
@@ -0,0 +1,7 @@
+def test_routes_stay_within_their_query_budgets(make_app):
+    """Orçamentos de `src/query_budgets.py`: limite, N+1 (consultas crescendo com os dados) e 5xx."""
+    from src.query_budgets import check_query_budgets
+
+    lines = []
+    failures = check_query_budgets((10, 40), log=lines.append, make_app=make_app)
+    assert not failures, "\n".join(lines + ["", *failures])
@@ -0,0 +1,32 @@
+from sqlalchemy import update
+
+def test_deactivation_in_another_worker_reaches_the_cache(app):
+    """Outro worker grava e renova a versão; este descarta o usuário em cache."""
+    from src.extensions import db
+    from src.models.user import User, load_session_user, user_versions
+
+    with app.app_context():
+        admin_id = User.query.filter_by(username="admin").one().id
+        assert load_session_user(admin_id).is_active
+        db.session.remove()
+
+        # O que o outro worker faz: grava direto no banco e renova a versão,
+        # sem mexer no cache deste processo
+        with db.engine.begin() as connection:
+            connection.execute(update(User.__table__).where(User.__table__.c.id == admin_id).values(is_active=False))
+        assert load_session_user(admin_id).is_active  # ainda em cache, versão igual
+        db.session.remove()
+        user_versions.bump(admin_id)
+        assert not load_session_user(admin_id).is_active
+
+def test_pending_count_follows_other_workers(app):
+    from src.extensions import db
+    from src.models.user import User, UserRole, pending_users_count, user_versions, PENDING_VERSION_KEY
+
+    with app.app_context():
+        assert pending_users_count() == 0
+        with db.engine.begin() as connection:
+            connection.execute(update(User.__table__).values(role=UserRole.PENDING))
+        assert pending_users_count() == 0
+        user_versions.bump(PENDING_VERSION_KEY)
+        assert pending_users_count() == 1